@@ -0,0 +1,167 @@
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import itertools
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BuyerAccountPool:
+    """
+    The buyer accounts this process signs with.
+
+    Each account has its own nonce sequence, so spreading orders over several
+    accounts lets their transactions be mined in parallel instead of queueing
+    behind a single account's nonces. New orders go to the account with the
+    fewest transactions in flight; later operations on an order must use the
+    account that created it, since the contract checks msg.sender.
+    """
+
+    def __init__(self, eth_account, private_keys):
+        if not private_keys:
+            raise Exception("At least one buyer private key is required")
+        self.accounts = [eth_account.from_key(key) for key in private_keys]
+        self._by_address = {account.address.lower(): account for account in self.accounts}
+        self._lock = threading.Lock()
+        self._in_flight = {account.address: 0 for account in self.accounts}
+        self._last_used = {account.address: 0 for account in self.accounts}
+        self._sequence = itertools.count(1)
+
+    def __contains__(self, address):
+        return address.lower() in self._by_address
+
+    @property
+    def default(self):
+        return self.accounts[0]
+
+    def get(self, address=None):
+        """
+        Return the pool account for address, or the default buyer when no
+        address is given
+        """
+        if address is None:
+            return self.default
+        account = self._by_address.get(address.lower())
+        if account is None:
+            raise Exception(f"No signing key configured for buyer {address}")
+        return account
+
+    def least_busy(self):
+        """
+        Pick the account with the fewest transactions in flight, preferring
+        the one used longest ago on a tie
+        """
+        with self._lock:
+            account = min(
+                self.accounts,
+                key=lambda account: (self._in_flight[account.address], self._last_used[account.address])
+            )
+            self._last_used[account.address] = next(self._sequence)
+            return account
+
+    @contextmanager
+    def busy(self, *accounts):
+        """
+        Count the given accounts as having a transaction in flight; accounts
+        outside the pool are ignored
+        """
+        addresses = [account.address for account in accounts if account.address in self._in_flight]
+        with self._lock:
+            for address in addresses:
+                self._in_flight[address] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for address in addresses:
+                    self._in_flight[address] -= 1
+
+    def in_flight(self):
+        with self._lock:
+            return dict(self._in_flight)
+
+
+class TokenReservations:
+    """
+    Tokens that submitted but unconfirmed payments will still take from each
+    buyer's balance and allowance.
+
+    A payment holds the buyer's lock while it reads the balance and
+    allowance and submits its transactions, and keeps its amount reserved
+    until their receipts are in, so concurrent payments for one buyer never
+    count the same tokens twice. The locks are thread locks, so one instance
+    can be shared by clients running on different event loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buyer_locks = {}
+        self._reserved = {}
+
+    def lock(self, address):
+        with self._lock:
+            lock = self._buyer_locks.get(address)
+            if lock is None:
+                lock = self._buyer_locks[address] = threading.Lock()
+            return lock
+
+    @asynccontextmanager
+    async def async_lock(self, address, poll_interval=0.005):
+        """
+        lock() for coroutines: waits for the buyer's lock without blocking
+        the event loop
+        """
+        lock = self.lock(address)
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def reserved(self, address):
+        with self._lock:
+            return self._reserved.get(address, 0)
+
+    def reserve(self, address, amount):
+        with self._lock:
+            self._reserved[address] = self._reserved.get(address, 0) + amount
+
+    def release(self, address, amount):
+        with self._lock:
+            remaining = self._reserved.get(address, 0) - amount
+            if remaining > 0:
+                self._reserved[address] = remaining
+            else:
+                self._reserved.pop(address, None)
+
+
+def plan_rebalance(balances, target, funder, transfer_cost=0):
+    """
+    Transfers (sender, recipient, amount) that bring every balance in
+    balances (address -> amount) up to target. Surplus held above target by
+    other accounts is moved first and funder covers whatever is left.
+    transfer_cost is what each transfer takes from its sender's balance on
+    top of the amount, i.e. the gas of an ETH transfer, so surplus accounts
+    end up at or above target once their transfers are mined.
+    """
+    surplus = [
+        [address, balance - target] for address, balance in balances.items() if balance - target > transfer_cost
+    ]
+    transfers = []
+    for address, balance in balances.items():
+        missing = target - balance
+        for entry in surplus:
+            if missing <= 0:
+                break
+            amount = min(entry[1] - transfer_cost, missing)
+            if amount > 0:
+                transfers.append((entry[0], address, amount))
+                entry[1] -= amount + transfer_cost
+                missing -= amount
+        if missing > 0:
+            transfers.append((funder, address, missing))
+    return transfers
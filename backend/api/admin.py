@@ -1,53 +1,88 @@
 from django.contrib import admin, messages
-from .models import Product, Order
-from .blockchain import SmartContract
+from .models import Product, Order, BlockchainJob
+from .blockchain import get_smart_contract
+from .services import cancel_orders, refresh_order_statuses, refund_orders, submit_orders
+from .cache import invalidate_order_status
 from web3 import Web3
 
 @admin.action(description='Create sale for selected products')
 def create_sale(modeladmin, request, queryset):
     try:
-        sc = SmartContract()
-        for product in queryset:
-            amount_wei = Web3.to_wei(product.price, 'ether')
-            token_address = sc.mock_erc20_contract.address
-
-            order_id_chain, buyer_address = sc.create_order(amount_wei, token_address)
-
-            Order.objects.create(
-                product=product,
-                order_id_chain=order_id_chain,
-                buyer_address=buyer_address,
-                amount=product.price,
-                token_address=token_address,
-                status='Pending'
-            )
-        messages.success(request, f'{len(queryset)} sales created successfully.')
+        orders, failed = submit_orders([(product, Order.PAYMENT_METHOD_TOKEN) for product in queryset])
+        messages.success(request, f'{len(orders)} sales created successfully.')
+        if failed:
+            messages.warning(request, f'{len(failed)} sales could not be created.')
     except Exception as e:
         messages.error(request, f'Error creating sales: {e}')
 
 @admin.action(description='Process payment for selected orders')
 def process_payment(modeladmin, request, queryset):
     try:
-        sc = SmartContract()
+        sc = get_smart_contract()
         for order in queryset:
             if order.status == 'Pending':
                 amount_wei = Web3.to_wei(order.amount, 'ether')
-                sc.process_payment(order.order_id_chain, amount_wei)
+                if order.payment_method == Order.PAYMENT_METHOD_ETH:
+                    sc.process_eth_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
+                else:
+                    sc.process_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
                 order.status = 'Completed'
                 order.save()
+                invalidate_order_status(order.order_id_chain)
         messages.success(request, f'{len(queryset)} payments processed successfully.')
     except Exception as e:
         messages.error(request, f'Error processing payments: {e}')
 
+@admin.action(description='Cancel selected pending orders')
+def cancel_selected_orders(modeladmin, request, queryset):
+    try:
+        result = cancel_orders(list(queryset.filter(status='Pending')))
+        messages.success(
+            request,
+            f"{len(result['cancelled'])} orders cancelled in {len(result['transactions'])} transactions."
+        )
+        if result['skipped'] or result['failed']:
+            messages.warning(
+                request,
+                f"{len(result['skipped'])} orders skipped, {len(result['failed'])} failed."
+            )
+    except Exception as e:
+        messages.error(request, f'Error cancelling orders: {e}')
+
+@admin.action(description='Refund selected paid orders')
+def refund_selected_orders(modeladmin, request, queryset):
+    try:
+        outcomes = refund_orders(queryset.filter(status='Paid'))
+        refunded = sum(1 for outcome in outcomes.values() if outcome['status'] == 'Refunded')
+        messages.success(request, f'{refunded} orders refunded.')
+        if refunded < len(outcomes):
+            messages.warning(request, f'{len(outcomes) - refunded} refunds did not complete.')
+    except Exception as e:
+        messages.error(request, f'Error refunding orders: {e}')
+
+@admin.action(description='Refresh status from blockchain')
+def refresh_status(modeladmin, request, queryset):
+    try:
+        checked, updated = refresh_order_statuses(queryset)
+        messages.success(request, f'{checked} orders checked, {updated} updated.')
+    except Exception as e:
+        messages.error(request, f'Error refreshing order statuses: {e}')
+
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'description')
     actions = [create_sale]
 
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('product', 'order_id_chain', 'buyer_address', 'amount', 'status', 'created_at')
-    list_filter = ('status',)
+    list_display = ('product', 'order_id_chain', 'buyer_address', 'amount', 'payment_method', 'status', 'created_at')
+    list_filter = ('status', 'payment_method')
     search_fields = ('product__name', 'buyer_address')
-    actions = [process_payment]
+    actions = [process_payment, cancel_selected_orders, refund_selected_orders, refresh_status]
+
+class BlockchainJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'order', 'status', 'tx_hash', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('result', 'error', 'attempts', 'started_at', 'finished_at')
 
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Order, OrderAdmin)
+admin.site.register(BlockchainJob, BlockchainJobAdmin)
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from django.db.backends.signals import connection_created
+        from .cache import bump_catalog_version
+        from .metrics import install_query_recorder
+        from .models import Product
+
+        post_delete.connect(bump_catalog_version, sender=Product, dispatch_uid='api.bump_catalog_version')
+        connection_created.connect(install_query_recorder, dispatch_uid='api.install_query_recorder')
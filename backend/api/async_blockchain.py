@@ -0,0 +1,636 @@
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+from django.conf import settings
+from web3.exceptions import ContractLogicError, TimeExhausted
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from .blockchain import (
+    PipelineError, _is_nonce_error, cancel_order_steps, cancelled_orders, create_order_steps, created_orders,
+    get_client_state, get_contract_info, order_from_tuple, payment_stages, refund_order_steps, refunded_orders,
+    token_payment_steps
+)
+from .gas import AsyncGasPriceOracle
+from .metrics import RPCMetricsMiddleware, timed_operation
+from .receipts import AsyncReceiptWatcher
+from .tracing import span
+import asyncio
+import logging
+import weakref
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncSmartContract:
+    """
+    asyncio counterpart of SmartContract built on AsyncWeb3, so a single ASGI
+    worker can keep many requests waiting on the node at once.
+
+    Instances are created with `await AsyncSmartContract.create()` and are
+    bound to the running event loop. Accounts, nonces, token reservations and
+    gas profiles come from the process-wide ClientState, which SmartContract
+    uses as well, so sync and async requests can sign for the same accounts
+    side by side.
+    """
+
+    def __init__(self, w3, state, contract_info=None):
+        self.w3 = w3
+        self.state = state
+        self.chain_id = state.chain_id
+
+        self.owner_account = state.owner_account
+        self.buyer_pool = state.buyer_pool
+        self.buyer_account = self.buyer_pool.default
+        self.token_reservations = state.token_reservations
+
+        self.load_contracts(contract_info)
+
+        self.receipt_watcher = None
+        if settings.RECEIPT_WATCHER_ENABLED:
+            self.receipt_watcher = AsyncReceiptWatcher(self.w3, poll_interval=settings.RECEIPT_POLL_INTERVAL)
+
+        self.gas_profiles = state.gas_profiles
+        self.gas_price_oracle = AsyncGasPriceOracle(
+            self.w3,
+            interval=settings.GAS_PRICE_REFRESH_INTERVAL,
+            mode=settings.GAS_FEE_MODE,
+            min_priority_fee=settings.GAS_MIN_PRIORITY_FEE
+        )
+
+    @classmethod
+    async def create(cls, state=None, session=None, contract_info=None):
+        provider = AsyncHTTPProvider(
+            settings.GANACHE_URL,
+            request_kwargs={'timeout': ClientTimeout(total=settings.WEB3_HTTP_TIMEOUT)}
+        )
+        if session is not None:
+            await provider.cache_async_session(session)
+        w3 = AsyncWeb3(provider)
+        w3.middleware_onion.add(RPCMetricsMiddleware, name='metrics')
+        if state is None:
+            state = get_client_state()
+        if state.chain_id is None:
+            if not await w3.is_connected():
+                raise ConnectionError("Failed to connect to Ganache")
+            state.chain_id = await w3.eth.chain_id
+        return cls(w3, state, contract_info)
+
+    def _get_contract(self, address, abi):
+        if not address or not abi:
+            return None
+        return self.w3.eth.contract(address=address, abi=abi)
+
+    def load_contracts(self, contract_info=None):
+        """
+        Bind the contracts from a contract-info.json dict, or from settings
+        when contract_info is None
+        """
+        self.contract_info = contract_info
+        if contract_info is not None:
+            ecommerce_info = contract_info.get('EcomercePayment', {})
+            erc20_info = contract_info.get('MockERC20', {})
+            self.ecommerce_contract = self._get_contract(
+                ecommerce_info.get('address'), ecommerce_info.get('abi')
+            )
+            self.mock_erc20_contract = self._get_contract(
+                erc20_info.get('address'), erc20_info.get('abi')
+            )
+        else:
+            self.ecommerce_contract = self._get_contract(
+                settings.ECOMMERCE_CONTRACT_ADDRESS,
+                settings.ECOMMERCE_CONTRACT_ABI
+            )
+            self.mock_erc20_contract = self._get_contract(
+                settings.MOCK_ERC20_CONTRACT_ADDRESS,
+                settings.MOCK_ERC20_CONTRACT_ABI
+            )
+
+    def _nonce_manager(self, address):
+        return self.state.nonce_manager(address)
+
+    async def _sign_transaction(self, contract_function, account, nonce, value=0):
+        tx_params = {
+            'from': account.address,
+            'nonce': nonce,
+            'chainId': self.chain_id
+        }
+        if value:
+            tx_params['value'] = value
+        with timed_operation('build'):
+            tx_params.update(await self.gas_price_oracle.fee_fields())
+            tx_params['gas'] = await self.gas_profiles.async_gas_limit(contract_function, tx_params)
+            tx = await contract_function.build_transaction(tx_params)
+        with timed_operation('sign'):
+            return self.w3.eth.account.sign_transaction(tx, private_key=account.key)
+
+    async def _send_transaction(self, contract_function, account, value=0):
+        nonces = self._nonce_manager(account.address)
+        for attempt in range(2):
+            with span('nonce'):
+                nonce = await nonces.async_allocate(self.w3)
+            try:
+                signed_tx = await self._sign_transaction(contract_function, account, nonce, value)
+                with timed_operation('send'):
+                    return await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception as e:
+                if _is_nonce_error(e) and attempt == 0:
+                    logger.warning(f"Nonce {nonce} rejected for {account.address}, resyncing: {e}")
+                    await nonces.async_resync(self.w3)
+                    continue
+                nonces.release(nonce)
+                raise
+
+    async def _wait_for_receipt(self, tx_hash, account):
+        try:
+            with timed_operation('wait'):
+                if self.receipt_watcher is not None:
+                    return await self.receipt_watcher.wait(tx_hash, timeout=settings.RECEIPT_TIMEOUT)
+                return await self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=settings.RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            await self._nonce_manager(account.address).async_resync(self.w3)
+            raise
+
+    async def _transact(self, contract_function, account, value=0):
+        with self.buyer_pool.busy(account), span('transaction', function=contract_function.fn_name):
+            tx_hash = await self._send_transaction(contract_function, account, value)
+            receipt = await self._wait_for_receipt(tx_hash, account)
+        self.gas_profiles.record_receipt(contract_function, receipt)
+        return tx_hash, receipt
+
+    async def _send_pipeline(self, steps):
+        """
+        Sign (contract_function, account, value) calls with consecutive nonces
+        and submit them back to back. Returns the transaction hashes in order.
+        A sequence whose first transaction is rejected for its nonce is
+        signed again once with resynced nonces.
+        """
+        for attempt in range(2):
+            try:
+                return await self._submit_pipeline(steps)
+            except PipelineError as e:
+                if attempt == 0 and not e.sent and _is_nonce_error(e.error):
+                    logger.warning(f"Pipeline nonce rejected, resubmitting with resynced nonces: {e.error}")
+                    continue
+                raise
+
+    async def _submit_pipeline(self, steps):
+        counts = {}
+        for _, account, _ in steps:
+            counts[account.address] = counts.get(account.address, 0) + 1
+        allocated = {}
+        with span('nonce', transactions=len(steps)):
+            for address, count in counts.items():
+                nonces = await self._nonce_manager(address).async_allocate(self.w3, count)
+                allocated[address] = [nonces] if count == 1 else nonces
+
+        signed_txs = []
+        for contract_function, account, value in steps:
+            nonce = allocated[account.address].pop(0)
+            signed_txs.append((account, nonce, await self._sign_transaction(contract_function, account, nonce, value)))
+
+        tx_hashes = []
+        for index, (account, nonce, signed_tx) in enumerate(signed_txs):
+            try:
+                with timed_operation('send'):
+                    tx_hashes.append(await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction))
+            except Exception as e:
+                for unsent_account, unsent_nonce, _ in reversed(signed_txs[index:]):
+                    self._nonce_manager(unsent_account.address).release(unsent_nonce)
+                if _is_nonce_error(e):
+                    await self._nonce_manager(account.address).async_resync(self.w3)
+                raise PipelineError(index, e, tx_hashes)
+        return tx_hashes
+
+    async def _wait_for_receipts(self, tx_hashes, accounts):
+        if self.receipt_watcher is None:
+            return await asyncio.gather(*[
+                self._wait_for_receipt(tx_hash, account)
+                for tx_hash, account in zip(tx_hashes, accounts)
+            ])
+        try:
+            with timed_operation('wait'):
+                return await self.receipt_watcher.wait_all(tx_hashes, timeout=settings.RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            for address in {account.address for account in accounts}:
+                await self._nonce_manager(address).async_resync(self.w3)
+            raise
+
+    async def create_order(self, amount_wei, token_address):
+        """
+        Create an order on the blockchain
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            buyer = self.buyer_pool.least_busy()
+            tx_hash, receipt = await self._transact(
+                self.ecommerce_contract.functions.createOrder(amount_wei, token_address),
+                buyer
+            )
+
+            if receipt.status == 0:
+                raise Exception("Transaction failed")
+
+            logs = self.ecommerce_contract.events.PaymentPending().process_receipt(receipt)
+            if not logs:
+                raise Exception("PaymentPending event not found in transaction receipt")
+
+            order_id = logs[0]['args']['orderId']
+            logger.info(f"Order created successfully with ID: {order_id}")
+            return order_id, buyer.address
+
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error: {e}")
+        except Exception as e:
+            raise Exception(f"Error creating order on blockchain: {e}")
+
+    async def create_orders(self, orders):
+        """
+        Create several orders from (amount_wei, token_address) pairs with one
+        pipelined batch of createOrder transactions; see
+        SmartContract.create_orders
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+        if not orders:
+            return []
+
+        buyers = [self.buyer_pool.least_busy() for _ in orders]
+        steps = create_order_steps(self, orders, buyers)
+
+        try:
+            with self.buyer_pool.busy(*buyers):
+                try:
+                    tx_hashes = await self._send_pipeline(steps)
+                except PipelineError as e:
+                    if not e.sent:
+                        raise
+                    logger.error(f"Only {len(e.sent)} of {len(steps)} createOrder transactions submitted: {e.error}")
+                    tx_hashes = e.sent
+                receipts = await self._wait_for_receipts(tx_hashes, buyers[:len(tx_hashes)])
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error: {e}")
+        except Exception as e:
+            raise Exception(f"Error creating orders on blockchain: {e}")
+
+        return created_orders(self, steps, buyers, receipts)
+
+    async def get_token_position(self, address):
+        """
+        Read an account's token balance and allowance in a single batched RPC
+        """
+        async with self.w3.batch_requests() as batch:
+            batch.add(self.mock_erc20_contract.functions.balanceOf(address))
+            batch.add(self.mock_erc20_contract.functions.allowance(address, self.ecommerce_contract.address))
+            balance, allowance = await batch.async_execute()
+        return balance, allowance
+
+    async def _token_payment_steps(self, order_id, amount_wei, buyer):
+        """
+        The transactions a token payment needs; call with the buyer's
+        reservation lock held
+        """
+        balance, allowance = await self.get_token_position(buyer.address)
+        return token_payment_steps(
+            self, order_id, amount_wei, buyer, balance, allowance,
+            reserved=self.token_reservations.reserved(buyer.address)
+        )
+
+    async def process_payment(self, order_id, amount_wei, buyer_address=None):
+        """
+        Process a token payment, skipping the transfer and approve transactions
+        when the buyer's balance and allowance already cover the amount
+        """
+        if not self.ecommerce_contract or not self.mock_erc20_contract:
+            raise Exception("Contracts not initialized")
+
+        logger.info(f"Starting payment process for order {order_id}")
+
+        try:
+            buyer = self.buyer_pool.get(buyer_address)
+            if settings.PIPELINED_TOKEN_PAYMENTS:
+                payment_tx_hash = await self._process_payment_pipelined(order_id, amount_wei, buyer)
+            else:
+                async with self.token_reservations.async_lock(buyer.address):
+                    for label, contract_function, account in await self._token_payment_steps(order_id, amount_wei, buyer):
+                        tx_hash, receipt = await self._transact(contract_function, account)
+                        if receipt.status == 0:
+                            raise Exception(f"{label} failed")
+                payment_tx_hash = tx_hash
+
+            logger.info(f"Payment processed successfully for order {order_id}")
+            return payment_tx_hash
+
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error during payment: {e}")
+        except Exception as e:
+            raise Exception(f"Error processing payment: {e}")
+
+    async def _process_payment_pipelined(self, order_id, amount_wei, buyer):
+        reservations = self.token_reservations
+        with self.buyer_pool.busy(buyer):
+            async with reservations.async_lock(buyer.address):
+                steps = await self._token_payment_steps(order_id, amount_wei, buyer)
+                stages = payment_stages(steps, buyer)
+                tx_hashes = await self._submit_payment_steps(stages[0])
+                reservations.reserve(buyer.address, amount_wei)
+            try:
+                await self._confirm_payment_steps(stages[0], tx_hashes)
+                for stage in stages[1:]:
+                    tx_hashes = await self._submit_payment_steps(stage)
+                    await self._confirm_payment_steps(stage, tx_hashes)
+            finally:
+                reservations.release(buyer.address, amount_wei)
+        return tx_hashes[-1]
+
+    async def _submit_payment_steps(self, steps):
+        try:
+            return await self._send_pipeline([(fn, account, 0) for _, fn, account in steps])
+        except PipelineError as e:
+            raise Exception(f"{steps[e.step][0]} could not be submitted: {e.error}")
+
+    async def _confirm_payment_steps(self, steps, tx_hashes):
+        receipts = await self._wait_for_receipts(tx_hashes, [account for _, _, account in steps])
+        for (label, contract_function, _), receipt in zip(steps, receipts):
+            self.gas_profiles.record_receipt(contract_function, receipt)
+            if receipt.status == 0:
+                raise Exception(f"{label} failed")
+
+    async def process_eth_payment(self, order_id, amount_wei, buyer_address=None):
+        """
+        Pay for an ETH order with a single processEthPayment transaction
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            tx_hash, receipt = await self._transact(
+                self.ecommerce_contract.functions.processEthPayment(order_id),
+                self.buyer_pool.get(buyer_address),
+                value=amount_wei
+            )
+
+            if receipt.status == 0:
+                raise Exception("Payment transaction failed")
+
+            logger.info(f"ETH payment processed successfully for order {order_id}")
+            return tx_hash
+
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error during payment: {e}")
+        except Exception as e:
+            raise Exception(f"Error processing ETH payment: {e}")
+
+    async def get_order_status(self, order_id):
+        """
+        Get order status from blockchain
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            order = await self.ecommerce_contract.functions.getOrder(order_id).call()
+            return order_from_tuple(order)
+        except Exception as e:
+            raise Exception(f"Error getting order status: {e}")
+
+    async def get_order_statuses(self, order_ids):
+        """
+        Get the status of many orders with batched getOrder reads. Returns a
+        dict keyed by order id.
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        order_ids = list(order_ids)
+        statuses = {}
+        try:
+            for i in range(0, len(order_ids), settings.GET_ORDER_BATCH_SIZE):
+                chunk = order_ids[i:i + settings.GET_ORDER_BATCH_SIZE]
+                async with self.w3.batch_requests() as batch:
+                    for order_id in chunk:
+                        batch.add(self.ecommerce_contract.functions.getOrder(order_id))
+                    results = await batch.async_execute()
+                for order_id, order in zip(chunk, results):
+                    statuses[order_id] = order_from_tuple(order)
+            return statuses
+        except Exception as e:
+            raise Exception(f"Error getting order statuses: {e}")
+
+    async def refund_failed(self, order_id, buyer_address, from_block=0):
+        """
+        Whether the contract emitted RefundFailed for order_id at or after
+        from_block
+        """
+        logs = await self.ecommerce_contract.events.RefundFailed().get_logs(
+            argument_filters={'buyer': buyer_address}, from_block=from_block
+        )
+        return any(log['args']['orderId'] == order_id for log in logs)
+
+    async def get_buyer_balance(self):
+        """
+        Get buyer's token balance
+        """
+        if not self.mock_erc20_contract:
+            raise Exception("ERC20 contract not initialized")
+
+        try:
+            balance = await self.mock_erc20_contract.functions.balanceOf(self.buyer_account.address).call()
+            return Web3.from_wei(balance, 'ether')
+        except Exception as e:
+            raise Exception(f"Error getting buyer balance: {e}")
+
+    async def get_contract_balance(self):
+        """
+        Get contract's token balance
+        """
+        if not self.mock_erc20_contract or not self.ecommerce_contract:
+            raise Exception("Contracts not initialized")
+
+        try:
+            balance = await self.mock_erc20_contract.functions.balanceOf(self.ecommerce_contract.address).call()
+            return Web3.from_wei(balance, 'ether')
+        except Exception as e:
+            raise Exception(f"Error getting contract balance: {e}")
+
+    async def cancel_order(self, order_id, buyer_address=None):
+        """
+        Cancel an order
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            tx_hash, receipt = await self._transact(
+                self.ecommerce_contract.functions.cancelOrders([order_id]),
+                self.buyer_pool.get(buyer_address)
+            )
+
+            if receipt.status == 0:
+                raise Exception("Order cancellation failed")
+
+            logger.info(f"Order {order_id} cancelled successfully")
+            return tx_hash
+
+        except Exception as e:
+            raise Exception(f"Error cancelling order: {e}")
+
+    async def cancel_orders(self, order_ids):
+        """
+        Cancel many orders with batched cancelOrders transactions; see
+        SmartContract.cancel_orders
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        result = {'cancelled': [], 'skipped': [], 'failed': [], 'transactions': []}
+        if not order_ids:
+            return result
+
+        try:
+            chunks, steps = cancel_order_steps(self, await self.get_order_statuses(order_ids), result)
+            if not steps:
+                return result
+
+            accounts = [account for _, account, _ in steps]
+            with self.buyer_pool.busy(*accounts):
+                try:
+                    tx_hashes = await self._send_pipeline(steps)
+                except PipelineError as e:
+                    if not e.sent:
+                        raise
+                    logger.error(f"Only {len(e.sent)} of {len(steps)} cancelOrders transactions submitted: {e.error}")
+                    tx_hashes = e.sent
+                receipts = await self._wait_for_receipts(tx_hashes, accounts[:len(tx_hashes)])
+        except Exception as e:
+            raise Exception(f"Error cancelling orders: {e}")
+
+        return cancelled_orders(self, chunks, steps, tx_hashes, receipts, result)
+
+    async def initiate_refund(self, order_id):
+        """
+        Initiate a refund for an order
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            # initiateRefund is onlyOwner
+            tx_hash, receipt = await self._transact(
+                self.ecommerce_contract.functions.initiateRefund(order_id),
+                self.owner_account
+            )
+
+            if receipt.status == 0:
+                raise Exception("Refund initiation failed")
+
+            logger.info(f"Refund initiated for order {order_id}")
+            return tx_hash
+
+        except Exception as e:
+            raise Exception(f"Error initiating refund: {e}")
+
+    async def refund_orders(self, order_ids):
+        """
+        Refund many paid orders with one pipelined batch of owner-signed
+        initiateRefund and processRefund transactions; see
+        SmartContract.refund_orders
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+        if not order_ids:
+            return {}
+
+        results = {}
+        try:
+            steps, positions = refund_order_steps(self, await self.get_order_statuses(order_ids), results)
+            if not steps:
+                return results
+
+            try:
+                tx_hashes = await self._send_pipeline(steps)
+            except PipelineError as e:
+                if not e.sent:
+                    raise
+                logger.error(f"Only {len(e.sent)} of {len(steps)} refund transactions submitted: {e.error}")
+                tx_hashes = e.sent
+            receipts = await self._wait_for_receipts(tx_hashes, [self.owner_account] * len(tx_hashes))
+        except Exception as e:
+            raise Exception(f"Error refunding orders: {e}")
+
+        return refunded_orders(self, steps, positions, tx_hashes, receipts, results)
+
+    async def get_connection_info(self):
+        """
+        Get connection information for debugging
+        """
+        is_connected, chain_id, latest_block = await asyncio.gather(
+            self.w3.is_connected(),
+            self.w3.eth.chain_id,
+            self.w3.eth.block_number
+        )
+        return {
+            'is_connected': is_connected,
+            'chain_id': chain_id,
+            'latest_block': latest_block,
+            'owner_address': self.owner_account.address,
+            'buyer_address': self.buyer_account.address,
+            'buyer_pool': [account.address for account in self.buyer_pool.accounts],
+            'ecommerce_contract_address': self.ecommerce_contract.address if self.ecommerce_contract else None,
+            'mock_erc20_contract_address': self.mock_erc20_contract.address if self.mock_erc20_contract else None
+        }
+
+
+# One client per event loop, since aiohttp sessions cannot be shared across
+# loops, all signing through the process-wide ClientState
+_async_instances = weakref.WeakKeyDictionary()
+_async_locks = weakref.WeakKeyDictionary()
+
+
+async def _close_with_loop(loop, session):
+    """
+    Drop the loop's client and close its session when the loop shuts down.
+    asyncio.run, which asgiref uses for every async view under WSGI, cancels
+    the tasks still pending before closing the loop, and that ends the wait
+    below.
+    """
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # The client holds the loop, so the weak keys alone never let it go
+        _async_instances.pop(loop, None)
+        _async_locks.pop(loop, None)
+        await session.close()
+
+
+async def get_async_smart_contract():
+    """
+    Return the AsyncSmartContract shared by the running event loop, bound to
+    the current contracts
+    """
+    loop = asyncio.get_running_loop()
+    contract_info = get_contract_info()
+    instance = _async_instances.get(loop)
+    if instance is not None:
+        if instance.contract_info is not contract_info:
+            instance.load_contracts(contract_info)
+        return instance
+
+    lock = _async_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        instance = _async_instances.get(loop)
+        if instance is None:
+            session = ClientSession(
+                connector=TCPConnector(limit=settings.WEB3_HTTP_POOL_SIZE),
+                raise_for_status=True
+            )
+            try:
+                instance = await AsyncSmartContract.create(session=session, contract_info=contract_info)
+            except Exception:
+                await session.close()
+                raise
+            # Keep a reference, the loop only holds its tasks weakly
+            instance.session_closer = loop.create_task(_close_with_loop(loop, session))
+            _async_instances[loop] = instance
+            logger.info(f"Built AsyncSmartContract for {settings.GANACHE_URL} on a new event loop")
+    return instance
@@ -0,0 +1,434 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.utils.encoders import JSONEncoder
+from .models import BlockchainJob, Order
+from .serializers import ProductSerializer, OrderSerializer
+from .blockchain import failure_is_ambiguous, order_status_from_chain
+from .async_blockchain import get_async_smart_contract
+from .cache import aget_order_status
+from .chainstate import get_chain_state, peek_chain_state
+from .indexer import afirst_unindexed_block
+from . import jobs, services
+import json
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def parse_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def job_accepted_response(request, job):
+    """
+    202 response pointing the client at a queued blockchain job
+    """
+    return api_response({
+        'message': 'Blockchain job queued',
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'order_id': job.order_id,
+        'status_url': request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+    }, status=202)
+
+
+async def get_order(order_id):
+    try:
+        return await Order.objects.select_related('product').aget(id=order_id)
+    except Order.DoesNotExist:
+        return None
+
+
+async def get_orders(order_ids):
+    return [order async for order in Order.objects.filter(id__in=order_ids)]
+
+
+def check_order_ids(data, action):
+    """
+    Error response for a bulk request whose order_ids are missing or too many
+    """
+    order_ids = data.get('order_ids') if isinstance(data, dict) else None
+    if not isinstance(order_ids, list) or not order_ids:
+        return api_response({"error": "order_ids must be a non-empty list of order ids"}, status=400)
+    if len(order_ids) > settings.ORDER_BATCH_MAX_SIZE:
+        return api_response(
+            {"error": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders can be {action} per request"},
+            status=400
+        )
+    return None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncOrderCreate(View):
+    async def post(self, request):
+        data = parse_body(request)
+        if data is None:
+            return api_response({"error": "Invalid JSON body"}, status=400)
+
+        serializer = OrderSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return api_response(serializer.errors, status=400)
+
+        product = serializer.validated_data['product']
+        payment_method = serializer.validated_data.get('payment_method', Order.PAYMENT_METHOD_TOKEN)
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = await sync_to_async(jobs.enqueue)(
+                BlockchainJob.KIND_CREATE_ORDER,
+                {'product_id': product.id, 'payment_method': payment_method}
+            )
+            return job_accepted_response(request, job)
+
+        try:
+            order = await services.asubmit_order(product, payment_method)
+
+            return api_response({
+                'id': order.id,
+                'order_id_chain': order.order_id_chain,
+                'buyer_address': order.buyer_address,
+                'amount': float(order.amount),
+                'token_address': order.token_address,
+                'status': order.status,
+                'payment_method': order.payment_method,
+                'product': ProductSerializer(product).data,
+                'created_at': order.created_at
+            }, status=201)
+
+        except Exception as e:
+            logger.error(f"Error creating order: {str(e)}")
+            return api_response({"error": str(e)}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncOrderBatchCreate(View):
+    """
+    Create several orders with one pipelined batch of createOrder transactions.
+    Expects {"orders": [{"product_id": 1, "payment_method": "token"}, ...]}.
+    """
+    async def post(self, request):
+        data = parse_body(request)
+        items = data.get('orders') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return api_response({"error": "orders must be a non-empty list"}, status=400)
+        if len(items) > settings.ORDER_BATCH_MAX_SIZE:
+            return api_response(
+                {"error": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders can be created per batch"},
+                status=400
+            )
+
+        serializer = OrderSerializer(data=items, many=True)
+        if not await sync_to_async(serializer.is_valid)():
+            return api_response(serializer.errors, status=400)
+        items = [
+            (data['product'], data.get('payment_method', Order.PAYMENT_METHOD_TOKEN))
+            for data in serializer.validated_data
+        ]
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = await sync_to_async(jobs.enqueue)(
+                BlockchainJob.KIND_CREATE_ORDERS,
+                {'orders': [
+                    {'product_id': product.id, 'payment_method': payment_method}
+                    for product, payment_method in items
+                ]}
+            )
+            return job_accepted_response(request, job)
+
+        try:
+            orders, failed = await services.asubmit_orders(items)
+            if not orders:
+                return api_response(
+                    {"error": "None of the orders in the batch were created", "failed": failed},
+                    status=400
+                )
+
+            return api_response({
+                'message': f'{len(orders)} orders created successfully',
+                'orders': OrderSerializer(orders, many=True).data,
+                'failed': failed
+            }, status=201)
+
+        except Exception as e:
+            logger.error(f"Error creating orders: {str(e)}")
+            return api_response({"error": str(e)}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncProcessPaymentView(View):
+    """
+    Process payment for a specific order
+    """
+    async def post(self, request, order_id):
+        order = await get_order(order_id)
+        if order is None:
+            return api_response({"error": "Order not found"}, status=404)
+
+        if order.status != 'Pending':
+            return api_response(
+                {"error": f"Cannot process payment. Order status is '{order.status}'. Only pending orders can be processed."},
+                status=400
+            )
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = await sync_to_async(jobs.enqueue)(BlockchainJob.KIND_PROCESS_PAYMENT, order=order)
+            return job_accepted_response(request, job)
+
+        try:
+            tx_hash = await services.apay_order(order)
+
+            return api_response({
+                'message': 'Payment processed successfully',
+                'transaction_hash': tx_hash.hex(),
+                'order_id': order.id,
+                'order_id_chain': order.order_id_chain,
+                'status': order.status
+            })
+
+        except Exception as e:
+            logger.error(f"Error processing payment for order {order_id}: {str(e)}")
+            return api_response({"error": f"Payment processing failed: {str(e)}"}, status=400)
+
+
+class AsyncOrderStatusView(View):
+    """
+    Get the status of a specific order
+    """
+    async def get(self, request, order_id):
+        order = await get_order(order_id)
+        if order is None:
+            return api_response({"error": "Order not found"}, status=404)
+
+        try:
+            data = await aget_order_status(order.order_id_chain, lambda: self.load_status(order))
+            return api_response(data)
+
+        except Exception as e:
+            logger.error(f"Error getting order status for order {order_id}: {str(e)}")
+            return api_response({"error": f"Failed to get order status: {str(e)}"}, status=400)
+
+    async def load_status(self, order):
+        if settings.ORDER_STATUS_FROM_INDEX:
+            blockchain_status = order.status
+        else:
+            sc = await get_async_smart_contract()
+            blockchain_order = await sc.get_order_status(order.order_id_chain)
+            refund_failed = False
+            if failure_is_ambiguous(blockchain_order['status'], order.status):
+                from_block = await afirst_unindexed_block(sc.ecommerce_contract.address)
+                refund_failed = await sc.refund_failed(order.order_id_chain, blockchain_order['buyer'], from_block)
+            blockchain_status = order_status_from_chain(blockchain_order['status'], order.status, refund_failed)
+
+            if order.status != blockchain_status:
+                order.status = blockchain_status
+                await order.asave(update_fields=['status'])
+
+        return {
+            'order_id': order.id,
+            'order_id_chain': order.order_id_chain,
+            'status': order.status,
+            'blockchain_status': blockchain_status,
+            'amount': float(order.amount),
+            'buyer_address': order.buyer_address,
+            'token_address': order.token_address,
+            'product': ProductSerializer(order.product).data,
+            'created_at': order.created_at
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCancelOrderView(View):
+    """
+    Cancel a specific order
+    """
+    async def post(self, request, order_id):
+        order = await get_order(order_id)
+        if order is None:
+            return api_response({"error": "Order not found"}, status=404)
+
+        if order.status != 'Pending':
+            return api_response(
+                {"error": f"Cannot cancel order. Order status is '{order.status}'. Only pending orders can be cancelled."},
+                status=400
+            )
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = await sync_to_async(jobs.enqueue)(BlockchainJob.KIND_CANCEL_ORDER, order=order)
+            return job_accepted_response(request, job)
+
+        try:
+            tx_hash = await services.acancel_order(order)
+
+            return api_response({
+                'message': 'Order cancelled successfully',
+                'transaction_hash': tx_hash.hex(),
+                'order_id': order.id,
+                'order_id_chain': order.order_id_chain,
+                'status': order.status
+            })
+
+        except Exception as e:
+            logger.error(f"Error cancelling order {order_id}: {str(e)}")
+            return api_response({"error": f"Order cancellation failed: {str(e)}"}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncBulkCancelOrdersView(View):
+    """
+    Cancel many pending orders with batched cancelOrders transactions.
+    Expects {"order_ids": [1, 2, ...]}.
+    """
+    async def post(self, request):
+        data = parse_body(request)
+        error = check_order_ids(data, 'cancelled')
+        if error is not None:
+            return error
+        order_ids = data['order_ids']
+
+        try:
+            orders = await get_orders(order_ids)
+            pending = [order for order in orders if order.status == 'Pending']
+            not_pending = [order.id for order in orders if order.status != 'Pending']
+            found = {order.id for order in orders}
+            not_found = [order_id for order_id in order_ids if order_id not in found]
+
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                job = await sync_to_async(jobs.enqueue)(
+                    BlockchainJob.KIND_CANCEL_ORDERS,
+                    {'order_ids': [order.id for order in pending]}
+                )
+                return job_accepted_response(request, job)
+
+            result = await services.acancel_orders(pending)
+            result['skipped'] += not_pending
+            result['not_found'] = not_found
+
+            return api_response({
+                'message': f"{len(result['cancelled'])} orders cancelled successfully",
+                **result
+            })
+
+        except Exception as e:
+            logger.error(f"Error cancelling orders: {str(e)}")
+            return api_response({"error": f"Order cancellation failed: {str(e)}"}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRefundOrderView(View):
+    """
+    Refund a specific order (initiateRefund and processRefund)
+    """
+    async def post(self, request, order_id):
+        order = await get_order(order_id)
+        if order is None:
+            return api_response({"error": "Order not found"}, status=404)
+
+        if order.status != 'Paid':
+            return api_response(
+                {"error": f"Cannot refund order. Order status is '{order.status}'. Only paid orders can be refunded."},
+                status=400
+            )
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = await sync_to_async(jobs.enqueue)(BlockchainJob.KIND_REFUND_ORDER, order=order)
+            return job_accepted_response(request, job)
+
+        try:
+            tx_hash = await services.arefund_order(order)
+
+            return api_response({
+                'message': 'Refund processed successfully',
+                'transaction_hash': tx_hash.hex(),
+                'order_id': order.id,
+                'order_id_chain': order.order_id_chain,
+                'status': order.status
+            })
+
+        except Exception as e:
+            logger.error(f"Error initiating refund for order {order_id}: {str(e)}")
+            return api_response({"error": f"Refund initiation failed: {str(e)}"}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncBulkRefundOrdersView(View):
+    """
+    Refund many paid orders with one pipelined batch of owner-signed
+    transactions. Expects {"order_ids": [1, 2, ...]}.
+    """
+    async def post(self, request):
+        data = parse_body(request)
+        error = check_order_ids(data, 'refunded')
+        if error is not None:
+            return error
+        order_ids = data['order_ids']
+
+        try:
+            orders = await get_orders(order_ids)
+            paid = [order for order in orders if order.status == 'Paid']
+            skipped = [order.id for order in orders if order.status != 'Paid']
+            found = {order.id for order in orders}
+            not_found = [order_id for order_id in order_ids if order_id not in found]
+
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                queued = [
+                    await sync_to_async(jobs.enqueue)(BlockchainJob.KIND_REFUND_ORDER, order=order)
+                    for order in paid
+                ]
+                return api_response({
+                    'message': f'{len(queued)} refund jobs queued',
+                    'jobs': [
+                        {
+                            'job_id': job.id,
+                            'order_id': job.order_id,
+                            'status': job.status,
+                            'status_url': request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+                        }
+                        for job in queued
+                    ],
+                    'skipped': skipped,
+                    'not_found': not_found
+                }, status=202)
+
+            outcomes = await services.arefund_orders(paid)
+            refunded = [order_id for order_id, outcome in outcomes.items() if outcome['status'] == 'Refunded']
+
+            return api_response({
+                'message': f'{len(refunded)} orders refunded successfully',
+                'refunded': refunded,
+                'results': outcomes,
+                'skipped': skipped,
+                'not_found': not_found
+            })
+
+        except Exception as e:
+            logger.error(f"Error refunding orders: {str(e)}")
+            return api_response({"error": f"Refund failed: {str(e)}"}, status=400)
+
+
+class AsyncBlockchainInfoView(View):
+    """
+    Get blockchain connection information for debugging, served from the
+    chain state snapshot refreshed in the background
+    """
+    async def get(self, request):
+        try:
+            info = peek_chain_state() or await sync_to_async(get_chain_state)()
+            return api_response(info)
+
+        except Exception as e:
+            logger.error(f"Error getting blockchain info: {str(e)}")
+            return api_response({"error": f"Failed to get blockchain info: {str(e)}"}, status=400)
@@ -1,28 +1,491 @@
 from web3 import Web3
+from eth_account import Account
 from django.conf import settings
-from web3.exceptions import ContractLogicError
+from web3.exceptions import ContractLogicError, TimeExhausted
+from requests.adapters import HTTPAdapter
+from .accounts import BuyerAccountPool, TokenReservations
+from .gas import GasPriceOracle, GasProfiles
+from .metrics import RPCMetricsMiddleware, timed_operation
+from .receipts import ReceiptWatcher
+from .tracing import span
+import heapq
+import json
 import logging
+import os
+import requests
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SmartContract:
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+# EcomercePayment.cancelOrders rejects more ids than this in one call
+MAX_CANCEL_BATCH = 10
+
+# EcomercePayment.PaymentStatus values mapped to Order.status. Use
+# order_status_from_chain rather than reading this directly: Failed (3) is
+# set both when a buyer cancels a pending order and when a refund fails.
+CHAIN_STATUS_MAP = {
+    0: 'Pending',
+    1: 'Paid',
+    2: 'Refunded',
+    3: 'Cancelled',
+    4: 'RefundPending',
+    5: 'RefundRequested'
+}
+CHAIN_STATUS_FAILED = 3
+
+# Order.status values of paid orders, which can only fail through a refund
+PAID_ORDER_STATUSES = ('Paid', 'RefundRequested', 'RefundPending', 'Refunded', 'RefundFailed')
+
+
+def failure_is_ambiguous(chain_status, current_status):
+    """
+    Whether the chain reports Failed for an order whose current Order.status
+    does not tell a cancellation from a failed refund, so the contract's
+    RefundFailed events have to be checked
+    """
+    return chain_status == CHAIN_STATUS_FAILED and current_status not in ('Cancelled',) + PAID_ORDER_STATUSES
+
+
+def order_status_from_chain(chain_status, current_status=None, refund_failed=False):
+    """
+    Order.status for an EcomercePayment.PaymentStatus, given the order's
+    current Order.status. A Failed order is 'RefundFailed' if it had been
+    paid or refund_failed says a RefundFailed event was found for it, and
+    'Cancelled' otherwise.
+    """
+    if chain_status == CHAIN_STATUS_FAILED and (current_status in PAID_ORDER_STATUSES or refund_failed):
+        return 'RefundFailed'
+    return CHAIN_STATUS_MAP.get(chain_status, 'Unknown')
+
+# Gas used by a plain ETH transfer
+ETH_TRANSFER_GAS = 21000
+
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'invalid transaction nonce',
+    'already known',
+    'replacement transaction underpriced',
+    "the tx doesn't have the correct nonce",
+)
+
+
+def _is_nonce_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+REFUND_ERRORS = {
+    None: "Refund initiation failed",
+    'RefundPending': "Refund processing failed",
+    'RefundFailed': "Refund transfer failed",
+}
+
+
+def _refund_outcome(contract, initiate_receipt, process_receipt):
+    """
+    Order.status after a refund's initiateRefund and processRefund receipts;
+    either receipt is None when that transaction was not sent. Returns None
+    if the refund was not initiated.
+    """
+    if initiate_receipt is not None and initiate_receipt.status == 0:
+        return None
+    if process_receipt is None or process_receipt.status == 0:
+        return 'RefundPending' if initiate_receipt is not None else None
+    # processRefund succeeds either way, the events tell whether the transfer went through
+    if contract.events.RefundSuccessful().process_receipt(process_receipt):
+        return 'Refunded'
+    return 'RefundFailed'
+
+
+def token_payment_steps(sc, order_id, amount_wei, buyer, balance, allowance, reserved=0):
+    """
+    The mint, approve and payment transactions a token payment needs, as
+    (label, contract_function, account) tuples, given the buyer's balance
+    and allowance. reserved is what the buyer's payments already in flight
+    will still take, so it is not counted as available.
+    """
+    needed = reserved + amount_wei
+    steps = []
+
+    if balance < needed:
+        logger.info(f"Minting {Web3.from_wei(needed - balance, 'ether')} tokens to buyer...")
+        steps.append((
+            "Token minting",
+            sc.mock_erc20_contract.functions.transfer(buyer.address, needed - balance),
+            sc.owner_account
+        ))
+
+    if allowance < needed:
+        # approve replaces the allowance, so it has to cover the payments in flight too
+        logger.info("Approving contract to spend tokens...")
+        steps.append((
+            "Token approval",
+            sc.mock_erc20_contract.functions.approve(
+                sc.ecommerce_contract.address,
+                max(settings.STANDING_TOKEN_ALLOWANCE, needed)
+            ),
+            buyer
+        ))
+
+    steps.append((
+        "Payment transaction",
+        sc.ecommerce_contract.functions.processTokenPayment(order_id),
+        buyer
+    ))
+    return steps
+
+
+def payment_stages(steps, buyer):
+    """
+    Split token payment steps into groups that can each be submitted back to
+    back: a mint signed by another account first, then the buyer's own
+    transactions, which its nonces keep in order
+    """
+    funding = [step for step in steps if step[2].address != buyer.address]
+    own = [step for step in steps if step[2].address == buyer.address]
+    return [funding, own] if funding else [own]
+
+
+def create_order_steps(sc, orders, buyers):
+    """
+    The createOrder pipeline steps for (amount_wei, token_address) pairs,
+    one per buyer
+    """
+    return [
+        (sc.ecommerce_contract.functions.createOrder(amount_wei, token_address), buyer, 0)
+        for (amount_wei, token_address), buyer in zip(orders, buyers)
+    ]
+
+
+def created_orders(sc, steps, buyers, receipts):
+    """
+    (order_id, buyer_address) per createOrder step from the receipts that
+    came back, with order_id None where the transaction failed or was not
+    submitted
+    """
+    event = sc.ecommerce_contract.events.PaymentPending()
+    results = []
+    for index, buyer in enumerate(buyers):
+        order_id = None
+        if index < len(receipts):
+            sc.gas_profiles.record_receipt(steps[index][0], receipts[index])
+        if index < len(receipts) and receipts[index].status == 1:
+            logs = event.process_receipt(receipts[index])
+            if logs:
+                order_id = logs[0]['args']['orderId']
+        results.append((order_id, buyer.address))
+
+    created = sum(1 for order_id, _ in results if order_id is not None)
+    logger.info(f"Created {created} of {len(buyers)} orders in one batch")
+    return results
+
+
+def cancel_order_steps(sc, statuses, result):
+    """
+    Group the pending orders of pool buyers in statuses (order id ->
+    get_order_status dict) into cancelOrders steps of at most
+    CANCEL_BATCH_SIZE ids per buyer. Other orders are added to
+    result['skipped']. Returns the id chunks and their steps.
+    """
+    chunk_size = max(1, min(settings.CANCEL_BATCH_SIZE, MAX_CANCEL_BATCH))
+    by_buyer = {}
+    for order_id, order in statuses.items():
+        if order['status'] != 0 or order['buyer'] not in sc.buyer_pool:
+            result['skipped'].append(order_id)
+            continue
+        by_buyer.setdefault(order['buyer'], []).append(order_id)
+
+    chunks = []
+    steps = []
+    for buyer_address, ids in by_buyer.items():
+        buyer = sc.buyer_pool.get(buyer_address)
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            chunks.append(chunk)
+            steps.append((sc.ecommerce_contract.functions.cancelOrders(chunk), buyer, 0))
+    return chunks, steps
+
+
+def cancelled_orders(sc, chunks, steps, tx_hashes, receipts, result):
+    """
+    Fill in result's 'cancelled', 'failed' and 'transactions' from the
+    cancelOrders receipts that came back
+    """
+    for index, chunk in enumerate(chunks):
+        if index < len(receipts):
+            sc.gas_profiles.record_receipt(steps[index][0], receipts[index])
+        if index < len(receipts) and receipts[index].status == 1:
+            result['cancelled'].extend(chunk)
+        else:
+            result['failed'].extend(chunk)
+    result['transactions'] = [Web3.to_hex(tx_hash) for tx_hash in tx_hashes]
+
+    logger.info(
+        f"Cancelled {len(result['cancelled'])} orders in {len(tx_hashes)} transactions, "
+        f"{len(result['skipped'])} skipped, {len(result['failed'])} failed"
+    )
+    return result
+
+
+def refund_order_steps(sc, statuses, results):
+    """
+    The owner-signed refund steps for statuses (order id -> get_order_status
+    dict): initiateRefund and processRefund for completed orders, only
+    processRefund for orders already RefundPending. Orders in any other
+    state get an error entry in results. Returns the steps and, per order
+    id, the index of its initiateRefund step (or None) and of its
+    processRefund step.
+    """
+    functions = sc.ecommerce_contract.functions
+    steps = []
+    positions = {}
+    for order_id, order in statuses.items():
+        if order['status'] == 1:
+            positions[order_id] = (len(steps), len(steps) + 1)
+            steps.append((functions.initiateRefund(order_id), sc.owner_account, 0))
+        elif order['status'] == 4:
+            positions[order_id] = (None, len(steps))
+        else:
+            # Only paid orders are refunded, so a Failed one is a failed refund
+            results[order_id] = {
+                'status': None,
+                'tx_hash': None,
+                'error': f"Order is {order_status_from_chain(order['status'], 'Paid')} on chain"
+            }
+            continue
+        steps.append((functions.processRefund(order_id), sc.owner_account, 0))
+    return steps, positions
+
+
+def refunded_orders(sc, steps, positions, tx_hashes, receipts, results):
+    """
+    Fill in results with each refunded order's outcome from the receipts
+    that came back
+    """
+    def receipt_at(index):
+        if index is None or index >= len(receipts):
+            return None
+        sc.gas_profiles.record_receipt(steps[index][0], receipts[index])
+        return receipts[index]
+
+    for order_id, (initiate_index, process_index) in positions.items():
+        initiate_receipt = receipt_at(initiate_index)
+        if initiate_index is not None and initiate_receipt is None:
+            results[order_id] = {'status': None, 'tx_hash': None, 'error': "Refund was not submitted"}
+            continue
+        process_receipt = receipt_at(process_index)
+        status = _refund_outcome(sc.ecommerce_contract, initiate_receipt, process_receipt)
+        results[order_id] = {
+            'status': status,
+            'tx_hash': Web3.to_hex(tx_hashes[process_index]) if process_receipt is not None else None,
+            'error': REFUND_ERRORS.get(status)
+        }
+
+    refunded = sum(1 for result in results.values() if result['status'] == 'Refunded')
+    logger.info(f"Refunded {refunded} of {len(results)} orders in {len(tx_hashes)} transactions")
+    return results
+
+
+def order_from_tuple(order):
+    """
+    The dict get_order_status returns for an EcomercePayment.getOrder result
+    """
+    return {
+        'buyer': order[0],
+        'amount': order[1],
+        'status': order[2],
+        'timestamp': order[3],
+        'payment_token': order[4],
+        'is_token_payment': order[5]
+    }
+
+
+class PipelineError(Exception):
+    """
+    Raised when a transaction in a pipelined sequence could not be submitted.
+    sent holds the hashes of the earlier steps, which were submitted.
+    """
+
+    def __init__(self, step, error, sent=()):
+        super().__init__(f"Step {step} could not be submitted: {error}")
+        self.step = step
+        self.error = error
+        self.sent = list(sent)
+
+
+class NonceManager:
+    """
+    Hands out nonces for a single account without asking the node each time.
+
+    The next nonce is read from the node's `pending` transaction count on first
+    use and after a nonce error; afterwards nonces are allocated atomically in
+    process. Nonces of transactions that never reached the node are released
+    and handed out again first so the account's sequence has no gaps.
+
+    One instance per account serves every client in the process, sync and
+    async, so the client to read the node through is passed to the calls that
+    may need it.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce = None
+        self._released = []
+
+    def allocate(self, w3, count=1):
+        """
+        Reserve nonces for the account. Returns a single nonce, or a sorted list
+        of `count` nonces when more than one is requested.
+        """
+        with self._lock:
+            if self._next_nonce is None:
+                self._set_next(w3.eth.get_transaction_count(self.address, 'pending'))
+            return self._take(count)
+
+    async def async_allocate(self, w3, count=1):
+        if self._next_nonce is None:
+            next_nonce = await w3.eth.get_transaction_count(self.address, 'pending')
+            # Other first allocations may have read the node at the same time;
+            # only the first to get here sets the starting nonce
+            with self._lock:
+                if self._next_nonce is None:
+                    self._set_next(next_nonce)
+        with self._lock:
+            return self._take(count)
+
+    def release(self, nonce):
+        """
+        Return a nonce whose transaction was never accepted by the node
+        """
+        with self._lock:
+            if self._next_nonce is None:
+                return
+            if nonce == self._next_nonce - 1:
+                self._next_nonce -= 1
+                # Fold any released nonces that now sit at the top back in
+                while self._released and max(self._released) == self._next_nonce - 1:
+                    self._released.remove(self._next_nonce - 1)
+                    heapq.heapify(self._released)
+                    self._next_nonce -= 1
+            elif nonce < self._next_nonce and nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+
+    def resync(self, w3):
+        """
+        Discard local state and reload the next nonce from the node
+        """
+        with self._lock:
+            self._set_next(w3.eth.get_transaction_count(self.address, 'pending'))
+
+    async def async_resync(self, w3):
+        next_nonce = await w3.eth.get_transaction_count(self.address, 'pending')
+        with self._lock:
+            self._set_next(next_nonce)
+
+    def _set_next(self, next_nonce):
+        self._next_nonce = next_nonce
+        self._released = []
+        logger.info(f"Nonce for {self.address} synced to {next_nonce}")
+
+    def _take(self, count):
+        nonces = []
+        while len(nonces) < count and self._released:
+            nonces.append(heapq.heappop(self._released))
+        while len(nonces) < count:
+            nonces.append(self._next_nonce)
+            self._next_nonce += 1
+        nonces.sort()
+        return nonces[0] if count == 1 else nonces
+
+
+class ClientState:
+    """
+    Everything about signing that must be shared by every blockchain client
+    in the process: the owner and buyer accounts, one nonce sequence per
+    account, token reservations, learned gas limits and the chain id.
+
+    SmartContract and the AsyncSmartContract of each event loop sign for the
+    same accounts, so they all take their nonces and reservations from here;
+    separate copies would hand out the same nonces to sync and async requests.
+    """
+
     def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(settings.GANACHE_URL))
+        self._lock = threading.Lock()
+        self.chain_id = None
+        self.owner_account = Account.from_key(settings.OWNER_PRIVATE_KEY)
+        self.buyer_pool = BuyerAccountPool(Account, settings.BUYER_PRIVATE_KEYS)
+        self.token_reservations = TokenReservations()
+        self.gas_profiles = GasProfiles(
+            margin=settings.GAS_LIMIT_MARGIN, fallback=settings.GAS_LIMIT_FALLBACK, headroom=settings.GAS_LIMIT_HEADROOM
+        )
+        self._nonce_managers = {}
+
+    def nonce_manager(self, address):
+        with self._lock:
+            manager = self._nonce_managers.get(address)
+            if manager is None:
+                manager = self._nonce_managers[address] = NonceManager(address)
+            return manager
+
+
+_client_state = None
+_client_state_lock = threading.Lock()
+
+
+def get_client_state():
+    """
+    Return the ClientState shared by every blockchain client in this process
+    """
+    global _client_state
+    with _client_state_lock:
+        if _client_state is None:
+            _client_state = ClientState()
+        return _client_state
+
+
+def _http_provider(session=None):
+    provider_kwargs = {'request_kwargs': {'timeout': settings.WEB3_HTTP_TIMEOUT}}
+    if session is not None:
+        provider_kwargs['session'] = session
+    return Web3.HTTPProvider(settings.GANACHE_URL, **provider_kwargs)
+
+
+class SmartContract:
+    def __init__(self, session=None, contract_info=None):
+        self.w3 = Web3(_http_provider(session))
+        self.w3.middleware_onion.add(RPCMetricsMiddleware, name='metrics')
         if not self.w3.is_connected():
             raise ConnectionError("Failed to connect to Ganache")
 
-        self.owner_account = self.w3.eth.account.from_key(settings.OWNER_PRIVATE_KEY)
-        self.buyer_account = self.w3.eth.account.from_key(settings.BUYER_PRIVATE_KEY)
+        self.state = get_client_state()
+        if self.state.chain_id is None:
+            self.state.chain_id = self.w3.eth.chain_id
+        self.chain_id = self.state.chain_id
 
-        self.ecommerce_contract = self._get_contract(
-            settings.ECOMMERCE_CONTRACT_ADDRESS,
-            settings.ECOMMERCE_CONTRACT_ABI
-        )
-        self.mock_erc20_contract = self._get_contract(
-            settings.MOCK_ERC20_CONTRACT_ADDRESS,
-            settings.MOCK_ERC20_CONTRACT_ABI
+        self.owner_account = self.state.owner_account
+        self.buyer_pool = self.state.buyer_pool
+        self.buyer_account = self.buyer_pool.default
+        self.token_reservations = self.state.token_reservations
+        self.gas_profiles = self.state.gas_profiles
+
+        self.load_contracts(contract_info)
+
+        self.receipt_watcher = None
+        if settings.RECEIPT_WATCHER_ENABLED:
+            self.receipt_watcher = ReceiptWatcher(self.w3, poll_interval=settings.RECEIPT_POLL_INTERVAL)
+
+        self.gas_price_oracle = GasPriceOracle(
+            self.w3,
+            interval=settings.GAS_PRICE_REFRESH_INTERVAL,
+            mode=settings.GAS_FEE_MODE,
+            min_priority_fee=settings.GAS_MIN_PRIORITY_FEE
         )
 
     def _get_contract(self, address, abi):
@@ -30,30 +493,204 @@ class SmartContract:
             return None
         return self.w3.eth.contract(address=address, abi=abi)
 
-    def create_order(self, amount_wei, token_address):
+    def load_contracts(self, contract_info=None):
         """
-        Create an order on the blockchain
+        Bind the contracts from a contract-info.json dict, or from settings
+        when contract_info is None
         """
-        if not self.ecommerce_contract:
-            raise Exception("E-commerce contract not initialized")
+        if contract_info is not None:
+            ecommerce_info = contract_info.get('EcomercePayment', {})
+            erc20_info = contract_info.get('MockERC20', {})
+            self.ecommerce_contract = self._get_contract(
+                ecommerce_info.get('address'), ecommerce_info.get('abi')
+            )
+            self.mock_erc20_contract = self._get_contract(
+                erc20_info.get('address'), erc20_info.get('abi')
+            )
+        else:
+            self.ecommerce_contract = self._get_contract(
+                settings.ECOMMERCE_CONTRACT_ADDRESS,
+                settings.ECOMMERCE_CONTRACT_ABI
+            )
+            self.mock_erc20_contract = self._get_contract(
+                settings.MOCK_ERC20_CONTRACT_ADDRESS,
+                settings.MOCK_ERC20_CONTRACT_ABI
+            )
+
+    def reconnect(self, session=None):
+        """
+        Talk to the node through a new HTTP provider. Everything else, the
+        contracts, nonce sequences, reservations and the receipt watcher,
+        belongs to the same Web3 instance and carries over.
+        """
+        self.w3.provider = _http_provider(session)
 
-        nonce = self.w3.eth.get_transaction_count(self.buyer_account.address)
-        tx_data = {
-            'from': self.buyer_account.address,
+    def _nonce_manager(self, address):
+        return self.state.nonce_manager(address)
+
+    def _sign_transaction(self, contract_function, account, nonce, value=0):
+        tx_params = {
+            'from': account.address,
             'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': self.w3.to_wei('20', 'gwei')
+            'chainId': self.chain_id
         }
+        if value:
+            tx_params['value'] = value
+        with timed_operation('build'):
+            tx_params.update(self.gas_price_oracle.fee_fields())
+            tx_params['gas'] = self.gas_profiles.gas_limit(contract_function, tx_params)
+            tx = contract_function.build_transaction(tx_params)
+        with timed_operation('sign'):
+            return self.w3.eth.account.sign_transaction(tx, private_key=account.key)
+
+    def _send_transaction(self, contract_function, account, value=0):
+        """
+        Sign and submit a contract call using a locally allocated nonce.
+        Returns the transaction hash without waiting for it to be mined.
+        """
+        nonces = self._nonce_manager(account.address)
+        for attempt in range(2):
+            with span('nonce'):
+                nonce = nonces.allocate(self.w3)
+            try:
+                signed_tx = self._sign_transaction(contract_function, account, nonce, value)
+                with timed_operation('send'):
+                    return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception as e:
+                if _is_nonce_error(e) and attempt == 0:
+                    logger.warning(f"Nonce {nonce} rejected for {account.address}, resyncing: {e}")
+                    nonces.resync(self.w3)
+                    continue
+                nonces.release(nonce)
+                raise
 
+    def send_eth(self, account, to, value):
+        """
+        Submit a plain ETH transfer and return its hash without waiting for it
+        to be mined
+        """
+        nonces = self._nonce_manager(account.address)
+        with span('nonce'):
+            nonce = nonces.allocate(self.w3)
+        tx = {
+            'to': to,
+            'value': value,
+            'gas': ETH_TRANSFER_GAS,
+            'nonce': nonce,
+            'chainId': self.chain_id
+        }
+        tx.update(self.gas_price_oracle.fee_fields())
+        try:
+            with timed_operation('sign'):
+                signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=account.key)
+            with timed_operation('send'):
+                return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception as e:
+            if _is_nonce_error(e):
+                nonces.resync(self.w3)
+            else:
+                nonces.release(nonce)
+            raise
+
+    def eth_transfer_cost(self):
+        """
+        Most a send_eth transfer can cost its sender in gas at the current fees
+        """
+        fees = self.gas_price_oracle.fee_fields()
+        return ETH_TRANSFER_GAS * fees.get('maxFeePerGas', fees.get('gasPrice', 0))
+
+    def _wait_for_receipt(self, tx_hash, account):
         try:
-            tx = self.ecommerce_contract.functions.createOrder(
-                amount_wei,
-                token_address
-            ).build_transaction(tx_data)
+            with timed_operation('wait'):
+                if self.receipt_watcher is not None:
+                    return self.receipt_watcher.wait(tx_hash, timeout=settings.RECEIPT_TIMEOUT)
+                return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=settings.RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            # The transaction may have been dropped, leaving a gap in the nonce sequence
+            self._nonce_manager(account.address).resync(self.w3)
+            raise
+
+    def _transact(self, contract_function, account, value=0):
+        with self.buyer_pool.busy(account), span('transaction', function=contract_function.fn_name):
+            tx_hash = self._send_transaction(contract_function, account, value)
+            receipt = self._wait_for_receipt(tx_hash, account)
+        self.gas_profiles.record_receipt(contract_function, receipt)
+        return tx_hash, receipt
+
+    def _send_pipeline(self, steps):
+        """
+        Sign a sequence of (contract_function, account, value) calls with
+        consecutive nonces and submit them back to back without waiting for
+        any of them to be mined. Returns the transaction hashes in step order.
+
+        If the first transaction is rejected for its nonce, nothing has reached
+        the node yet, so the sequence is signed again once with resynced nonces.
+        """
+        for attempt in range(2):
+            try:
+                return self._submit_pipeline(steps)
+            except PipelineError as e:
+                if attempt == 0 and not e.sent and _is_nonce_error(e.error):
+                    logger.warning(f"Pipeline nonce rejected, resubmitting with resynced nonces: {e.error}")
+                    continue
+                raise
+
+    def _submit_pipeline(self, steps):
+        nonces_by_account = {}
+        for _, account, _ in steps:
+            nonces_by_account[account.address] = nonces_by_account.get(account.address, 0) + 1
+        allocated = {}
+        with span('nonce', transactions=len(steps)):
+            for address, count in nonces_by_account.items():
+                nonces = self._nonce_manager(address).allocate(self.w3, count)
+                allocated[address] = [nonces] if count == 1 else nonces
 
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.buyer_account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        signed_txs = []
+        for contract_function, account, value in steps:
+            nonce = allocated[account.address].pop(0)
+            signed_txs.append((account, nonce, self._sign_transaction(contract_function, account, nonce, value)))
+
+        tx_hashes = []
+        for index, (account, nonce, signed_tx) in enumerate(signed_txs):
+            try:
+                with timed_operation('send'):
+                    tx_hashes.append(self.w3.eth.send_raw_transaction(signed_tx.raw_transaction))
+            except Exception as e:
+                # Later steps were never submitted, hand their nonces back
+                for unsent_account, unsent_nonce, _ in reversed(signed_txs[index:]):
+                    self._nonce_manager(unsent_account.address).release(unsent_nonce)
+                if _is_nonce_error(e):
+                    self._nonce_manager(account.address).resync(self.w3)
+                raise PipelineError(index, e, tx_hashes)
+        return tx_hashes
+
+    def _wait_for_receipts(self, tx_hashes, accounts):
+        if self.receipt_watcher is None:
+            return [
+                self._wait_for_receipt(tx_hash, account)
+                for tx_hash, account in zip(tx_hashes, accounts)
+            ]
+        try:
+            with timed_operation('wait'):
+                return self.receipt_watcher.wait_all(tx_hashes, timeout=settings.RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            for address in {account.address for account in accounts}:
+                self._nonce_manager(address).resync(self.w3)
+            raise
+
+    def create_order(self, amount_wei, token_address):
+        """
+        Create an order on the blockchain
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        try:
+            buyer = self.buyer_pool.least_busy()
+            tx_hash, receipt = self._transact(
+                self.ecommerce_contract.functions.createOrder(amount_wei, token_address),
+                buyer
+            )
 
             if receipt.status == 0:
                 raise Exception("Transaction failed")
@@ -65,16 +702,115 @@ class SmartContract:
             
             order_id = logs[0]['args']['orderId']
             logger.info(f"Order created successfully with ID: {order_id}")
-            return order_id, self.buyer_account.address
+            return order_id, buyer.address
 
         except ContractLogicError as e:
             raise Exception(f"Smart contract error: {e}")
         except Exception as e:
             raise Exception(f"Error creating order on blockchain: {e}")
 
-    def process_payment(self, order_id, amount_wei):
+    def create_orders(self, orders):
+        """
+        Create several orders at once from (amount_wei, token_address) pairs.
+
+        The createOrder transactions are spread over the buyer pool, signed
+        with consecutive nonces and submitted back to back, and their receipts
+        are collected together. Returns one (order_id, buyer_address) pair per
+        order in the same order, with order_id None where the transaction
+        failed or could not be submitted.
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+        if not orders:
+            return []
+
+        buyers = [self.buyer_pool.least_busy() for _ in orders]
+        steps = create_order_steps(self, orders, buyers)
+
+        try:
+            with self.buyer_pool.busy(*buyers):
+                try:
+                    tx_hashes = self._send_pipeline(steps)
+                except PipelineError as e:
+                    if not e.sent:
+                        raise
+                    # Still collect the orders that made it into the pool
+                    logger.error(f"Only {len(e.sent)} of {len(steps)} createOrder transactions submitted: {e.error}")
+                    tx_hashes = e.sent
+                receipts = self._wait_for_receipts(tx_hashes, buyers[:len(tx_hashes)])
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error: {e}")
+        except Exception as e:
+            raise Exception(f"Error creating orders on blockchain: {e}")
+
+        return created_orders(self, steps, buyers, receipts)
+
+    def fund_accounts(self, eth_transfers, token_transfers):
+        """
+        Send (sender_account, recipient, amount) ETH transfers and then
+        MockERC20 token transfers. Each group is submitted back to back and
+        confirmed together; ETH goes first so accounts passing on tokens can
+        pay for gas. Raises if any transfer fails.
+        """
+        if token_transfers and not self.mock_erc20_contract:
+            raise Exception("ERC20 contract not initialized")
+
+        tx_hashes = [self.send_eth(sender, recipient, amount) for sender, recipient, amount in eth_transfers]
+        self._check_transfers(tx_hashes, [sender for sender, _, _ in eth_transfers], 'ETH transfer')
+
+        steps = [
+            (self.mock_erc20_contract.functions.transfer(recipient, amount), sender, 0)
+            for sender, recipient, amount in token_transfers
+        ]
+        if steps:
+            try:
+                tx_hashes = self._send_pipeline(steps)
+            except PipelineError as e:
+                raise Exception(f"Token transfer {e.step + 1} of {len(steps)} could not be submitted: {e.error}")
+            receipts = self._check_transfers(tx_hashes, [account for _, account, _ in steps], 'token transfer')
+            for (contract_function, _, _), receipt in zip(steps, receipts):
+                self.gas_profiles.record_receipt(contract_function, receipt)
+
+    def _check_transfers(self, tx_hashes, accounts, label):
+        if not tx_hashes:
+            return []
+        receipts = self._wait_for_receipts(tx_hashes, accounts)
+        failed = sum(1 for receipt in receipts if receipt.status == 0)
+        if failed:
+            raise Exception(f"{failed} of {len(receipts)} {label}s failed")
+        return receipts
+
+    def get_token_position(self, address):
+        """
+        Read an account's token balance and the allowance it has granted the
+        e-commerce contract in a single batched RPC
+        """
+        with self.w3.batch_requests() as batch:
+            batch.add(self.mock_erc20_contract.functions.balanceOf(address))
+            batch.add(self.mock_erc20_contract.functions.allowance(address, self.ecommerce_contract.address))
+            balance, allowance = batch.execute()
+        return balance, allowance
+
+    def _token_payment_steps(self, order_id, amount_wei, buyer):
+        """
+        Work out which of the mint, approve and payment transactions a token
+        payment actually needs, given the buyer's current balance and
+        allowance and the payments it already has in flight. Call with the
+        buyer's reservation lock held.
+        """
+        balance, allowance = self.get_token_position(buyer.address)
+        return token_payment_steps(
+            self, order_id, amount_wei, buyer, balance, allowance,
+            reserved=self.token_reservations.reserved(buyer.address)
+        )
+
+    def process_payment(self, order_id, amount_wei, buyer_address=None):
         """
-        Process payment for an order
+        Process payment for an order.
+
+        Transfer and approve transactions are only sent when the buyer's token
+        balance or allowance does not already cover the amount, after what
+        the buyer's other in-flight payments will take.
         """
         if not self.ecommerce_contract or not self.mock_erc20_contract:
             raise Exception("Contracts not initialized")
@@ -82,63 +818,18 @@ class SmartContract:
         logger.info(f"Starting payment process for order {order_id}")
 
         try:
-            # 1. Mint tokens to buyer (owner transfers tokens to buyer)
-            logger.info(f"Minting {Web3.from_wei(amount_wei, 'ether')} tokens to buyer...")
-            nonce_mint = self.w3.eth.get_transaction_count(self.owner_account.address)
-            mint_tx = self.mock_erc20_contract.functions.transfer(
-                self.buyer_account.address, amount_wei
-            ).build_transaction({
-                'from': self.owner_account.address,
-                'nonce': nonce_mint,
-                'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            signed_mint_tx = self.w3.eth.account.sign_transaction(mint_tx, private_key=self.owner_account.key)
-            mint_tx_hash = self.w3.eth.send_raw_transaction(signed_mint_tx.raw_transaction)
-            mint_receipt = self.w3.eth.wait_for_transaction_receipt(mint_tx_hash)
-            
-            if mint_receipt.status == 0:
-                raise Exception("Token minting failed")
-            
-            logger.info("Tokens minted successfully")
-
-            # 2. Approve spending
-            logger.info("Approving contract to spend tokens...")
-            nonce_approve = self.w3.eth.get_transaction_count(self.buyer_account.address)
-            approve_tx = self.mock_erc20_contract.functions.approve(
-                self.ecommerce_contract.address, amount_wei
-            ).build_transaction({
-                'from': self.buyer_account.address,
-                'nonce': nonce_approve,
-                'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            signed_approve_tx = self.w3.eth.account.sign_transaction(approve_tx, private_key=self.buyer_account.key)
-            approve_tx_hash = self.w3.eth.send_raw_transaction(signed_approve_tx.raw_transaction)
-            approve_receipt = self.w3.eth.wait_for_transaction_receipt(approve_tx_hash)
-            
-            if approve_receipt.status == 0:
-                raise Exception("Token approval failed")
-            
-            logger.info("Token approval successful")
-
-            # 3. Process payment
-            logger.info("Processing payment...")
-            nonce_payment = self.w3.eth.get_transaction_count(self.buyer_account.address)
-            payment_tx = self.ecommerce_contract.functions.processTokenPayment(
-                order_id
-            ).build_transaction({
-                'from': self.buyer_account.address,
-                'nonce': nonce_payment,
-                'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            signed_payment_tx = self.w3.eth.account.sign_transaction(payment_tx, private_key=self.buyer_account.key)
-            payment_tx_hash = self.w3.eth.send_raw_transaction(signed_payment_tx.raw_transaction)
-            payment_receipt = self.w3.eth.wait_for_transaction_receipt(payment_tx_hash)
-
-            if payment_receipt.status == 0:
-                raise Exception("Payment transaction failed")
+            buyer = self.buyer_pool.get(buyer_address)
+            if settings.PIPELINED_TOKEN_PAYMENTS:
+                payment_tx_hash = self._process_payment_pipelined(order_id, amount_wei, buyer)
+            else:
+                # Every step is confirmed before the next, so nothing is left in flight
+                with self.token_reservations.lock(buyer.address):
+                    for label, contract_function, account in self._token_payment_steps(order_id, amount_wei, buyer):
+                        tx_hash, receipt = self._transact(contract_function, account)
+                        if receipt.status == 0:
+                            raise Exception(f"{label} failed")
+                        logger.info(f"{label} successful")
+                payment_tx_hash = tx_hash
 
             logger.info(f"Payment processed successfully for order {order_id}")
             return payment_tx_hash
@@ -148,6 +839,78 @@ class SmartContract:
         except Exception as e:
             raise Exception(f"Error processing payment: {e}")
 
+    def _process_payment_pipelined(self, order_id, amount_wei, buyer):
+        """
+        Submit the payment transactions back to back and wait for their
+        receipts together, so a payment costs one confirmation instead of one
+        per step.
+
+        Only transactions from the same sender are ordered by their nonces, so
+        a mint from the owner is confirmed before the buyer's approve and
+        payment are sent; otherwise a node that is not automining could mine
+        the payment first and revert it. The buyer's own approve and payment
+        still go out together.
+
+        The buyer's reservation lock is held from reading the balance and
+        allowance until the first transactions are submitted, and the amount
+        stays reserved until the receipts are in.
+        """
+        reservations = self.token_reservations
+        with self.buyer_pool.busy(buyer):
+            with reservations.lock(buyer.address):
+                steps = self._token_payment_steps(order_id, amount_wei, buyer)
+                stages = payment_stages(steps, buyer)
+                tx_hashes = self._submit_payment_steps(stages[0])
+                reservations.reserve(buyer.address, amount_wei)
+            try:
+                self._confirm_payment_steps(stages[0], tx_hashes)
+                for stage in stages[1:]:
+                    tx_hashes = self._submit_payment_steps(stage)
+                    self._confirm_payment_steps(stage, tx_hashes)
+            finally:
+                reservations.release(buyer.address, amount_wei)
+        return tx_hashes[-1]
+
+    def _submit_payment_steps(self, steps):
+        try:
+            return self._send_pipeline([(fn, account, 0) for _, fn, account in steps])
+        except PipelineError as e:
+            raise Exception(f"{steps[e.step][0]} could not be submitted: {e.error}")
+
+    def _confirm_payment_steps(self, steps, tx_hashes):
+        receipts = self._wait_for_receipts(tx_hashes, [account for _, _, account in steps])
+        for (label, contract_function, _), receipt in zip(steps, receipts):
+            self.gas_profiles.record_receipt(contract_function, receipt)
+            if receipt.status == 0:
+                raise Exception(f"{label} failed")
+
+    def process_eth_payment(self, order_id, amount_wei, buyer_address=None):
+        """
+        Pay for an ETH order with a single processEthPayment transaction
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        logger.info(f"Starting ETH payment for order {order_id}")
+
+        try:
+            tx_hash, receipt = self._transact(
+                self.ecommerce_contract.functions.processEthPayment(order_id),
+                self.buyer_pool.get(buyer_address),
+                value=amount_wei
+            )
+
+            if receipt.status == 0:
+                raise Exception("Payment transaction failed")
+
+            logger.info(f"ETH payment processed successfully for order {order_id}")
+            return tx_hash
+
+        except ContractLogicError as e:
+            raise Exception(f"Smart contract error during payment: {e}")
+        except Exception as e:
+            raise Exception(f"Error processing ETH payment: {e}")
+
     def get_order_status(self, order_id):
         """
         Get order status from blockchain
@@ -157,17 +920,46 @@ class SmartContract:
 
         try:
             order = self.ecommerce_contract.functions.getOrder(order_id).call()
-            return {
-                'buyer': order[0],
-                'amount': order[1],
-                'status': order[2],
-                'timestamp': order[3],
-                'payment_token': order[4],
-                'is_token_payment': order[5]
-            }
+            return order_from_tuple(order)
         except Exception as e:
             raise Exception(f"Error getting order status: {e}")
 
+    def refund_failed(self, order_id, buyer_address, from_block=0):
+        """
+        Whether the contract emitted RefundFailed for order_id at or after
+        from_block. orderId is not an indexed argument, so the buyer's
+        RefundFailed logs are read and matched here. Callers pass the
+        indexer's first unscanned block, since earlier RefundFailed events
+        have already moved the order to RefundFailed in the database.
+        """
+        logs = self.ecommerce_contract.events.RefundFailed().get_logs(
+            argument_filters={'buyer': buyer_address}, from_block=from_block
+        )
+        return any(log['args']['orderId'] == order_id for log in logs)
+
+    def get_order_statuses(self, order_ids):
+        """
+        Get the status of many orders, packing the getOrder calls into JSON-RPC
+        batch requests. Returns a dict keyed by order id.
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        order_ids = list(order_ids)
+        statuses = {}
+        try:
+            for i in range(0, len(order_ids), settings.GET_ORDER_BATCH_SIZE):
+                chunk = order_ids[i:i + settings.GET_ORDER_BATCH_SIZE]
+                with self.w3.batch_requests() as batch:
+                    for order_id in chunk:
+                        batch.add(self.ecommerce_contract.functions.getOrder(order_id))
+                    results = batch.execute()
+                for order_id, order in zip(chunk, results):
+                    statuses[order_id] = order_from_tuple(order)
+            return statuses
+        except Exception as e:
+            raise Exception(f"Error getting order statuses: {e}")
+
     def get_buyer_balance(self):
         """
         Get buyer's token balance
@@ -194,7 +986,7 @@ class SmartContract:
         except Exception as e:
             raise Exception(f"Error getting contract balance: {e}")
 
-    def cancel_order(self, order_id):
+    def cancel_order(self, order_id, buyer_address=None):
         """
         Cancel an order
         """
@@ -202,17 +994,10 @@ class SmartContract:
             raise Exception("E-commerce contract not initialized")
 
         try:
-            nonce = self.w3.eth.get_transaction_count(self.buyer_account.address)
-            tx = self.ecommerce_contract.functions.cancelOrders([order_id]).build_transaction({
-                'from': self.buyer_account.address,
-                'nonce': nonce,
-                'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.buyer_account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hash, receipt = self._transact(
+                self.ecommerce_contract.functions.cancelOrders([order_id]),
+                self.buyer_pool.get(buyer_address)
+            )
             
             if receipt.status == 0:
                 raise Exception("Order cancellation failed")
@@ -223,6 +1008,47 @@ class SmartContract:
         except Exception as e:
             raise Exception(f"Error cancelling order: {e}")
 
+    def cancel_orders(self, order_ids):
+        """
+        Cancel many orders with as few cancelOrders transactions as possible.
+
+        A cancelOrders call reverts as a whole if any of its ids is not
+        pending or belongs to another buyer, so the orders are read first in
+        one batch and only pending orders of pool buyers are sent, grouped by
+        buyer in chunks of CANCEL_BATCH_SIZE ids. Each chunk size gets its own
+        gas profile. The chunks are submitted back to back and confirmed
+        together.
+
+        Returns a dict with the 'cancelled', 'skipped' and 'failed' order ids
+        and the hashes of the submitted 'transactions'.
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+
+        result = {'cancelled': [], 'skipped': [], 'failed': [], 'transactions': []}
+        if not order_ids:
+            return result
+
+        try:
+            chunks, steps = cancel_order_steps(self, self.get_order_statuses(order_ids), result)
+            if not steps:
+                return result
+
+            accounts = [account for _, account, _ in steps]
+            with self.buyer_pool.busy(*accounts):
+                try:
+                    tx_hashes = self._send_pipeline(steps)
+                except PipelineError as e:
+                    if not e.sent:
+                        raise
+                    logger.error(f"Only {len(e.sent)} of {len(steps)} cancelOrders transactions submitted: {e.error}")
+                    tx_hashes = e.sent
+                receipts = self._wait_for_receipts(tx_hashes, accounts[:len(tx_hashes)])
+        except Exception as e:
+            raise Exception(f"Error cancelling orders: {e}")
+
+        return cancelled_orders(self, chunks, steps, tx_hashes, receipts, result)
+
     def initiate_refund(self, order_id):
         """
         Initiate a refund for an order
@@ -231,17 +1057,11 @@ class SmartContract:
             raise Exception("E-commerce contract not initialized")
 
         try:
-            nonce = self.w3.eth.get_transaction_count(self.buyer_account.address)
-            tx = self.ecommerce_contract.functions.initiateRefund(order_id).build_transaction({
-                'from': self.buyer_account.address,
-                'nonce': nonce,
-                'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.buyer_account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            # initiateRefund is onlyOwner
+            tx_hash, receipt = self._transact(
+                self.ecommerce_contract.functions.initiateRefund(order_id),
+                self.owner_account
+            )
             
             if receipt.status == 0:
                 raise Exception("Refund initiation failed")
@@ -252,6 +1072,45 @@ class SmartContract:
         except Exception as e:
             raise Exception(f"Error initiating refund: {e}")
 
+    def refund_orders(self, order_ids):
+        """
+        Refund many paid orders with initiateRefund and processRefund.
+
+        The orders are read in one batch: completed orders get both
+        transactions, orders already RefundPending only processRefund, and
+        anything else is skipped. All transactions are signed by the owner
+        (both functions are onlyOwner) with consecutive nonces, so every
+        processRefund is mined after its initiateRefund, and the whole batch
+        is submitted back to back and confirmed together.
+
+        Returns a dict keyed by order id with the order's new 'status'
+        ('Refunded', 'RefundFailed' or 'RefundPending', None if nothing
+        changed), the processRefund 'tx_hash' and an 'error' message.
+        """
+        if not self.ecommerce_contract:
+            raise Exception("E-commerce contract not initialized")
+        if not order_ids:
+            return {}
+
+        results = {}
+        try:
+            steps, positions = refund_order_steps(self, self.get_order_statuses(order_ids), results)
+            if not steps:
+                return results
+
+            try:
+                tx_hashes = self._send_pipeline(steps)
+            except PipelineError as e:
+                if not e.sent:
+                    raise
+                logger.error(f"Only {len(e.sent)} of {len(steps)} refund transactions submitted: {e.error}")
+                tx_hashes = e.sent
+            receipts = self._wait_for_receipts(tx_hashes, [self.owner_account] * len(tx_hashes))
+        except Exception as e:
+            raise Exception(f"Error refunding orders: {e}")
+
+        return refunded_orders(self, steps, positions, tx_hashes, receipts, results)
+
     def get_connection_info(self):
         """
         Get connection information for debugging
@@ -262,6 +1121,159 @@ class SmartContract:
             'latest_block': self.w3.eth.block_number,
             'owner_address': self.owner_account.address,
             'buyer_address': self.buyer_account.address,
+            'buyer_pool': [account.address for account in self.buyer_pool.accounts],
             'ecommerce_contract_address': self.ecommerce_contract.address if self.ecommerce_contract else None,
             'mock_erc20_contract_address': self.mock_erc20_contract.address if self.mock_erc20_contract else None
         }
+
+
+def _build_http_session():
+    """
+    Build a keep-alive HTTP session whose connection pool is shared by all
+    threads talking to the node
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.WEB3_HTTP_POOL_SIZE,
+        max_retries=0
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _contract_info_mtime():
+    try:
+        return os.path.getmtime(settings.CONTRACT_INFO_PATH)
+    except OSError:
+        return None
+
+
+class SmartContractRegistry:
+    """
+    Process-wide holder for a shared SmartContract.
+
+    The client is built lazily on first use and reused by every request in the
+    worker process for the life of the process, so its receipt watcher is
+    never duplicated. A daemon thread periodically checks the node connection
+    and the contract-info file: a changed file rebinds the contracts of every
+    client in the process, and WEB3_HEALTH_CHECK_FAILURES failed
+    checks in a row give the client a fresh HTTP session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._instance = None
+        self._contract_info = None
+        self._contract_info_mtime = None
+        self._failures = 0
+        self._monitor = None
+
+    def get(self):
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._build()
+            self._ensure_monitor()
+            return self._instance
+
+    def contract_info(self):
+        """
+        The contract-info.json dict loaded after a redeploy, or None while
+        the contracts in settings are current
+        """
+        with self._lock:
+            self._ensure_monitor()
+        return self._contract_info
+
+    def reconnect(self):
+        """
+        Give the shared client a new HTTP session to the node
+        """
+        with self._lock:
+            if self._instance is not None:
+                self._instance.reconnect(_build_http_session())
+                logger.info(f"Reconnected shared SmartContract to {settings.GANACHE_URL}")
+
+    def _build(self):
+        self._contract_info_mtime = _contract_info_mtime()
+        instance = SmartContract(session=_build_http_session(), contract_info=self._contract_info)
+        logger.info(f"Built shared SmartContract for {settings.GANACHE_URL}")
+        return instance
+
+    def _reload_contracts(self, mtime):
+        # Contracts were redeployed since settings were loaded
+        with open(settings.CONTRACT_INFO_PATH) as f:
+            contract_info = json.load(f)
+        with self._lock:
+            self._contract_info = contract_info
+            self._contract_info_mtime = mtime
+            if self._instance is not None:
+                self._instance.load_contracts(contract_info)
+        logger.info("Contract info changed, reloaded the shared SmartContract's contracts")
+
+    def _ensure_monitor(self):
+        if self._monitor is not None or settings.WEB3_HEALTH_CHECK_INTERVAL <= 0:
+            return
+        if self._contract_info_mtime is None:
+            self._contract_info_mtime = _contract_info_mtime()
+        self._monitor = threading.Thread(
+            target=self._monitor_loop,
+            name='smart-contract-health',
+            daemon=True
+        )
+        self._monitor.start()
+
+    def _monitor_loop(self):
+        stop = threading.Event()
+        while not stop.wait(settings.WEB3_HEALTH_CHECK_INTERVAL):
+            try:
+                self._check()
+            except Exception as e:
+                logger.warning(f"Shared SmartContract health check failed: {e}")
+
+    def _check(self):
+        mtime = _contract_info_mtime()
+        if mtime is not None and mtime != self._contract_info_mtime:
+            self._reload_contracts(mtime)
+        instance = self._instance
+        if instance is None:
+            return
+        try:
+            connected = instance.w3.is_connected()
+        except Exception:
+            connected = False
+        if connected:
+            self._failures = 0
+            return
+        # A single failed check may be a blip; only a node that stays
+        # unreachable gets a new session
+        self._failures += 1
+        logger.warning(
+            f"Blockchain node unreachable ({self._failures} of {settings.WEB3_HEALTH_CHECK_FAILURES} checks)"
+        )
+        if self._failures >= settings.WEB3_HEALTH_CHECK_FAILURES:
+            self._failures = 0
+            self.reconnect()
+
+
+_registry = SmartContractRegistry()
+
+
+def get_smart_contract():
+    """
+    Return the SmartContract shared by this worker process
+    """
+    return _registry.get()
+
+
+def get_contract_info():
+    """
+    Return the contract-info.json dict the process' clients should bind their
+    contracts from, or None to use the contracts in settings
+    """
+    return _registry.contract_info()
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+
+ORDER_STATUS_KEY = 'order-status:{}'
+CATALOG_MODIFIED_KEY = 'catalog-modified:{}'
+CATALOG_DELETIONS_KEY = 'catalog-deletions'
+CATALOG_PAGE_KEY = 'catalog:{}:{}'
+# Long enough that Last-Modified stays put for an unchanged catalog, short
+# enough that the keys of superseded versions do not pile up
+CATALOG_MODIFIED_TIMEOUT = 24 * 60 * 60
+
+_inflight_lock = threading.Lock()
+_inflight = {}
+_async_inflight = weakref.WeakKeyDictionary()
+
+
+def order_status_key(order_id_chain):
+    return ORDER_STATUS_KEY.format(order_id_chain)
+
+
+def get_or_load(key, loader, timeout):
+    """
+    Read-through cache lookup. Concurrent misses for the same key in this
+    process are coalesced so only one caller runs the loader.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _inflight_lock:
+        lock = _inflight.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            # Another caller may have loaded the value while we waited
+            value = cache.get(key)
+            if value is None:
+                value = loader()
+                cache.set(key, value, timeout)
+            return value
+    finally:
+        with _inflight_lock:
+            if _inflight.get(key) is lock and not lock.locked():
+                del _inflight[key]
+
+
+async def aget_or_load(key, loader, timeout):
+    """
+    asyncio version of get_or_load; concurrent misses on the same event loop
+    await a single load task
+    """
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    loads = _async_inflight.setdefault(asyncio.get_running_loop(), {})
+    task = loads.get(key)
+    if task is None:
+        async def load():
+            try:
+                value = await loader()
+                await cache.aset(key, value, timeout)
+                return value
+            finally:
+                loads.pop(key, None)
+        task = loads[key] = asyncio.ensure_future(load())
+    return await asyncio.shield(task)
+
+
+def get_order_status(order_id_chain, loader):
+    """
+    Cached order status payload for an on-chain order id
+    """
+    return get_or_load(order_status_key(order_id_chain), loader, settings.ORDER_STATUS_CACHE_TTL)
+
+
+async def aget_order_status(order_id_chain, loader):
+    """
+    asyncio version of get_order_status; loader is a coroutine function
+    """
+    return await aget_or_load(order_status_key(order_id_chain), loader, settings.ORDER_STATUS_CACHE_TTL)
+
+
+def invalidate_order_status(*order_id_chains):
+    cache.delete_many([order_status_key(order_id_chain) for order_id_chain in order_id_chains])
+
+
+async def ainvalidate_order_status(*order_id_chains):
+    await cache.adelete_many([order_status_key(order_id_chain) for order_id_chain in order_id_chains])
+
+
+def catalog_state(request=None):
+    """
+    Current catalog version and the time it was last changed, read once per
+    request. The version is derived from the Product table itself (latest
+    updated_at and highest id, both read from an index) plus a deletion stamp
+    bumped by the post_delete signal, so edits, additions and deletions made
+    by the admin, seed_products or another worker change it at once and every
+    cached page and ETag with it.
+    """
+    state = getattr(request, '_catalog_state', None)
+    if state is None:
+        state = _read_catalog_state()
+        if request is not None:
+            request._catalog_state = state
+    return state
+
+
+def _read_catalog_state():
+    from .models import Product
+
+    latest = Product.objects.aggregate(updated=Max('updated_at'), last_id=Max('id'))
+    version = hashlib.sha1(repr((latest['updated'], latest['last_id'], _deletion_stamp())).encode()).hexdigest()
+    # Deletions leave no timestamp behind, so a version counts as changed
+    # when it is first served; workers sharing a cache agree on that time.
+    # HTTP dates have one second resolution.
+    key = CATALOG_MODIFIED_KEY.format(version)
+    now = timezone.now().replace(microsecond=0)
+    cache.add(key, now, CATALOG_MODIFIED_TIMEOUT)
+    return {'version': version, 'modified': cache.get(key) or now}
+
+
+def _deletion_stamp():
+    # A fresh stamp is taken if the key was evicted, so losing it only costs
+    # one extra cache miss and never brings back the version of an older catalog
+    stamp = cache.get(CATALOG_DELETIONS_KEY)
+    if stamp is None:
+        cache.add(CATALOG_DELETIONS_KEY, time.time_ns(), None)
+        stamp = cache.get(CATALOG_DELETIONS_KEY)
+    return stamp
+
+
+def bump_catalog_version(sender, **kwargs):
+    """
+    post_delete receiver for Product. A deleted row that was neither the
+    newest nor the last edited leaves both aggregates unchanged, so the
+    deletion is recorded in the catalog version through the cache instead.
+    """
+    cache.set(CATALOG_DELETIONS_KEY, time.time_ns(), None)
+
+
+def _catalog_variant(request):
+    # Every query parameter that changes the payload, plus the host because
+    # image URLs are absolute
+    params = sorted(
+        (name, request.GET.get(name, '')) for name in ('fields', 'page', 'page_size') if name in request.GET
+    )
+    return hashlib.sha1(repr((request.get_host(), params)).encode()).hexdigest()
+
+
+def catalog_etag(request, *args, **kwargs):
+    return f"{catalog_state(request)['version']}-{_catalog_variant(request)}"
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return catalog_state(request)['modified']
+
+
+def catalog_page_key(request):
+    return CATALOG_PAGE_KEY.format(catalog_state(request)['version'], _catalog_variant(request))
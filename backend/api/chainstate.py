@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.utils import timezone
+from web3 import Web3
+from .blockchain import get_smart_contract
+import logging
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_chain_state(sc):
+    """
+    Read the head block and the watched token balances with a single batched
+    JSON-RPC request
+    """
+    if not sc.mock_erc20_contract or not sc.ecommerce_contract:
+        raise Exception("Contracts not initialized")
+
+    buyers = sc.buyer_pool.accounts
+    with sc.w3.batch_requests() as batch:
+        batch.add(sc.w3.eth.get_block('latest'))
+        batch.add(sc.mock_erc20_contract.functions.balanceOf(sc.ecommerce_contract.address))
+        for account in buyers:
+            batch.add(sc.mock_erc20_contract.functions.balanceOf(account.address))
+        latest_block, contract_balance, *buyer_balances = batch.execute()
+
+    buyer_balances = {
+        account.address: float(Web3.from_wei(balance, 'ether'))
+        for account, balance in zip(buyers, buyer_balances)
+    }
+    return {
+        'is_connected': True,
+        'chain_id': sc.chain_id,
+        'latest_block': latest_block['number'],
+        'latest_block_timestamp': latest_block['timestamp'],
+        'owner_address': sc.owner_account.address,
+        'buyer_address': sc.buyer_account.address,
+        'buyer_pool': [account.address for account in buyers],
+        'ecommerce_contract_address': sc.ecommerce_contract.address,
+        'mock_erc20_contract_address': sc.mock_erc20_contract.address,
+        'buyer_balance': buyer_balances[sc.buyer_account.address],
+        'buyer_balances': buyer_balances,
+        'contract_balance': float(Web3.from_wei(contract_balance, 'ether')),
+    }
+
+
+class ChainStateTracker:
+    """
+    Process-wide snapshot of the chain state.
+
+    A daemon thread re-reads the head block and token balances every interval
+    and publishes the result, so health probes and dashboards read the latest
+    snapshot without a round trip to the node. When a refresh fails the last
+    good snapshot stays published with is_connected set to False.
+    """
+
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._updated_at = None
+        self._thread = None
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return settings.CHAIN_STATE_REFRESH_INTERVAL
+
+    def current(self):
+        """
+        The published snapshot, or None before the first refresh; never
+        touches the node
+        """
+        self._ensure_thread()
+        snapshot, updated_at = self._snapshot, self._updated_at
+        if snapshot is None:
+            return None
+        return dict(snapshot, snapshot_age=round(time.monotonic() - updated_at, 3))
+
+    def snapshot(self):
+        """
+        The published snapshot, reading the chain first if nothing has been
+        published yet or background refreshes are disabled
+        """
+        if self.interval <= 0 or self._snapshot is None:
+            with self._lock:
+                if self.interval <= 0 or self._snapshot is None:
+                    self.refresh(raise_errors=True)
+        return self.current()
+
+    def refresh(self, raise_errors=False):
+        try:
+            state = read_chain_state(get_smart_contract())
+            state['updated_at'] = timezone.now().isoformat()
+        except Exception as e:
+            if raise_errors or self._snapshot is None:
+                raise
+            logger.warning(f"Chain state refresh failed, keeping the last snapshot: {e}")
+            self._snapshot = dict(self._snapshot, is_connected=False, error=str(e))
+            return
+        self._snapshot, self._updated_at = state, time.monotonic()
+
+    def _ensure_thread(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name='chain-state', daemon=True)
+                self._thread.start()
+
+    def _refresh_loop(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Chain state refresh failed: {e}")
+
+
+_tracker = ChainStateTracker()
+
+
+def get_chain_state():
+    """
+    Return the chain state snapshot shared by this worker process
+    """
+    return _tracker.snapshot()
+
+
+def peek_chain_state():
+    """
+    Return the published chain state snapshot, or None if there is none yet
+    """
+    return _tracker.current()
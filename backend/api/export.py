@@ -0,0 +1,105 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Order
+import csv
+import json
+
+# Columns of an exported order, as Order.values_list() lookups
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('order_id_chain', 'order_id_chain'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('buyer_address', 'buyer_address'),
+    ('amount', 'amount'),
+    ('token_address', 'token_address'),
+    ('status', 'status'),
+    ('payment_method', 'payment_method'),
+    ('created_at', 'created_at'),
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_created_bound(value, name):
+    """
+    Parse an ISO date or datetime query value; a bare date means midnight
+    and naive values are taken in the current time zone
+    """
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(order_status=None, created_after=None, created_before=None):
+    """
+    Orders to export as value tuples in EXPORT_COLUMNS order, oldest first.
+    created_after is inclusive and created_before exclusive.
+    """
+    queryset = Order.objects.all()
+    if order_status:
+        queryset = queryset.filter(status=order_status)
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset.order_by('id').values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    # Decimal amounts keep their exact string form
+    return str(value)
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back to csv.writer's caller
+    """
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset, chunk_size):
+    """
+    Yield the header and one CSV line per order, fetching chunk_size rows at a time
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+def ndjson_lines(queryset, chunk_size):
+    """
+    Yield one JSON object per line per order, fetching chunk_size rows at a time
+    """
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield json.dumps(dict(zip(names, map(_format_value, row)))) + '\n'
+
+
+def export_lines(export_format, queryset, chunk_size):
+    if export_format == 'csv':
+        return csv_lines(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return ndjson_lines(queryset, chunk_size)
+    raise ValueError(f"format must be one of: {', '.join(CONTENT_TYPES)}")
@@ -0,0 +1,274 @@
+from collections import deque
+import asyncio
+import logging
+import math
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Samples kept per function; the gas limit covers the largest of them
+PROFILE_SAMPLES = 50
+
+# Functions estimated before every transaction. processRefund pays out with a
+# low-level call, so a refund whose transfer runs out of gas does not revert,
+# leaves no failed receipt to learn from and marks the order RefundFailed.
+ALWAYS_ESTIMATE = frozenset({'processRefund'})
+
+# eth_feeHistory window and reward percentile used for the priority fee
+FEE_HISTORY_BLOCKS = 10
+PRIORITY_FEE_PERCENTILE = 50
+
+# A cached fee older than this many refresh intervals is refreshed before use
+MAX_FEE_AGE_INTERVALS = 4
+
+
+def _profile_key(contract_function):
+    # Array arguments (e.g. cancelOrders) change the gas cost with their length
+    shape = tuple(
+        len(arg) if isinstance(arg, (list, tuple)) else None
+        for arg in contract_function.args or ()
+    )
+    return (contract_function.address, contract_function.fn_name, shape)
+
+
+class GasProfiles:
+    """
+    Gas limits learned per contract function.
+
+    Each function starts with a single estimate_gas result and afterwards
+    tracks the gasUsed of its successful receipts, so only the first call of a
+    function pays for an estimation RPC. The limit handed out is the largest
+    recent sample times the margin plus a fixed headroom, which covers paths
+    that cost more than any sample seen so far. A failed receipt drops the
+    function's profile, since it may have run out of gas, and the next call
+    estimates again. Functions in ALWAYS_ESTIMATE are estimated every time.
+    """
+
+    def __init__(self, margin=1.2, fallback=2000000, headroom=0):
+        self.margin = margin
+        self.fallback = fallback
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def _limit(self, gas):
+        return math.ceil(gas * self.margin) + self.headroom
+
+    def limit_for(self, contract_function):
+        """
+        Return the gas limit for contract_function, or None if it has no profile yet
+        """
+        with self._lock:
+            samples = self._samples.get(_profile_key(contract_function))
+            if not samples:
+                return None
+            return self._limit(max(samples))
+
+    def record(self, contract_function, gas):
+        with self._lock:
+            key = _profile_key(contract_function)
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=PROFILE_SAMPLES)
+            samples.append(gas)
+
+    def forget(self, contract_function):
+        with self._lock:
+            self._samples.pop(_profile_key(contract_function), None)
+
+    def record_receipt(self, contract_function, receipt):
+        if receipt.status == 1:
+            self.record(contract_function, receipt.gasUsed)
+        else:
+            logger.warning(
+                f"{contract_function.fn_name} reverted after using {receipt.gasUsed} gas, "
+                f"estimating its gas limit again on the next call"
+            )
+            self.forget(contract_function)
+
+    def _needs_estimate(self, contract_function):
+        if contract_function.fn_name in ALWAYS_ESTIMATE:
+            return True
+        return self.limit_for(contract_function) is None
+
+    def _limit_from_estimate(self, contract_function, estimate):
+        self.record(contract_function, estimate)
+        # Never below what earlier calls used: processRefund's estimate only
+        # has to avoid a revert, so it may stop short of what the transfer needs
+        return max(self._limit(estimate), self.limit_for(contract_function) or 0)
+
+    def gas_limit(self, contract_function, tx_params):
+        """
+        Gas limit for a transaction, estimating it only when the function has
+        no profile.
+
+        Falls back to the fixed limit when the estimate fails, e.g. because
+        the call depends on an earlier transaction that is not mined yet or
+        would revert; the receipt still decides whether it succeeded.
+        """
+        if not self._needs_estimate(contract_function):
+            return self.limit_for(contract_function)
+        try:
+            estimate = contract_function.estimate_gas(tx_params)
+        except Exception as e:
+            logger.info(f"Gas estimate for {contract_function.fn_name} failed, using {self.fallback}: {e}")
+            return self.fallback
+        return self._limit_from_estimate(contract_function, estimate)
+
+    async def async_gas_limit(self, contract_function, tx_params):
+        if not self._needs_estimate(contract_function):
+            return self.limit_for(contract_function)
+        try:
+            estimate = await contract_function.estimate_gas(tx_params)
+        except Exception as e:
+            logger.info(f"Gas estimate for {contract_function.fn_name} failed, using {self.fallback}: {e}")
+            return self.fallback
+        return self._limit_from_estimate(contract_function, estimate)
+
+
+def _fee_fields(mode, latest_block, gas_price, fee_history, min_priority_fee=0):
+    """
+    Build the fee fields of a transaction from the node's gas price data. The
+    priority fee never drops below min_priority_fee, since an empty fee
+    history or a gas price at the base fee would otherwise offer no tip.
+    """
+    base_fee = latest_block.get('baseFeePerGas')
+    if mode == 'legacy' or (mode == 'auto' and base_fee is None):
+        return {'gasPrice': gas_price}
+    if base_fee is None:
+        raise Exception("Node does not report baseFeePerGas, EIP-1559 fees are unavailable")
+
+    rewards = sorted(
+        block_rewards[0] for block_rewards in (fee_history or {}).get('reward', []) if block_rewards
+    )
+    if rewards:
+        priority_fee = rewards[len(rewards) // 2]
+    else:
+        priority_fee = max(gas_price - base_fee, 0)
+    priority_fee = max(priority_fee, min_priority_fee)
+    # Room for the base fee to double before the transaction is underpriced
+    return {
+        'maxPriorityFeePerGas': priority_fee,
+        'maxFeePerGas': base_fee * 2 + priority_fee,
+    }
+
+
+class GasPriceOracle:
+    """
+    Keeps the current fee fields in memory and refreshes them from the node in
+    the background once they are older than the refresh interval, so signing
+    a transaction does not wait on eth_gasPrice/eth_feeHistory.
+
+    mode is 'legacy' (gasPrice), 'eip1559' (maxFeePerGas and
+    maxPriorityFeePerGas) or 'auto', which uses EIP-1559 fields when the
+    latest block has a base fee. EIP-1559 priority fees are raised to at
+    least min_priority_fee wei.
+    """
+
+    def __init__(self, w3, interval=15, mode='auto', min_priority_fee=0):
+        self.w3 = w3
+        self.interval = interval
+        self.mode = mode
+        self.min_priority_fee = min_priority_fee
+        self._lock = threading.Lock()
+        self._fees = None
+        self._updated_at = 0
+        self._refreshing = False
+
+    def fee_fields(self):
+        with self._lock:
+            fees = self._fees
+            age = time.monotonic() - self._updated_at
+            refresh_behind = (
+                fees is not None
+                and self.interval <= age < self.interval * MAX_FEE_AGE_INTERVALS
+                and not self._refreshing
+            )
+            if refresh_behind:
+                self._refreshing = True
+        if fees is None or age >= self.interval * MAX_FEE_AGE_INTERVALS:
+            return dict(self.refresh())
+        if refresh_behind:
+            threading.Thread(target=self._refresh_behind, name='gas-price-oracle', daemon=True).start()
+        return dict(fees)
+
+    def refresh(self):
+        with self.w3.batch_requests() as batch:
+            batch.add(self.w3.eth.get_block('latest'))
+            batch.add(self.w3.eth.gas_price)
+            latest_block, gas_price = batch.execute()
+        fee_history = None
+        if self.mode != 'legacy' and latest_block.get('baseFeePerGas') is not None:
+            try:
+                fee_history = self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', [PRIORITY_FEE_PERCENTILE])
+            except Exception as e:
+                logger.warning(f"eth_feeHistory failed, deriving priority fee from eth_gasPrice: {e}")
+
+        fees = _fee_fields(self.mode, latest_block, gas_price, fee_history, self.min_priority_fee)
+        with self._lock:
+            self._fees = fees
+            self._updated_at = time.monotonic()
+        return fees
+
+    def _refresh_behind(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Gas price refresh failed, keeping previous fees: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+class AsyncGasPriceOracle(GasPriceOracle):
+    """
+    GasPriceOracle for an AsyncWeb3 client; background refreshes run as tasks
+    on the client's event loop
+    """
+
+    async def fee_fields(self):
+        with self._lock:
+            fees = self._fees
+            age = time.monotonic() - self._updated_at
+            refresh_behind = (
+                fees is not None
+                and self.interval <= age < self.interval * MAX_FEE_AGE_INTERVALS
+                and not self._refreshing
+            )
+            if refresh_behind:
+                self._refreshing = True
+        if fees is None or age >= self.interval * MAX_FEE_AGE_INTERVALS:
+            return dict(await self.refresh())
+        if refresh_behind:
+            asyncio.ensure_future(self._refresh_behind())
+        return dict(fees)
+
+    async def refresh(self):
+        latest_block, gas_price = await asyncio.gather(
+            self.w3.eth.get_block('latest'),
+            self.w3.eth.gas_price
+        )
+        fee_history = None
+        if self.mode != 'legacy' and latest_block.get('baseFeePerGas') is not None:
+            try:
+                fee_history = await self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', [PRIORITY_FEE_PERCENTILE])
+            except Exception as e:
+                logger.warning(f"eth_feeHistory failed, deriving priority fee from eth_gasPrice: {e}")
+
+        fees = _fee_fields(self.mode, latest_block, gas_price, fee_history, self.min_priority_fee)
+        with self._lock:
+            self._fees = fees
+            self._updated_at = time.monotonic()
+        return fees
+
+    async def _refresh_behind(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Gas price refresh failed, keeping previous fees: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,191 @@
+from django.db import transaction
+from hexbytes import HexBytes
+from web3 import Web3
+from .models import Order, IndexerCheckpoint
+from .cache import invalidate_order_status
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Events that carry the order id and map straight to an Order.status
+EVENT_STATUS = {
+    'PaymentPending': 'Pending',
+    'RefundPending': 'RefundPending',
+    'RefundRequested': 'RefundRequested',
+    'RefundSuccessful': 'Refunded',
+    'RefundFailed': 'RefundFailed',
+}
+
+# PaymentCompleted and PaymentFailed do not include the order id, so the order
+# ids are read from the input of the transaction that emitted them
+FUNCTION_STATUS = {
+    'processTokenPayment': 'Paid',
+    'processEthPayment': 'Paid',
+    'cancelOrders': 'Cancelled',
+}
+TX_INPUT_EVENTS = ('PaymentCompleted', 'PaymentFailed')
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _to_hex(value):
+    return Web3.to_hex(HexBytes(value))
+
+
+def checkpoint_name(contract_address):
+    return f"EcomercePayment:{contract_address}"
+
+
+def first_unindexed_block(contract_address):
+    """
+    First block the indexer has not scanned yet for the contract, or 0 when
+    it has never run. Events up to its checkpoint are already reflected in
+    Order.status, so log lookups for a single order can start here.
+    """
+    last_block = IndexerCheckpoint.objects.filter(
+        name=checkpoint_name(contract_address)
+    ).values_list('last_block', flat=True).first()
+    return 0 if last_block is None else last_block + 1
+
+
+async def afirst_unindexed_block(contract_address):
+    last_block = await IndexerCheckpoint.objects.filter(
+        name=checkpoint_name(contract_address)
+    ).values_list('last_block', flat=True).afirst()
+    return 0 if last_block is None else last_block + 1
+
+
+class OrderEventIndexer:
+    """
+    Scans EcomercePayment logs in block-range chunks and applies the resulting
+    status changes to Order rows in bulk, keeping a checkpoint of the last
+    block scanned so each run only reads new blocks.
+    """
+
+    def __init__(self, sc, chunk_size=2000, confirmations=0):
+        self.sc = sc
+        self.w3 = sc.w3
+        self.contract = sc.ecommerce_contract
+        if self.contract is None:
+            raise Exception("E-commerce contract not initialized")
+        self.chunk_size = chunk_size
+        self.confirmations = confirmations
+
+        event_names = list(EVENT_STATUS) + list(TX_INPUT_EVENTS)
+        self._events_by_topic = {}
+        for name in event_names:
+            event = getattr(self.contract.events, name)()
+            self._events_by_topic[_to_hex(event.topic)] = event
+
+    @property
+    def checkpoint_name(self):
+        return checkpoint_name(self.contract.address)
+
+    def get_checkpoint(self):
+        checkpoint, _ = IndexerCheckpoint.objects.get_or_create(name=self.checkpoint_name)
+        return checkpoint
+
+    def run_once(self, from_block=None):
+        """
+        Index every block between the checkpoint and the confirmed head.
+        Returns the number of orders whose status changed.
+        """
+        checkpoint = self.get_checkpoint()
+        start = from_block if from_block is not None else checkpoint.last_block + 1
+        head = self.w3.eth.block_number - self.confirmations
+        updated = 0
+
+        while start <= head:
+            end = min(start + self.chunk_size - 1, head)
+            changes = self.scan(start, end)
+            with transaction.atomic():
+                updated += self.apply(changes)
+                checkpoint.last_block = end
+                checkpoint.save(update_fields=['last_block', 'updated_at'])
+            logger.info(f"Indexed blocks {start}-{end}: {len(changes)} status events")
+            start = end + 1
+
+        return updated
+
+    def scan(self, from_block, to_block):
+        """
+        Return (block_number, log_index, order_id_chain, status) tuples for
+        the contract's status events in the block range
+        """
+        logs = self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': self.contract.address,
+            'topics': [list(self._events_by_topic)],
+        })
+
+        changes = []
+        input_logs = {}
+        for log in logs:
+            event = self._events_by_topic.get(_to_hex(log['topics'][0]))
+            if event is None:
+                continue
+            position = (log['blockNumber'], log['logIndex'])
+            if event.event_name in TX_INPUT_EVENTS:
+                input_logs.setdefault(_to_hex(log['transactionHash']), position)
+                continue
+            decoded = event.process_log(log)
+            order_id = decoded['args'].get('orderId')
+            if order_id is not None:
+                changes.append(position + (order_id, EVENT_STATUS[event.event_name]))
+
+        changes.extend(self._changes_from_inputs(input_logs))
+        return changes
+
+    def _changes_from_inputs(self, input_logs):
+        if not input_logs:
+            return []
+
+        tx_hashes = list(input_logs)
+        with self.w3.batch_requests() as batch:
+            for tx_hash in tx_hashes:
+                batch.add(self.w3.eth.get_transaction(tx_hash))
+            transactions = batch.execute()
+
+        changes = []
+        for tx_hash, tx in zip(tx_hashes, transactions):
+            try:
+                function, params = self.contract.decode_function_input(tx['input'])
+            except ValueError:
+                continue
+            status = FUNCTION_STATUS.get(function.fn_name)
+            if status is None:
+                # e.g. processRefund, whose outcome comes from the refund events
+                continue
+            if function.fn_name == 'cancelOrders':
+                order_ids = params['_orderIds']
+            else:
+                order_ids = [params['orderId']]
+            for order_id in order_ids:
+                changes.append(input_logs[tx_hash] + (order_id, status))
+        return changes
+
+    def apply(self, changes):
+        """
+        Bulk update Order rows to the latest status seen for each order
+        """
+        latest = {}
+        for _, _, order_id, status in sorted(changes):
+            latest[order_id] = status
+        if not latest:
+            return 0
+
+        order_ids = list(latest)
+        changed = []
+        for i in range(0, len(order_ids), UPDATE_BATCH_SIZE):
+            for order in Order.objects.filter(order_id_chain__in=order_ids[i:i + UPDATE_BATCH_SIZE]):
+                status = latest[order.order_id_chain]
+                if order.status != status:
+                    order.status = status
+                    changed.append(order)
+
+        Order.objects.bulk_update(changed, ['status'], batch_size=UPDATE_BATCH_SIZE)
+        invalidate_order_status(*[order.order_id_chain for order in changed])
+        return len(changed)
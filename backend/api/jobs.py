@@ -0,0 +1,218 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from hexbytes import HexBytes
+from .models import BlockchainJob, Order, Product
+from . import services
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (BlockchainJob.STATUS_QUEUED, BlockchainJob.STATUS_RUNNING)
+
+
+def enqueue(kind, payload=None, order=None):
+    """
+    Queue a blockchain job. If the same kind of job is already queued or
+    running for the order, that job is returned instead of a duplicate.
+    """
+    with transaction.atomic():
+        if order is not None:
+            existing = BlockchainJob.objects.filter(
+                kind=kind, order=order, status__in=ACTIVE_STATUSES
+            ).first()
+            if existing:
+                return existing
+        job = BlockchainJob.objects.create(kind=kind, payload=payload or {}, order=order)
+    logger.info(f"Queued {job}")
+    return job
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running and return it, or
+    None when the queue is empty
+    """
+    while True:
+        job_id = (
+            BlockchainJob.objects.filter(status=BlockchainJob.STATUS_QUEUED)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = BlockchainJob.objects.filter(
+            id=job_id, status=BlockchainJob.STATUS_QUEUED
+        ).update(status=BlockchainJob.STATUS_RUNNING, started_at=timezone.now())
+        if claimed:
+            job = BlockchainJob.objects.select_related('order').get(id=job_id)
+            job.attempts += 1
+            job.save(update_fields=['attempts'])
+            return job
+        # Another worker claimed it first, try the next one
+
+
+def fail_stale_jobs(older_than):
+    """
+    Mark jobs left running by a worker that stopped as failed. They are not
+    retried because their transaction may already have been submitted.
+    """
+    cutoff = timezone.now() - older_than
+    return BlockchainJob.objects.filter(
+        status=BlockchainJob.STATUS_RUNNING, started_at__lt=cutoff
+    ).update(
+        status=BlockchainJob.STATUS_FAILED,
+        error='Worker stopped before the job finished',
+        finished_at=timezone.now()
+    )
+
+
+def _order_result(order, message=None):
+    result = {
+        'order_id': order.id,
+        'order_id_chain': order.order_id_chain,
+        'status': order.status,
+    }
+    if message:
+        result['message'] = message
+    return result
+
+
+def _run_create_order(job):
+    product = Product.objects.get(id=job.payload['product_id'])
+    order = services.submit_order(
+        product, job.payload.get('payment_method', Order.PAYMENT_METHOD_TOKEN)
+    )
+    job.order = order
+    result = _order_result(order, 'Order created successfully')
+    result.update({
+        'buyer_address': order.buyer_address,
+        'amount': float(order.amount),
+        'token_address': order.token_address,
+        'payment_method': order.payment_method,
+    })
+    return None, result
+
+
+def _run_create_orders(job):
+    items = job.payload['orders']
+    products = Product.objects.in_bulk([item['product_id'] for item in items])
+    orders, failed = services.submit_orders([
+        (products[item['product_id']], item.get('payment_method', Order.PAYMENT_METHOD_TOKEN))
+        for item in items
+    ])
+    if not orders:
+        raise Exception("None of the orders in the batch were created")
+    return None, {
+        'message': f'{len(orders)} orders created successfully',
+        'orders': [_order_result(order) for order in orders],
+        'failed': failed,
+    }
+
+
+def _run_process_payment(job):
+    tx_hash = services.pay_order(job.order)
+    return tx_hash, _order_result(job.order, 'Payment processed successfully')
+
+
+def _run_cancel_order(job):
+    tx_hash = services.cancel_order(job.order)
+    return tx_hash, _order_result(job.order, 'Order cancelled successfully')
+
+
+def _run_cancel_orders(job):
+    orders = Order.objects.filter(id__in=job.payload['order_ids'], status='Pending')
+    result = services.cancel_orders(list(orders))
+    result['message'] = f"{len(result['cancelled'])} orders cancelled successfully"
+    return None, result
+
+
+JOB_HANDLERS = {
+    BlockchainJob.KIND_CREATE_ORDER: _run_create_order,
+    BlockchainJob.KIND_CREATE_ORDERS: _run_create_orders,
+    BlockchainJob.KIND_PROCESS_PAYMENT: _run_process_payment,
+    BlockchainJob.KIND_CANCEL_ORDER: _run_cancel_order,
+    BlockchainJob.KIND_CANCEL_ORDERS: _run_cancel_orders,
+}
+
+
+def claim_queued_jobs(kind, limit):
+    """
+    Claim up to limit more queued jobs of one kind, oldest first
+    """
+    candidates = list(
+        BlockchainJob.objects.filter(kind=kind, status=BlockchainJob.STATUS_QUEUED)
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        job_id for job_id in candidates
+        if BlockchainJob.objects.filter(id=job_id, status=BlockchainJob.STATUS_QUEUED).update(
+            status=BlockchainJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+    ]
+    jobs = list(BlockchainJob.objects.select_related('order').filter(id__in=claimed).order_by('id'))
+    for job in jobs:
+        job.attempts += 1
+    BlockchainJob.objects.bulk_update(jobs, ['attempts'])
+    return jobs
+
+
+def run_refund_jobs(job):
+    """
+    Run a claimed refund job together with the other queued refund jobs, so
+    all their initiateRefund/processRefund transactions go out in one
+    pipelined batch
+    """
+    batch = [job] + claim_queued_jobs(BlockchainJob.KIND_REFUND_ORDER, settings.REFUND_BATCH_SIZE - 1)
+    logger.info(f"Running {len(batch)} refund jobs together")
+
+    batch_error = None
+    try:
+        outcomes = services.refund_orders([batch_job.order for batch_job in batch if batch_job.order is not None])
+    except Exception as e:
+        logger.error(f"Refund batch failed: {str(e)}")
+        outcomes = {}
+        batch_error = str(e)
+
+    for batch_job in batch:
+        outcome = outcomes.get(batch_job.order_id)
+        if outcome is not None and outcome['status'] == 'Refunded':
+            batch_job.status = BlockchainJob.STATUS_SUCCEEDED
+            batch_job.tx_hash = HexBytes(outcome['tx_hash']).hex()
+            batch_job.result = _order_result(batch_job.order, 'Refund processed successfully')
+        else:
+            batch_job.status = BlockchainJob.STATUS_FAILED
+            if outcome is not None:
+                batch_job.error = outcome['error']
+            else:
+                batch_job.error = batch_error or 'Order no longer exists'
+        batch_job.finished_at = timezone.now()
+    BlockchainJob.objects.bulk_update(batch, ['status', 'tx_hash', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome
+    """
+    if job.kind == BlockchainJob.KIND_REFUND_ORDER:
+        return run_refund_jobs(job)
+
+    logger.info(f"Running {job}")
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        tx_hash, result = handler(job)
+        job.status = BlockchainJob.STATUS_SUCCEEDED
+        job.tx_hash = tx_hash.hex() if tx_hash else ''
+        job.result = result
+    except Exception as e:
+        logger.error(f"{job} failed: {str(e)}")
+        job.status = BlockchainJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
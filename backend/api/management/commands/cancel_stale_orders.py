@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import Order
+from api.services import cancel_orders
+
+
+class Command(BaseCommand):
+    help = 'Cancel pending orders older than a given age with batched cancelOrders transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=float,
+            default=settings.STALE_ORDER_MAX_AGE_HOURS,
+            help='Cancel pending orders created more than this many hours ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Orders cancelled per round of pipelined transactions'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many orders would be cancelled'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = Order.objects.filter(status='Pending', created_at__lt=cutoff).order_by('id')
+
+        if options['dry_run']:
+            self.stdout.write(f'{stale.count()} pending orders created before {cutoff:%Y-%m-%d %H:%M}')
+            return
+
+        cancelled = skipped = failed = transactions = 0
+        last_id = 0
+        while True:
+            batch = list(stale.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            try:
+                result = cancel_orders(batch)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error cancelling stale orders: {str(e)}'))
+                return
+            cancelled += len(result['cancelled'])
+            skipped += len(result['skipped'])
+            failed += len(result['failed'])
+            transactions += len(result['transactions'])
+            self.stdout.write(f"Cancelled {len(result['cancelled'])} of {len(batch)} orders up to id {last_id}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Cancelled {cancelled} stale orders in {transactions} transactions '
+                f'({skipped} skipped, {failed} failed)'
+            )
+        )
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api import export
+
+
+class Command(BaseCommand):
+    help = 'Stream orders to a CSV or NDJSON file without loading them all into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=list(export.CONTENT_TYPES),
+            default='csv',
+            help='Output format'
+        )
+        parser.add_argument(
+            '--status',
+            help='Only export orders with this status, e.g. Paid'
+        )
+        parser.add_argument(
+            '--created-after',
+            help='Only export orders created at or after this ISO date or datetime'
+        )
+        parser.add_argument(
+            '--created-before',
+            help='Only export orders created before this ISO date or datetime'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (default: stdout)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ORDER_EXPORT_CHUNK_SIZE,
+            help='Rows fetched from the database per round trip'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            queryset = export.export_queryset(
+                order_status=options['status'],
+                created_after=export.parse_created_bound(options['created_after'], '--created-after'),
+                created_before=export.parse_created_bound(options['created_before'], '--created-before')
+            )
+            lines = export.export_lines(options['format'], queryset, options['chunk_size'])
+
+            if not options['output']:
+                for line in lines:
+                    self.stdout.write(line, ending='')
+                return
+
+            count = -1 if options['format'] == 'csv' else 0
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for line in lines:
+                    output.write(line)
+                    count += 1
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} orders to {options['output']}"))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'Error exporting orders: {str(e)}'))
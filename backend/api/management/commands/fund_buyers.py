@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from api.accounts import plan_rebalance
+from api.blockchain import get_smart_contract
+
+
+class Command(BaseCommand):
+    help = 'Fund the buyer account pool with ETH and MockERC20 tokens and rebalance it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--eth',
+            type=float,
+            default=1.0,
+            help='ETH each buyer account should hold'
+        )
+        parser.add_argument(
+            '--tokens',
+            type=float,
+            default=10000.0,
+            help='MockERC20 tokens each buyer account should hold'
+        )
+        parser.add_argument(
+            '--no-rebalance',
+            action='store_true',
+            help='Only top up from the owner account, never move funds between buyers'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the planned transfers without sending them'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sc = get_smart_contract()
+            if not sc.mock_erc20_contract:
+                raise Exception("ERC20 contract not initialized")
+
+            buyers = sc.buyer_pool.accounts
+            signers = {account.address: account for account in buyers}
+            signers[sc.owner_account.address] = sc.owner_account
+
+            with sc.w3.batch_requests() as batch:
+                for account in buyers:
+                    batch.add(sc.w3.eth.get_balance(account.address))
+                    batch.add(sc.mock_erc20_contract.functions.balanceOf(account.address))
+                balances = batch.execute()
+            eth_balances = {account.address: balance for account, balance in zip(buyers, balances[0::2])}
+            token_balances = {account.address: balance for account, balance in zip(buyers, balances[1::2])}
+
+            # Buyers passing on ETH pay the transfer's gas out of their surplus
+            eth_transfers = self.plan(
+                eth_balances, Web3.to_wei(options['eth'], 'ether'), sc, options, sc.eth_transfer_cost()
+            )
+            token_transfers = self.plan(token_balances, Web3.to_wei(options['tokens'], 'ether'), sc, options)
+
+            for sender, recipient, amount in eth_transfers:
+                self.stdout.write(f'ETH {Web3.from_wei(amount, "ether")}: {sender} -> {recipient}')
+            for sender, recipient, amount in token_transfers:
+                self.stdout.write(f'Tokens {Web3.from_wei(amount, "ether")}: {sender} -> {recipient}')
+            if options['dry_run']:
+                return
+
+            sc.fund_accounts(
+                [(signers[sender], recipient, amount) for sender, recipient, amount in eth_transfers],
+                [(signers[sender], recipient, amount) for sender, recipient, amount in token_transfers]
+            )
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Funded {len(buyers)} buyer accounts with {len(eth_transfers)} ETH '
+                    f'and {len(token_transfers)} token transfers'
+                )
+            )
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error funding buyers: {str(e)}'))
+
+    def plan(self, balances, target, sc, options, transfer_cost=0):
+        if options['no_rebalance']:
+            # Without surplus accounts every missing amount comes from the owner
+            balances = {address: balance for address, balance in balances.items() if balance < target}
+        return plan_rebalance(balances, target, sc.owner_account.address, transfer_cost)
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.blockchain import get_smart_contract
+from api.indexer import OrderEventIndexer
+import time
+
+
+class Command(BaseCommand):
+    help = 'Index EcomercePayment events and keep Order.status in sync with the chain'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-block',
+            type=int,
+            default=None,
+            help='Rescan from this block instead of the saved checkpoint'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.INDEXER_CHUNK_SIZE,
+            help='Number of blocks requested per eth_getLogs call'
+        )
+        parser.add_argument(
+            '--confirmations',
+            type=int,
+            default=settings.INDEXER_CONFIRMATIONS,
+            help='Only index blocks this far behind the head'
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Keep running and index new blocks as they arrive'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.INDEXER_POLL_INTERVAL,
+            help='Seconds between scans when following the chain'
+        )
+
+    def handle(self, *args, **options):
+        indexer = OrderEventIndexer(
+            get_smart_contract(),
+            chunk_size=options['chunk_size'],
+            confirmations=options['confirmations']
+        )
+
+        from_block = options['from_block']
+        while True:
+            try:
+                updated = indexer.run_once(from_block=from_block)
+                from_block = None
+                checkpoint = indexer.get_checkpoint()
+                self.stdout.write(
+                    self.style.SUCCESS(f'Indexed up to block {checkpoint.last_block}, {updated} orders updated')
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error indexing events: {str(e)}'))
+                if not options['follow']:
+                    return
+
+            if not options['follow']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
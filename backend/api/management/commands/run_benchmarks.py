@@ -0,0 +1,212 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from bench.benchmarks import BenchmarkRunner, OPERATIONS, compare_to_baseline, deploy_contracts, load_contracts
+from bench.devchain import InProcessChain
+from api.models import Order
+import json
+import os
+import platform
+import shutil
+import tempfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark order creation, payment, status, refund and cancel through the API '
+        'against contracts deployed on an in-process chain'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Orders paid, read and refunded per run; as many again are created and cancelled'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of client threads sending requests in each phase'
+        )
+        parser.add_argument(
+            '--payment-method',
+            choices=[Order.PAYMENT_METHOD_TOKEN, Order.PAYMENT_METHOD_ETH],
+            default=Order.PAYMENT_METHOD_TOKEN,
+            help='Payment method of the benchmarked orders'
+        )
+        parser.add_argument(
+            '--receipt-poll-interval',
+            type=float,
+            default=0.05,
+            help='Seconds between receipt polls; the in-process chain mines every transaction immediately'
+        )
+        parser.add_argument(
+            '--contract-info',
+            default=settings.CONTRACT_INFO_PATH,
+            help='contract-info.json with the ABIs and bytecode to deploy'
+        )
+        parser.add_argument(
+            '--artifacts',
+            default=os.path.join(settings.BASE_DIR, '..', 'artifacts'),
+            help='Hardhat artifacts directory, used when contract-info.json has no bytecode'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'bench', 'baseline.json'),
+            help='Stored results to compare against'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Store the results of this run as the new baseline'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed regression against the baseline, as a fraction'
+        )
+        parser.add_argument(
+            '--json',
+            dest='json_output',
+            help='Also write the results to this file as JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--iterations and --concurrency must be at least 1')
+
+        try:
+            contracts = load_contracts(options['contract_info'], options['artifacts'])
+            chain = InProcessChain().start()
+        except Exception as e:
+            raise CommandError(str(e))
+
+        try:
+            ecommerce_address, erc20_address = deploy_contracts(chain, contracts)
+            self.stdout.write(f'Deployed EcomercePayment at {ecommerce_address} and MockERC20 at {erc20_address}')
+            results = self.run_against(chain, contracts, ecommerce_address, erc20_address, options)
+        finally:
+            chain.stop()
+
+        self.report(results)
+
+        config = {
+            'iterations': options['iterations'],
+            'concurrency': options['concurrency'],
+            'payment_method': options['payment_method'],
+            'receipt_poll_interval': options['receipt_poll_interval'],
+            'python': platform.python_version(),
+        }
+        if options['json_output']:
+            self.write_json(options['json_output'], config, results)
+
+        if options['save_baseline']:
+            self.write_json(options['baseline'], config, results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}"))
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --save-baseline to store one")
+            return
+
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        if baseline.get('config', {}).get('payment_method', config['payment_method']) != config['payment_method']:
+            self.stdout.write(self.style.WARNING('Baseline was recorded with a different payment method'))
+        regressions = compare_to_baseline(results, baseline.get('results', {}), options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against the baseline (tolerance {options["tolerance"]:.0%})'))
+
+    def run_against(self, chain, contracts, ecommerce_address, erc20_address, options):
+        """
+        Run the benchmark with the API pointed at the in-process chain and a
+        throwaway test database
+        """
+        keys = chain.private_keys
+        chain_settings = override_settings(
+            GANACHE_URL=chain.url,
+            OWNER_PRIVATE_KEY=keys[0],
+            BUYER_PRIVATE_KEYS=keys[1:4],
+            ECOMMERCE_CONTRACT_ADDRESS=ecommerce_address,
+            ECOMMERCE_CONTRACT_ABI=contracts['EcomercePayment']['abi'],
+            MOCK_ERC20_CONTRACT_ADDRESS=erc20_address,
+            MOCK_ERC20_CONTRACT_ABI=contracts['MockERC20']['abi'],
+            # Requests go straight to the chain; no worker, monitor or tracing threads
+            BLOCKCHAIN_JOB_QUEUE_ENABLED=False,
+            WEB3_HEALTH_CHECK_INTERVAL=0,
+            CHAIN_STATE_REFRESH_INTERVAL=0,
+            REQUEST_TRACING=False,
+            RECEIPT_POLL_INTERVAL=options['receipt_poll_interval'],
+            ALLOWED_HOSTS=['testserver'],
+        )
+
+        # SQLite's shared in-memory test database locks whole tables, so
+        # concurrent clients would fail on writes; use a file instead
+        temp_dir = None
+        if connection.vendor == 'sqlite':
+            temp_dir = tempfile.mkdtemp(prefix='benchmarks-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(temp_dir, 'benchmarks.sqlite3')
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            with chain_settings:
+                benchmark = BenchmarkRunner(
+                    chain,
+                    iterations=options['iterations'],
+                    concurrency=options['concurrency'],
+                    payment_method=options['payment_method']
+                )
+                return benchmark.run(log=self.progress)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def progress(self, name, result):
+        self.stdout.write(f"{name}: {result['operations']} operations, {result['errors']} errors")
+        if result['first_error']:
+            self.stdout.write(self.style.WARNING(f"  first error: {result['first_error']}"))
+
+    def report(self, results):
+        header = f"{'operation':<10}{'ops':>6}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rpc/op':>9}{'http/op':>9}"
+        self.stdout.write('\n' + header)
+        self.stdout.write('-' * len(header))
+        for operation in OPERATIONS:
+            result = results.get(operation)
+            if not result:
+                continue
+            self.stdout.write(
+                f"{operation:<10}{result['operations']:>6}{result['errors']:>8}"
+                f"{self.format(result['throughput']):>10}{self.format(result['p50_ms']):>10}"
+                f"{self.format(result['p95_ms']):>10}{self.format(result['p99_ms']):>10}"
+                f"{self.format(result['rpc_calls_per_op']):>9}{self.format(result['round_trips_per_op']):>9}"
+            )
+        self.stdout.write('')
+        for operation in OPERATIONS:
+            methods = results.get(operation, {}).get('rpc_methods')
+            if methods:
+                calls = ', '.join(f'{method} {count}' for method, count in methods.items())
+                self.stdout.write(f'{operation} RPC calls: {calls}')
+
+    @staticmethod
+    def format(value):
+        return '-' if value is None else f'{value:.2f}'
+
+    @staticmethod
+    def write_json(path, config, results):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+            f.write('\n')
@@ -0,0 +1,77 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.jobs import claim_next_job, fail_stale_jobs, run_job
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Run worker threads that execute queued blockchain jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Number of worker threads'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0.5,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='Fail jobs left running for more than this many seconds on startup'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue and exit instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        stale = fail_stale_jobs(timedelta(seconds=options['stale_after']))
+        if stale:
+            self.stdout.write(self.style.WARNING(f'Marked {stale} stale jobs as failed'))
+
+        stop = threading.Event()
+        workers = [
+            threading.Thread(
+                target=self._work,
+                args=(stop, options['poll_interval'], options['once']),
+                name=f'blockchain-worker-{i}',
+                daemon=True
+            )
+            for i in range(options['threads'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {len(workers)} blockchain workers'))
+
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers after their current jobs...')
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def _work(self, stop, poll_interval, once):
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == job.STATUS_SUCCEEDED else self.style.ERROR
+            self.stdout.write(style(str(job)))
+        close_old_connections()
@@ -0,0 +1,79 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.profiling import list_profiles
+import io
+import os
+import pstats
+
+
+class Command(BaseCommand):
+    help = 'List saved request profiles and show the top cumulative hotspots across them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            default=settings.PROFILES_DIR,
+            help='Directory holding the saved .prof files'
+        )
+        parser.add_argument(
+            '--view',
+            help='Only include profiles whose file name contains this view name, e.g. order-create'
+        )
+        parser.add_argument(
+            '--last',
+            type=int,
+            default=None,
+            help='Only include the most recent N profiles'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=25,
+            help='Number of functions to show'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'tottime', 'ncalls'],
+            default='cumulative',
+            help='Order the hotspots by this column'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete the selected profiles instead of summarizing them'
+        )
+
+    def handle(self, *args, **options):
+        paths = list_profiles(options['dir'])
+        if options['view']:
+            paths = [path for path in paths if options['view'] in os.path.basename(path)]
+        if options['last']:
+            paths = paths[-options['last']:]
+
+        if not paths:
+            self.stdout.write(f"No profiles found in {options['dir']}")
+            return
+
+        if options['clear']:
+            for path in paths:
+                os.remove(path)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {len(paths)} profiles'))
+            return
+
+        for path in paths:
+            modified = datetime.fromtimestamp(os.path.getmtime(path))
+            self.stdout.write(f'{modified:%Y-%m-%d %H:%M:%S}  {os.path.getsize(path):>9}  {os.path.basename(path)}')
+
+        output = io.StringIO()
+        try:
+            stats = pstats.Stats(*paths, stream=output)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error reading profiles: {str(e)}'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\nTop {options['top']} functions by {options['sort']} across {len(paths)} profiles")
+        )
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(output.getvalue())
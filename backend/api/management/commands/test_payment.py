@@ -50,7 +50,7 @@ class Command(BaseCommand):
             
             # Process payment
             self.stdout.write('Processing payment...')
-            tx_hash = sc.process_payment(order_id_chain, amount_wei)
+            tx_hash = sc.process_payment(order_id_chain, amount_wei, buyer_address=buyer_address)
             
             # Update order status
             order.status = 'Paid'
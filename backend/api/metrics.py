@@ -0,0 +1,357 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from web3.middleware import Web3Middleware
+from .tracing import span
+import threading
+import time
+
+# Prometheus text exposition format served by /api/metrics/
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter, one series per label combination
+    """
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _render_samples(self, items):
+        for labels, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}'
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram with fixed buckets, one series per label combination
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        self._check_labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per bucket counts (the last one is +Inf), then sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def _render_samples(self, items):
+        bounds = self.buckets + (float('inf'),)
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                label_text = _format_labels(self.labelnames, labels, [('le', _format_number(bound))])
+                yield f'{self.name}_bucket{label_text} {cumulative}'
+            label_text = _format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {_format_number(series[-1])}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        """
+        All metrics of this process in the Prometheus text format
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+RPC_REQUESTS = Counter(
+    'web3_rpc_requests_total',
+    'JSON-RPC requests sent to the node, by method and outcome.',
+    ['method', 'outcome']
+)
+RPC_DURATION = Histogram(
+    'web3_rpc_request_duration_seconds',
+    'JSON-RPC round trip time by method; batched calls are timed as method "batch".',
+    ['method']
+)
+CONTRACT_OPERATION_DURATION = Histogram(
+    'smart_contract_operation_duration_seconds',
+    'Time spent building, signing, sending and waiting for contract transactions.',
+    ['operation']
+)
+CONTRACT_OPERATION_ERRORS = Counter(
+    'smart_contract_operation_errors_total',
+    'Contract transaction steps that raised, by operation.',
+    ['operation']
+)
+HTTP_REQUESTS = Counter(
+    'django_http_requests_total',
+    'HTTP requests by view, method and status code.',
+    ['view', 'method', 'status']
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'django_http_request_duration_seconds',
+    'HTTP request latency by view and method.',
+    ['view', 'method']
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    'django_http_request_db_queries',
+    'Database queries run per HTTP request, by view.',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+DB_QUERY_DURATION = Histogram(
+    'django_db_query_duration_seconds',
+    'Database query latency by the view that ran the query.',
+    ['view']
+)
+
+
+@contextmanager
+def timed_operation(operation):
+    """
+    Time one step of a contract transaction (build, sign, send or wait),
+    also recording it as a span of the current request trace
+    """
+    started = time.perf_counter()
+    try:
+        with span(operation):
+            yield
+    except Exception:
+        CONTRACT_OPERATION_ERRORS.inc(operation)
+        raise
+    finally:
+        CONTRACT_OPERATION_DURATION.observe(time.perf_counter() - started, operation)
+
+
+def _rpc_outcome(response):
+    return 'error' if isinstance(response, dict) and response.get('error') else 'ok'
+
+
+def _record_batch(requests_info, response, elapsed):
+    RPC_DURATION.observe(elapsed, 'batch')
+    responses = response if isinstance(response, list) else [response] * len(requests_info)
+    for (method, _), item in zip(requests_info, responses):
+        RPC_REQUESTS.inc(method, _rpc_outcome(item))
+
+
+class RPCMetricsMiddleware(Web3Middleware):
+    """
+    Web3 middleware counting and timing every JSON-RPC request the provider sends
+    """
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            started = time.perf_counter()
+            try:
+                with span('rpc', method=method):
+                    response = make_request(method, params)
+            except Exception:
+                RPC_REQUESTS.inc(method, 'exception')
+                raise
+            finally:
+                RPC_DURATION.observe(time.perf_counter() - started, method)
+            RPC_REQUESTS.inc(method, _rpc_outcome(response))
+            return response
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request):
+        def middleware(requests_info):
+            started = time.perf_counter()
+            try:
+                with span('rpc', method='batch', size=len(requests_info)):
+                    response = make_batch_request(requests_info)
+            except Exception:
+                for method, _ in requests_info:
+                    RPC_REQUESTS.inc(method, 'exception')
+                raise
+            _record_batch(requests_info, response, time.perf_counter() - started)
+            return response
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            started = time.perf_counter()
+            try:
+                with span('rpc', method=method):
+                    response = await make_request(method, params)
+            except Exception:
+                RPC_REQUESTS.inc(method, 'exception')
+                raise
+            finally:
+                RPC_DURATION.observe(time.perf_counter() - started, method)
+            RPC_REQUESTS.inc(method, _rpc_outcome(response))
+            return response
+
+        return middleware
+
+    async def async_wrap_make_batch_request(self, make_batch_request):
+        async def middleware(requests_info):
+            started = time.perf_counter()
+            try:
+                with span('rpc', method='batch', size=len(requests_info)):
+                    response = await make_batch_request(requests_info)
+            except Exception:
+                for method, _ in requests_info:
+                    RPC_REQUESTS.inc(method, 'exception')
+                raise
+            _record_batch(requests_info, response, time.perf_counter() - started)
+            return response
+
+        return middleware
+
+
+class _QueryRecorder:
+    """
+    Counts and times the queries of one request
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.durations = []
+
+
+# The recorder of the request being served. ContextVars follow the request
+# into the threads sync_to_async runs ORM calls on, which a connection's
+# execute_wrapper() context manager does not, since every thread has its
+# own connection.
+_query_recorder = ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection; records the
+    query against the current request, if any
+    """
+    recorder = _query_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.count += 1
+        recorder.durations.append(time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding record_query to each connection once;
+    a connection that reconnects keeps its wrapper
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    Django middleware recording request count, latency and database queries
+    per view. Works for both sync and async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = _QueryRecorder()
+        token = _query_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = _QueryRecorder()
+        token = _query_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, recorder, elapsed):
+        view = _view_name(request)
+        HTTP_REQUESTS.inc(view, request.method, response.status_code)
+        HTTP_REQUEST_DURATION.observe(elapsed, view, request.method)
+        HTTP_REQUEST_DB_QUERIES.observe(recorder.count, view)
+        for duration in recorder.durations:
+            DB_QUERY_DURATION.observe(duration, view)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_product_image_alter_product_image_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="payment_method",
+            field=models.CharField(
+                choices=[("token", "ERC20 token"), ("eth", "Native ETH")],
+                default="token",
+                max_length=10,
+            ),
+        ),
+    ]
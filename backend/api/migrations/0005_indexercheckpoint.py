@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_blockchainjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexerCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("last_block", models.BigIntegerField(default=-1)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
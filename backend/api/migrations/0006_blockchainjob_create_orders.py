@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_indexercheckpoint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="blockchainjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("create_order", "Create order"),
+                    ("create_orders", "Create orders"),
+                    ("process_payment", "Process payment"),
+                    ("cancel_order", "Cancel order"),
+                    ("refund_order", "Refund order"),
+                ],
+                max_length=30,
+            ),
+        ),
+    ]
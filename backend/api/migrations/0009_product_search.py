@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+# External-content FTS5 index over Product.name/description. The triggers keep
+# it in sync with every insert, update and delete, including bulk operations
+# that bypass model signals.
+CREATE_PRODUCT_FTS = [
+    """
+    CREATE VIRTUAL TABLE api_product_fts USING fts5(
+        name, description, content='api_product', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER api_product_fts_insert AFTER INSERT ON api_product BEGIN
+        INSERT INTO api_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_product_fts_delete AFTER DELETE ON api_product BEGIN
+        INSERT INTO api_product_fts(api_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_product_fts_update AFTER UPDATE OF name, description ON api_product BEGIN
+        INSERT INTO api_product_fts(api_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO api_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO api_product_fts(api_product_fts) VALUES ('rebuild')",
+]
+
+DROP_PRODUCT_FTS = [
+    "DROP TRIGGER IF EXISTS api_product_fts_update",
+    "DROP TRIGGER IF EXISTS api_product_fts_delete",
+    "DROP TRIGGER IF EXISTS api_product_fts_insert",
+    "DROP TABLE IF EXISTS api_product_fts",
+]
+
+
+def create_product_fts(apps, schema_editor):
+    # FTS5 is SQLite only; other databases fall back to LIKE search
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in CREATE_PRODUCT_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_product_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in DROP_PRODUCT_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_order_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="price",
+            field=models.DecimalField(db_index=True, decimal_places=2, max_digits=10),
+        ),
+        migrations.RunPython(create_product_fts, drop_product_fts),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+import importlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+product_search = importlib.import_module("api.migrations.0009_product_search")
+
+
+def recreate_product_fts(apps, schema_editor):
+    # SQLite adds and removes the column by rebuilding api_product, which
+    # drops the FTS triggers created in 0009
+    product_search.drop_product_fts(apps, schema_editor)
+    product_search.create_product_fts(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_order_created_id_index"),
+    ]
+
+    operations = [
+        # Runs last when migrating backwards, after the column is removed
+        migrations.RunPython(migrations.RunPython.noop, recreate_product_fts),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(recreate_product_fts, migrations.RunPython.noop),
+    ]
@@ -3,9 +3,11 @@ from django.db import models
 class Product(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     image_url = models.URLField(blank=True, null=True)
+    # Part of the catalog version behind the product list's ETag
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -18,13 +20,80 @@ class Product(models.Model):
         return self.image_url or '/placeholder.svg'
 
 class Order(models.Model):
+    PAYMENT_METHOD_TOKEN = 'token'
+    PAYMENT_METHOD_ETH = 'eth'
+    PAYMENT_METHOD_CHOICES = [
+        (PAYMENT_METHOD_TOKEN, 'ERC20 token'),
+        (PAYMENT_METHOD_ETH, 'Native ETH'),
+    ]
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     order_id_chain = models.BigIntegerField(unique=True, help_text="Order ID from the blockchain")
     buyer_address = models.CharField(max_length=42)
     amount = models.DecimalField(max_digits=20, decimal_places=2)
     token_address = models.CharField(max_length=42)
     status = models.CharField(max_length=20, default='Pending')
+    payment_method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES, default=PAYMENT_METHOD_TOKEN)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Order listing newest first, unfiltered or filtered by status or buyer
+            models.Index(fields=['created_at', 'id'], name='api_order_created_id_idx'),
+            models.Index(fields=['status', 'created_at'], name='api_order_status_created_idx'),
+            models.Index(fields=['buyer_address', 'created_at'], name='api_order_buyer_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id_chain} for {self.product.name}"
+
+class BlockchainJob(models.Model):
+    """
+    A blockchain transaction queued by the API and executed by the
+    run_blockchain_worker management command
+    """
+    KIND_CREATE_ORDER = 'create_order'
+    KIND_CREATE_ORDERS = 'create_orders'
+    KIND_PROCESS_PAYMENT = 'process_payment'
+    KIND_CANCEL_ORDER = 'cancel_order'
+    KIND_CANCEL_ORDERS = 'cancel_orders'
+    KIND_REFUND_ORDER = 'refund_order'
+    KIND_CHOICES = [
+        (KIND_CREATE_ORDER, 'Create order'),
+        (KIND_CREATE_ORDERS, 'Create orders'),
+        (KIND_PROCESS_PAYMENT, 'Process payment'),
+        (KIND_CANCEL_ORDER, 'Cancel order'),
+        (KIND_CANCEL_ORDERS, 'Cancel orders'),
+        (KIND_REFUND_ORDER, 'Refund order'),
+    ]
+
+    STATUS_QUEUED = 'Queued'
+    STATUS_RUNNING = 'Running'
+    STATUS_SUCCEEDED = 'Succeeded'
+    STATUS_FAILED = 'Failed'
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, default=STATUS_QUEUED, db_index=True)
+    tx_hash = models.CharField(max_length=66, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.id} ({self.kind}) {self.status}"
+
+class IndexerCheckpoint(models.Model):
+    """
+    Last block scanned by the on-chain event indexer for a contract
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_block = models.BigIntegerField(default=-1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_block}"
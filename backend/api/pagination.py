@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first. The unfiltered
+    list reads the (created_at, id) index and the status and buyer filters
+    read their (field, created_at) indexes, so a page reads about page_size
+    index entries however deep the client pages, unlike offset pagination
+    which rescans every skipped row.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.ORDER_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.ORDER_LIST_MAX_PAGE_SIZE
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Opt-in page number pagination for the catalog: the full list is returned
+    unless the client asks for ?page_size=
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PRODUCT_LIST_MAX_PAGE_SIZE
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+import cProfile
+import logging
+import os
+import re
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_SUFFIX = '.prof'
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def profile_filename(request, elapsed):
+    """
+    <timestamp>_<method>_<view>_<milliseconds>ms.prof, so saved profiles sort
+    by time and can be filtered by view
+    """
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match and match.view_name else request.path
+    view = _UNSAFE_CHARS.sub('-', view).strip('-') or 'root'
+    return (
+        f'{timezone.now():%Y%m%dT%H%M%S%f}_{request.method}_{view}_'
+        f'{round(elapsed * 1000)}ms{PROFILE_SUFFIX}'
+    )
+
+
+def list_profiles(directory=None):
+    """
+    Saved profile paths, oldest first
+    """
+    directory = directory or settings.PROFILES_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(PROFILE_SUFFIX)
+    )
+
+
+class ProfilingMiddleware:
+    """
+    Run requests that ask for it (?profile=1 or X-Profile: 1) under cProfile
+    and save the stats to PROFILES_DIR. Only installed when both DEBUG and
+    PROFILING_ENABLED are on; otherwise Django drops it from the stack.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG and settings.PROFILING_ENABLED):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    @staticmethod
+    def wants_profile(request):
+        flag = request.GET.get(PROFILE_QUERY_PARAM) or request.headers.get(PROFILE_HEADER, '')
+        return flag.lower() in ('1', 'true', 'yes')
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILES_DIR, profile_filename(request, elapsed))
+        profiler.dump_stats(path)
+        logger.info(f"Saved profile of {request.method} {request.path} to {path}")
+        response['X-Profile-File'] = os.path.basename(path)
+        return response
@@ -0,0 +1,267 @@
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, wait
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+import asyncio
+import logging
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _receipt_batch(hashes):
+    return [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes]
+
+
+def _format_receipts(responses):
+    """
+    Receipts from a batch of eth_getTransactionReceipt responses, formatted
+    exactly like wait_for_transaction_receipt results; None for the
+    transactions not mined yet
+    """
+    if not isinstance(responses, list):
+        raise Exception(f"Receipt batch failed: {responses.get('error', responses)}")
+    return [
+        AttributeDict.recursive(receipt_formatter(response['result']))
+        if response.get('result') is not None else None
+        for response in responses
+    ]
+
+
+class _ReceiptTracker:
+    """
+    Bookkeeping shared by ReceiptWatcher and AsyncReceiptWatcher: the futures
+    waiting on each tx hash and which hashes still have to be checked at the
+    current chain head
+    """
+
+    def __init__(self, w3, poll_interval=0.5):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._unchecked = set()
+        self._last_block = None
+
+    def _add(self, key, future):
+        with self._lock:
+            self._pending.setdefault(key, []).append(future)
+            # Check new hashes on the next poll even if the head has not moved,
+            # the transaction may already be in the latest block
+            self._unchecked.add(key)
+
+    def _discard(self, key, future):
+        with self._lock:
+            futures = self._pending.get(key, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._pending.pop(key, None)
+                self._unchecked.discard(key)
+
+    def _hashes_to_check(self, block_number):
+        with self._lock:
+            if block_number != self._last_block:
+                hashes = list(self._pending)
+            else:
+                hashes = [key for key in self._unchecked if key in self._pending]
+            self._unchecked.clear()
+        return hashes
+
+    def _requeue(self, hashes):
+        # Without this the hashes would wait for the next block, which may
+        # never come on an automining node
+        with self._lock:
+            self._unchecked.update(hashes)
+
+    def _resolve(self, hashes, receipts):
+        for tx_hash, receipt in zip(hashes, receipts):
+            if receipt is None:
+                continue
+            with self._lock:
+                futures = self._pending.pop(tx_hash, [])
+            for future in futures:
+                if not future.done():
+                    future.set_result(receipt)
+
+
+class ReceiptWatcher(_ReceiptTracker):
+    """
+    Resolves transaction receipts for every waiting caller from a single
+    polling thread.
+
+    Instead of each caller polling its own tx hash, the watcher follows the
+    chain head and, once per new block, looks up all pending receipts with one
+    JSON-RPC batch and hands the mined ones to the callers' futures. Node load
+    therefore scales with block rate rather than with the number of waiting
+    requests. A poll that fails is retried in full on the next round, whether
+    or not a new block has arrived.
+    """
+
+    def __init__(self, w3, poll_interval=0.5):
+        super().__init__(w3, poll_interval)
+        self._thread = None
+
+    def watch(self, tx_hash):
+        """
+        Return a Future that resolves to the receipt of tx_hash
+        """
+        key = self.w3.to_hex(tx_hash)
+        future = Future()
+        self._add(key, future)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='receipt-watcher', daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def wait(self, tx_hash, timeout=120):
+        """
+        Block until the receipt for tx_hash is available
+        """
+        future = self.watch(tx_hash)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._discard(self.w3.to_hex(tx_hash), future)
+            raise TimeExhausted(
+                f"Transaction {self.w3.to_hex(tx_hash)} is not in the chain after {timeout} seconds"
+            )
+
+    def wait_all(self, tx_hashes, timeout=120):
+        """
+        Block until the receipts for all tx_hashes are available and return
+        them in the same order
+        """
+        futures = [self.watch(tx_hash) for tx_hash in tx_hashes]
+        done, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            for tx_hash, future in zip(tx_hashes, futures):
+                if future in not_done:
+                    self._discard(self.w3.to_hex(tx_hash), future)
+            raise TimeExhausted(
+                f"{len(not_done)} of {len(futures)} transactions are not in the chain after {timeout} seconds"
+            )
+        return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    # Nothing to wait for; watch() starts a new thread on demand
+                    self._thread = None
+                    return
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f"Receipt watcher poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        block_number = self.w3.eth.block_number
+        hashes = self._hashes_to_check(block_number)
+        if hashes:
+            try:
+                receipts = self._fetch_receipts(hashes)
+            except Exception:
+                self._requeue(hashes)
+                raise
+            self._resolve(hashes, receipts)
+        # Only a block whose pending hashes were all checked counts as seen
+        self._last_block = block_number
+
+    def _fetch_receipts(self, hashes):
+        """
+        Look up the receipts of hashes in one batch; None for the ones not mined yet
+        """
+        # Through the middleware onion so RPC metrics and tracing see the batch
+        make_batch_request = self.w3.provider.batch_request_func(self.w3, self.w3.middleware_onion)
+        return _format_receipts(make_batch_request(_receipt_batch(hashes)))
+
+
+class AsyncReceiptWatcher(_ReceiptTracker):
+    """
+    ReceiptWatcher for an AsyncWeb3 client. The polling runs as a task on the
+    client's event loop while anyone is waiting, and resolves asyncio futures.
+    """
+
+    def __init__(self, w3, poll_interval=0.5):
+        super().__init__(w3, poll_interval)
+        self._task = None
+
+    def watch(self, tx_hash):
+        """
+        Return an asyncio Future that resolves to the receipt of tx_hash
+        """
+        key = self.w3.to_hex(tx_hash)
+        future = asyncio.get_running_loop().create_future()
+        self._add(key, future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return future
+
+    async def wait(self, tx_hash, timeout=120):
+        """
+        Wait until the receipt for tx_hash is available
+        """
+        future = self.watch(tx_hash)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(
+                f"Transaction {self.w3.to_hex(tx_hash)} is not in the chain after {timeout} seconds"
+            )
+        finally:
+            if not future.done():
+                self._discard(self.w3.to_hex(tx_hash), future)
+
+    async def wait_all(self, tx_hashes, timeout=120):
+        """
+        Wait until the receipts for all tx_hashes are available and return
+        them in the same order
+        """
+        futures = [self.watch(tx_hash) for tx_hash in tx_hashes]
+        try:
+            done, not_done = await asyncio.wait(futures, timeout=timeout)
+            if not_done:
+                raise TimeExhausted(
+                    f"{len(not_done)} of {len(futures)} transactions are not in the chain after {timeout} seconds"
+                )
+            return [future.result() for future in futures]
+        finally:
+            for tx_hash, future in zip(tx_hashes, futures):
+                if not future.done():
+                    self._discard(self.w3.to_hex(tx_hash), future)
+
+    async def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    # Nothing to wait for; watch() starts a new task on demand
+                    return
+            try:
+                await self._poll()
+            except Exception as e:
+                logger.warning(f"Receipt watcher poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self):
+        block_number = await self.w3.eth.block_number
+        hashes = self._hashes_to_check(block_number)
+        if hashes:
+            try:
+                receipts = await self._fetch_receipts(hashes)
+            except Exception:
+                self._requeue(hashes)
+                raise
+            self._resolve(hashes, receipts)
+        self._last_block = block_number
+
+    async def _fetch_receipts(self, hashes):
+        make_batch_request = await self.w3.provider.batch_request_func(self.w3, self.w3.middleware_onion)
+        return _format_receipts(await make_batch_request(_receipt_batch(hashes)))
@@ -0,0 +1,87 @@
+from django.db import connection
+from django.db.models import Q
+from .models import Product
+import re
+
+# Note: a migration that rebuilds the api_product table on SQLite drops the
+# api_product_fts_* triggers created in 0009_product_search; recreate them
+# (and rebuild the index) in that migration.
+PRODUCT_FTS_TABLE = 'api_product_fts'
+
+# Matches in the name weigh more than matches in the description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix,
+    and FTS5 operators typed by the user are treated as plain words
+    """
+    tokens = _TOKEN_RE.findall(text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def search_products(text='', min_price=None, max_price=None, offset=0, limit=20):
+    """
+    Search products by name/description and price range.
+
+    With search text the results are ranked by bm25 over the FTS5 index,
+    otherwise they are ordered by price through the price index. Returns
+    (total_count, products) for the requested slice.
+    """
+    match = fts_query(text) if text else ''
+    if text and not match:
+        return 0, []
+
+    if not match:
+        queryset = Product.objects.all()
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        queryset = queryset.order_by('price', 'id')
+        return queryset.count(), list(queryset[offset:offset + limit])
+
+    if not _uses_fts():
+        queryset = Product.objects.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        )
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        queryset = queryset.order_by('name', 'id')
+        return queryset.count(), list(queryset[offset:offset + limit])
+
+    where = [f'{PRODUCT_FTS_TABLE} MATCH %s']
+    params = [match]
+    if min_price is not None:
+        where.append('p.price >= %s')
+        params.append(min_price)
+    if max_price is not None:
+        where.append('p.price <= %s')
+        params.append(max_price)
+    base = (
+        f'FROM {PRODUCT_FTS_TABLE} JOIN api_product p ON p.id = {PRODUCT_FTS_TABLE}.rowid '
+        f'WHERE {" AND ".join(where)}'
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) {base}', params)
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT p.id {base} '
+            f'ORDER BY bm25({PRODUCT_FTS_TABLE}, %s, %s), p.id LIMIT %s OFFSET %s',
+            params + [NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    products = Product.objects.in_bulk(ids)
+    return total, [products[product_id] for product_id in ids if product_id in products]
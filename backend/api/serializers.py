@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Product, Order
+from .models import Product, Order, BlockchainJob
 
 class ProductSerializer(serializers.ModelSerializer):
     image_path = serializers.ReadOnlyField()
@@ -8,6 +8,15 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['id', 'name', 'description', 'price', 'image', 'image_url', 'image_path']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        """
+        fields limits the output to a subset of the fields (sparse fieldset)
+        """
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 class OrderSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
@@ -16,5 +25,11 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'product', 'product_id', 'order_id_chain', 'buyer_address', 'amount', 'token_address', 'status', 'created_at']
+        fields = ['id', 'product', 'product_id', 'order_id_chain', 'buyer_address', 'amount', 'token_address', 'status', 'payment_method', 'created_at']
         read_only_fields = ['order_id_chain', 'buyer_address', 'amount', 'token_address', 'status', 'created_at']
+
+class BlockchainJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BlockchainJob
+        fields = ['id', 'kind', 'status', 'order', 'tx_hash', 'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
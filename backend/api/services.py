@@ -0,0 +1,392 @@
+from django.conf import settings
+from hexbytes import HexBytes
+from web3 import Web3
+from .models import Order
+from .blockchain import get_smart_contract, failure_is_ambiguous, order_status_from_chain, ZERO_ADDRESS
+from .async_blockchain import get_async_smart_contract
+from .cache import ainvalidate_order_status, invalidate_order_status
+from .indexer import first_unindexed_block
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses an order can still move out of on chain
+OPEN_STATUSES = ['Pending', 'Paid', 'RefundPending', 'RefundRequested']
+
+REFRESH_BATCH_SIZE = 1000
+
+
+def submit_order(product, payment_method=Order.PAYMENT_METHOD_TOKEN):
+    """
+    Create an order for a product on the blockchain and record it locally
+    """
+    sc = get_smart_contract()
+    amount = product.price
+    amount_wei = Web3.to_wei(amount, 'ether')
+    if payment_method == Order.PAYMENT_METHOD_ETH:
+        token_address = ZERO_ADDRESS
+    else:
+        token_address = sc.mock_erc20_contract.address
+
+    order_id_chain, buyer_address = sc.create_order(amount_wei, token_address)
+
+    return Order.objects.create(
+        product=product,
+        order_id_chain=order_id_chain,
+        buyer_address=buyer_address,
+        amount=amount,
+        token_address=token_address,
+        payment_method=payment_method
+    )
+
+
+def submit_orders(items):
+    """
+    Create orders for (product, payment_method) pairs with one pipelined batch
+    of createOrder transactions and record them with a single bulk_create.
+    Returns (orders, failed) where failed lists the indexes of the items whose
+    transaction did not go through.
+    """
+    sc = get_smart_contract()
+    token_addresses = [
+        ZERO_ADDRESS if payment_method == Order.PAYMENT_METHOD_ETH else sc.mock_erc20_contract.address
+        for _, payment_method in items
+    ]
+    results = sc.create_orders([
+        (Web3.to_wei(product.price, 'ether'), token_address)
+        for (product, _), token_address in zip(items, token_addresses)
+    ])
+
+    orders = []
+    failed = []
+    for index, ((product, payment_method), token_address, (order_id_chain, buyer_address)) in enumerate(
+        zip(items, token_addresses, results)
+    ):
+        if order_id_chain is None:
+            failed.append(index)
+            continue
+        orders.append(Order(
+            product=product,
+            order_id_chain=order_id_chain,
+            buyer_address=buyer_address,
+            amount=product.price,
+            token_address=token_address,
+            payment_method=payment_method
+        ))
+
+    orders = Order.objects.bulk_create(orders)
+    if failed:
+        logger.warning(f"{len(failed)} of {len(items)} orders in the batch were not created")
+    return orders, failed
+
+
+def pay_order(order):
+    """
+    Pay for an order using its payment rail and mark it as paid
+    """
+    sc = get_smart_contract()
+    amount_wei = Web3.to_wei(order.amount, 'ether')
+
+    logger.info(f"Processing payment for order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    if order.payment_method == Order.PAYMENT_METHOD_ETH:
+        tx_hash = sc.process_eth_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
+    else:
+        tx_hash = sc.process_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
+
+    order.status = 'Paid'
+    order.save(update_fields=['status'])
+    invalidate_order_status(order.order_id_chain)
+    return tx_hash
+
+
+def cancel_order(order):
+    """
+    Cancel an order on the blockchain and mark it as cancelled
+    """
+    sc = get_smart_contract()
+
+    logger.info(f"Cancelling order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    tx_hash = sc.cancel_order(order.order_id_chain, buyer_address=order.buyer_address)
+
+    order.status = 'Cancelled'
+    order.save(update_fields=['status'])
+    invalidate_order_status(order.order_id_chain)
+    return tx_hash
+
+
+def cancel_orders(orders):
+    """
+    Cancel many orders with batched cancelOrders transactions and bulk update
+    the ones that were cancelled. Returns the 'cancelled', 'skipped' and
+    'failed' Order ids and the submitted 'transactions'.
+    """
+    sc = get_smart_contract()
+    by_chain_id = {order.order_id_chain: order for order in orders}
+
+    logger.info(f"Cancelling {len(by_chain_id)} orders")
+
+    outcome = sc.cancel_orders(list(by_chain_id))
+
+    cancelled = [by_chain_id[order_id_chain] for order_id_chain in outcome['cancelled']]
+    for order in cancelled:
+        order.status = 'Cancelled'
+    Order.objects.bulk_update(cancelled, ['status'])
+    invalidate_order_status(*outcome['cancelled'])
+
+    return {
+        'cancelled': [order.id for order in cancelled],
+        'skipped': [by_chain_id[order_id_chain].id for order_id_chain in outcome['skipped']],
+        'failed': [by_chain_id[order_id_chain].id for order_id_chain in outcome['failed']],
+        'transactions': outcome['transactions'],
+    }
+
+
+def refund_orders(orders):
+    """
+    Refund orders through the owner-signed initiateRefund/processRefund
+    pipeline, REFUND_BATCH_SIZE orders at a time, and bulk update each chunk
+    as soon as its receipts are in. Returns the outcome per Order id.
+    """
+    sc = get_smart_contract()
+    orders = list(orders)
+    outcomes = {}
+
+    for i in range(0, len(orders), settings.REFUND_BATCH_SIZE):
+        chunk = {order.order_id_chain: order for order in orders[i:i + settings.REFUND_BATCH_SIZE]}
+        logger.info(f"Refunding {len(chunk)} orders")
+
+        results = sc.refund_orders(list(chunk))
+
+        changed = []
+        for order_id_chain, order in chunk.items():
+            result = results[order_id_chain]
+            if result['status'] is not None and order.status != result['status']:
+                order.status = result['status']
+                changed.append(order)
+            outcomes[order.id] = result
+        Order.objects.bulk_update(changed, ['status'])
+        invalidate_order_status(*[order.order_id_chain for order in changed])
+
+    return outcomes
+
+
+def refund_order(order):
+    """
+    Refund an order on the blockchain and record its new status
+    """
+    logger.info(f"Refunding order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    result = refund_orders([order])[order.id]
+    if result['status'] is None:
+        raise Exception(result['error'])
+    if result['status'] != 'Refunded':
+        raise Exception(f"{result['error']}, order is now {result['status']}")
+    return HexBytes(result['tx_hash'])
+
+
+def refresh_order_statuses(orders):
+    """
+    Reconcile Order rows with their on-chain status using batched getOrder
+    reads and a single bulk_update per chunk. Returns (checked, updated).
+    """
+    sc = get_smart_contract()
+    checked = updated = 0
+
+    orders = orders.only('id', 'order_id_chain', 'status').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(orders.filter(id__gt=last_id)[:REFRESH_BATCH_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        statuses = sc.get_order_statuses([order.order_id_chain for order in chunk])
+        changed = []
+        for order in chunk:
+            chain_order = statuses[order.order_id_chain]
+            refund_failed = False
+            if failure_is_ambiguous(chain_order['status'], order.status):
+                refund_failed = sc.refund_failed(
+                    order.order_id_chain, chain_order['buyer'], first_unindexed_block(sc.ecommerce_contract.address)
+                )
+            chain_status = order_status_from_chain(chain_order['status'], order.status, refund_failed)
+            if order.status != chain_status:
+                order.status = chain_status
+                changed.append(order)
+
+        Order.objects.bulk_update(changed, ['status'])
+        invalidate_order_status(*[order.order_id_chain for order in changed])
+        checked += len(chunk)
+        updated += len(changed)
+
+    logger.info(f"Refreshed {checked} orders from the blockchain, {updated} updated")
+    return checked, updated
+
+
+# asyncio versions of the services above for the async views. They follow
+# the same rules through AsyncSmartContract, which signs from the same
+# process-wide nonce sequences as SmartContract.
+
+def _token_address(sc, payment_method):
+    if payment_method == Order.PAYMENT_METHOD_ETH:
+        return ZERO_ADDRESS
+    return sc.mock_erc20_contract.address
+
+
+async def asubmit_order(product, payment_method=Order.PAYMENT_METHOD_TOKEN):
+    """
+    asyncio version of submit_order
+    """
+    sc = await get_async_smart_contract()
+    token_address = _token_address(sc, payment_method)
+
+    order_id_chain, buyer_address = await sc.create_order(Web3.to_wei(product.price, 'ether'), token_address)
+
+    return await Order.objects.acreate(
+        product=product,
+        order_id_chain=order_id_chain,
+        buyer_address=buyer_address,
+        amount=product.price,
+        token_address=token_address,
+        payment_method=payment_method
+    )
+
+
+async def asubmit_orders(items):
+    """
+    asyncio version of submit_orders
+    """
+    sc = await get_async_smart_contract()
+    token_addresses = [_token_address(sc, payment_method) for _, payment_method in items]
+    results = await sc.create_orders([
+        (Web3.to_wei(product.price, 'ether'), token_address)
+        for (product, _), token_address in zip(items, token_addresses)
+    ])
+
+    orders = []
+    failed = []
+    for index, ((product, payment_method), token_address, (order_id_chain, buyer_address)) in enumerate(
+        zip(items, token_addresses, results)
+    ):
+        if order_id_chain is None:
+            failed.append(index)
+            continue
+        orders.append(Order(
+            product=product,
+            order_id_chain=order_id_chain,
+            buyer_address=buyer_address,
+            amount=product.price,
+            token_address=token_address,
+            payment_method=payment_method
+        ))
+
+    orders = await Order.objects.abulk_create(orders)
+    if failed:
+        logger.warning(f"{len(failed)} of {len(items)} orders in the batch were not created")
+    return orders, failed
+
+
+async def apay_order(order):
+    """
+    asyncio version of pay_order
+    """
+    sc = await get_async_smart_contract()
+    amount_wei = Web3.to_wei(order.amount, 'ether')
+
+    logger.info(f"Processing payment for order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    if order.payment_method == Order.PAYMENT_METHOD_ETH:
+        tx_hash = await sc.process_eth_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
+    else:
+        tx_hash = await sc.process_payment(order.order_id_chain, amount_wei, buyer_address=order.buyer_address)
+
+    order.status = 'Paid'
+    await order.asave(update_fields=['status'])
+    await ainvalidate_order_status(order.order_id_chain)
+    return tx_hash
+
+
+async def acancel_order(order):
+    """
+    asyncio version of cancel_order
+    """
+    sc = await get_async_smart_contract()
+
+    logger.info(f"Cancelling order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    tx_hash = await sc.cancel_order(order.order_id_chain, buyer_address=order.buyer_address)
+
+    order.status = 'Cancelled'
+    await order.asave(update_fields=['status'])
+    await ainvalidate_order_status(order.order_id_chain)
+    return tx_hash
+
+
+async def acancel_orders(orders):
+    """
+    asyncio version of cancel_orders
+    """
+    sc = await get_async_smart_contract()
+    by_chain_id = {order.order_id_chain: order for order in orders}
+
+    logger.info(f"Cancelling {len(by_chain_id)} orders")
+
+    outcome = await sc.cancel_orders(list(by_chain_id))
+
+    cancelled = [by_chain_id[order_id_chain] for order_id_chain in outcome['cancelled']]
+    for order in cancelled:
+        order.status = 'Cancelled'
+    await Order.objects.abulk_update(cancelled, ['status'])
+    await ainvalidate_order_status(*outcome['cancelled'])
+
+    return {
+        'cancelled': [order.id for order in cancelled],
+        'skipped': [by_chain_id[order_id_chain].id for order_id_chain in outcome['skipped']],
+        'failed': [by_chain_id[order_id_chain].id for order_id_chain in outcome['failed']],
+        'transactions': outcome['transactions'],
+    }
+
+
+async def arefund_orders(orders):
+    """
+    asyncio version of refund_orders
+    """
+    sc = await get_async_smart_contract()
+    orders = list(orders)
+    outcomes = {}
+
+    for i in range(0, len(orders), settings.REFUND_BATCH_SIZE):
+        chunk = {order.order_id_chain: order for order in orders[i:i + settings.REFUND_BATCH_SIZE]}
+        logger.info(f"Refunding {len(chunk)} orders")
+
+        results = await sc.refund_orders(list(chunk))
+
+        changed = []
+        for order_id_chain, order in chunk.items():
+            result = results[order_id_chain]
+            if result['status'] is not None and order.status != result['status']:
+                order.status = result['status']
+                changed.append(order)
+            outcomes[order.id] = result
+        await Order.objects.abulk_update(changed, ['status'])
+        await ainvalidate_order_status(*[order.order_id_chain for order in changed])
+
+    return outcomes
+
+
+async def arefund_order(order):
+    """
+    asyncio version of refund_order
+    """
+    logger.info(f"Refunding order {order.id} (blockchain ID: {order.order_id_chain})")
+
+    result = (await arefund_orders([order]))[order.id]
+    if result['status'] is None:
+        raise Exception(result['error'])
+    if result['status'] != 'Refunded':
+        raise Exception(f"{result['error']}, order is now {result['status']}")
+    return HexBytes(result['tx_hash'])
@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+from api.accounts import plan_rebalance
+
+OWNER = 'owner'
+
+
+class PlanRebalanceTests(SimpleTestCase):
+    def test_surplus_is_moved_before_the_funder_pays(self):
+        transfers = plan_rebalance({'a': 9, 'b': 3, 'c': 2}, 5, OWNER)
+        self.assertEqual(transfers, [('a', 'b', 2), ('a', 'c', 2), (OWNER, 'c', 1)])
+
+    def test_senders_keep_the_target_after_paying_for_gas(self):
+        balances = {'a': 9, 'b': 3, 'c': 2}
+        transfers = plan_rebalance(balances, 5, OWNER, transfer_cost=1)
+        self.assertEqual(transfers, [('a', 'b', 2), (OWNER, 'c', 3)])
+
+        for sender, recipient, amount in transfers:
+            if sender != OWNER:
+                balances[sender] -= amount + 1
+            balances[recipient] += amount
+        self.assertTrue(all(balance >= 5 for balance in balances.values()), balances)
+
+    def test_surplus_smaller_than_the_transfer_cost_is_left_alone(self):
+        self.assertEqual(plan_rebalance({'a': 6, 'b': 4}, 5, OWNER, transfer_cost=1), [(OWNER, 'b', 1)])
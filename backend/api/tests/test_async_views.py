@@ -0,0 +1,73 @@
+from django.test import TestCase, override_settings
+from api.models import BlockchainJob, Order, Product
+
+BUYER = '0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF'
+TOKEN = '0x0000000000000000000000000000000000000000'
+
+
+@override_settings(BLOCKCHAIN_JOB_QUEUE_ENABLED=True)
+class AsyncViewJobQueueTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Lamp', description='A desk lamp', price=10)
+
+    def create_order(self, order_id_chain, status):
+        return Order.objects.create(
+            product=self.product,
+            order_id_chain=order_id_chain,
+            buyer_address=BUYER,
+            amount=10,
+            token_address=TOKEN,
+            status=status
+        )
+
+    async def test_order_creation_is_queued(self):
+        response = await self.async_client.post(
+            '/api/async/orders/', {'product_id': self.product.id}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = await BlockchainJob.objects.aget(id=response.json()['job_id'])
+        self.assertEqual(job.kind, BlockchainJob.KIND_CREATE_ORDER)
+        self.assertEqual(job.payload['product_id'], self.product.id)
+
+    async def test_payment_cancel_and_refund_are_queued(self):
+        pending = await Order.objects.acreate(
+            product=self.product, order_id_chain=1, buyer_address=BUYER, amount=10, token_address=TOKEN
+        )
+        paid = await Order.objects.acreate(
+            product=self.product, order_id_chain=2, buyer_address=BUYER, amount=10, token_address=TOKEN,
+            status='Paid'
+        )
+        for url, order, kind in (
+            (f'/api/async/orders/{pending.id}/payment/', pending, BlockchainJob.KIND_PROCESS_PAYMENT),
+            (f'/api/async/orders/{pending.id}/cancel/', pending, BlockchainJob.KIND_CANCEL_ORDER),
+            (f'/api/async/orders/{paid.id}/refund/', paid, BlockchainJob.KIND_REFUND_ORDER),
+        ):
+            response = await self.async_client.post(url)
+            self.assertEqual(response.status_code, 202, url)
+            data = response.json()
+            self.assertEqual((data['kind'], data['order_id']), (kind, order.id))
+
+        # The order itself is left to the worker
+        await pending.arefresh_from_db()
+        self.assertEqual(pending.status, 'Pending')
+
+    async def test_bulk_cancel_is_queued_for_pending_orders_only(self):
+        pending = await Order.objects.acreate(
+            product=self.product, order_id_chain=1, buyer_address=BUYER, amount=10, token_address=TOKEN
+        )
+        paid = await Order.objects.acreate(
+            product=self.product, order_id_chain=2, buyer_address=BUYER, amount=10, token_address=TOKEN,
+            status='Paid'
+        )
+        response = await self.async_client.post(
+            '/api/async/orders/cancel/', {'order_ids': [pending.id, paid.id]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = await BlockchainJob.objects.aget(id=response.json()['job_id'])
+        self.assertEqual(job.payload, {'order_ids': [pending.id]})
+
+    async def test_bulk_requests_are_validated(self):
+        response = await self.async_client.post(
+            '/api/async/orders/refund/', {'order_ids': []}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
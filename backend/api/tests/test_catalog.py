@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase
+from api.models import Product
+
+
+class CatalogETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(5):
+            Product.objects.create(name=f'Product {index}', description='A product', price=10 + index)
+
+    def get_catalog(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/products/', **headers)
+
+    def test_unchanged_catalog_answers_304(self):
+        response = self.get_catalog()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        self.assertEqual(self.get_catalog(response['ETag']).status_code, 304)
+
+    def test_conditional_request_runs_one_query(self):
+        etag = self.get_catalog()['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_catalog(etag).status_code, 304)
+
+    def test_products_created_without_signals_change_the_etag(self):
+        etag = self.get_catalog()['ETag']
+        Product.objects.bulk_create([Product(name='Product 5', description='A product', price=15)])
+
+        response = self.get_catalog(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 6)
+
+    def test_edited_product_changes_the_etag(self):
+        etag = self.get_catalog()['ETag']
+        product = Product.objects.get(name='Product 1')
+        product.price = 99
+        product.save()
+
+        response = self.get_catalog(etag)
+        self.assertEqual(response.status_code, 200)
+        prices = {item['name']: item['price'] for item in response.json()}
+        self.assertEqual(prices['Product 1'], '99.00')
+
+    def test_deleted_product_changes_the_etag(self):
+        etag = self.get_catalog()['ETag']
+        Product.objects.filter(name='Product 2').delete()
+
+        response = self.get_catalog(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+
+    def test_etag_depends_on_the_requested_fields(self):
+        etag = self.get_catalog()['ETag']
+        response = self.client.get('/api/products/?fields=id,name', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {'id', 'name'})
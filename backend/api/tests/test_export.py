@@ -0,0 +1,43 @@
+from datetime import datetime
+from django.utils import timezone
+from api.tests.test_orders import OrderTestCase
+import json
+
+
+class OrderExportTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_order(1, timezone.make_aware(datetime(2026, 1, 10)), status='Paid')
+        self.create_order(2, timezone.make_aware(datetime(2026, 2, 10)), status='Pending')
+        self.create_order(3, timezone.make_aware(datetime(2026, 3, 10)), status='Paid')
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/orders/export/{query}')
+        body = b''.join(response.streaming_content).decode() if response.streaming else None
+        return response, body
+
+    def test_csv_export_with_filters(self):
+        response, body = self.export('?status=Paid&created_after=2026-02-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = body.strip().splitlines()
+        self.assertTrue(lines[0].startswith('id,order_id_chain,'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn(',3,', lines[1])
+
+    def test_ndjson_export_uses_an_exclusive_upper_bound(self):
+        response, body = self.export('?format=ndjson&created_before=2026-03-10')
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['order_id_chain'] for row in rows], [1, 2])
+        self.assertEqual(rows[0]['amount'], '10.00')
+
+    def test_unknown_format_is_rejected(self):
+        response, _ = self.export('?format=xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', response.json()['error'])
+
+    def test_invalid_dates_are_rejected(self):
+        for query in ('?created_after=yesterday', '?created_before=2026-13-01'):
+            response, _ = self.export(query)
+            self.assertEqual(response.status_code, 400, query)
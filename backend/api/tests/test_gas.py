@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from api.gas import GasProfiles, _fee_fields
+import asyncio
+
+
+class FakeFunction:
+    address = '0x000000000000000000000000000000000000dEaD'
+
+    def __init__(self, fn_name, estimate=None, args=()):
+        self.fn_name = fn_name
+        self.args = args
+        self.estimate = estimate
+        self.estimates = 0
+
+    def estimate_gas(self, tx_params):
+        self.estimates += 1
+        if self.estimate is None:
+            raise Exception("execution reverted")
+        return self.estimate
+
+
+class FakeAsyncFunction(FakeFunction):
+    async def estimate_gas(self, tx_params):
+        return super().estimate_gas(tx_params)
+
+
+def receipt(status, gas_used):
+    return SimpleNamespace(status=status, gasUsed=gas_used)
+
+
+class GasProfilesTests(SimpleTestCase):
+    def setUp(self):
+        self.profiles = GasProfiles(margin=1.5, fallback=2000000, headroom=1000)
+
+    def test_estimates_once_then_uses_the_profile(self):
+        function = FakeFunction('createOrder', estimate=100000)
+        self.assertEqual(self.profiles.gas_limit(function, {}), 151000)
+        self.assertEqual(self.profiles.gas_limit(function, {}), 151000)
+        self.assertEqual(function.estimates, 1)
+
+    def test_limit_follows_the_largest_successful_receipt(self):
+        function = FakeFunction('createOrder', estimate=100000)
+        self.profiles.gas_limit(function, {})
+        self.profiles.record_receipt(function, receipt(1, 120000))
+        self.assertEqual(self.profiles.gas_limit(function, {}), 181000)
+
+    def test_failed_estimate_falls_back_without_a_profile(self):
+        function = FakeFunction('processTokenPayment')
+        self.assertEqual(self.profiles.gas_limit(function, {}), 2000000)
+        self.assertIsNone(self.profiles.limit_for(function))
+
+    def test_reverted_receipt_drops_the_profile(self):
+        function = FakeFunction('createOrder', estimate=100000)
+        self.profiles.gas_limit(function, {})
+        self.profiles.record_receipt(function, receipt(0, 151000))
+        self.assertIsNone(self.profiles.limit_for(function))
+
+        function.estimate = 200000
+        self.assertEqual(self.profiles.gas_limit(function, {}), 301000)
+        self.assertEqual(function.estimates, 2)
+
+    def test_process_refund_is_estimated_every_time(self):
+        function = FakeFunction('processRefund', estimate=40000)
+        self.assertEqual(self.profiles.gas_limit(function, {}), 61000)
+        self.assertEqual(self.profiles.gas_limit(function, {}), 61000)
+        self.assertEqual(function.estimates, 2)
+
+    def test_process_refund_never_goes_below_earlier_refunds(self):
+        function = FakeFunction('processRefund', estimate=40000)
+        self.profiles.record_receipt(function, receipt(1, 60000))
+        self.assertEqual(self.profiles.gas_limit(function, {}), 91000)
+
+    def test_array_length_has_its_own_profile(self):
+        one = FakeFunction('cancelOrders', estimate=50000, args=([1],))
+        two = FakeFunction('cancelOrders', estimate=80000, args=([1, 2],))
+        self.profiles.gas_limit(one, {})
+        self.assertIsNone(self.profiles.limit_for(two))
+
+    def test_async_gas_limit(self):
+        function = FakeAsyncFunction('createOrder', estimate=100000)
+        self.assertEqual(asyncio.run(self.profiles.async_gas_limit(function, {})), 151000)
+        self.assertEqual(asyncio.run(self.profiles.async_gas_limit(function, {})), 151000)
+        self.assertEqual(function.estimates, 1)
+
+        self.profiles.record_receipt(function, receipt(0, 151000))
+        asyncio.run(self.profiles.async_gas_limit(function, {}))
+        self.assertEqual(function.estimates, 2)
+
+
+GWEI = 10 ** 9
+
+
+class FeeFieldsTests(SimpleTestCase):
+    def test_priority_fee_is_the_median_reward(self):
+        history = {'reward': [[2 * GWEI], [3 * GWEI], [5 * GWEI]]}
+        fees = _fee_fields('auto', {'baseFeePerGas': 10 * GWEI}, 12 * GWEI, history, min_priority_fee=GWEI)
+        self.assertEqual(fees, {'maxPriorityFeePerGas': 3 * GWEI, 'maxFeePerGas': 23 * GWEI})
+
+    def test_priority_fee_is_raised_to_the_minimum_tip(self):
+        history = {'reward': [[0], [0], [0]]}
+        fees = _fee_fields('auto', {'baseFeePerGas': 10 * GWEI}, 10 * GWEI, history, min_priority_fee=GWEI)
+        self.assertEqual(fees, {'maxPriorityFeePerGas': GWEI, 'maxFeePerGas': 21 * GWEI})
+
+        fees = _fee_fields('eip1559', {'baseFeePerGas': 10 * GWEI}, 10 * GWEI, None, min_priority_fee=GWEI)
+        self.assertEqual(fees['maxPriorityFeePerGas'], GWEI)
+
+    def test_legacy_gas_price_is_unchanged(self):
+        fees = _fee_fields('auto', {}, 5, None, min_priority_fee=GWEI)
+        self.assertEqual(fees, {'gasPrice': 5})
@@ -0,0 +1,19 @@
+from django.test import TestCase
+from api.indexer import afirst_unindexed_block, checkpoint_name, first_unindexed_block
+from api.models import IndexerCheckpoint
+
+CONTRACT = '0x5FbDB2315678afecb367f032d93F642f64180aa3'
+
+
+class FirstUnindexedBlockTests(TestCase):
+    def test_without_a_checkpoint_starts_at_genesis(self):
+        self.assertEqual(first_unindexed_block(CONTRACT), 0)
+
+    def test_starts_after_the_checkpoint(self):
+        IndexerCheckpoint.objects.create(name=checkpoint_name(CONTRACT), last_block=1200)
+        self.assertEqual(first_unindexed_block(CONTRACT), 1201)
+        self.assertEqual(first_unindexed_block('0x0000000000000000000000000000000000000001'), 0)
+
+    async def test_async_lookup(self):
+        await IndexerCheckpoint.objects.acreate(name=checkpoint_name(CONTRACT), last_block=7)
+        self.assertEqual(await afirst_unindexed_block(CONTRACT), 8)
@@ -0,0 +1,38 @@
+from django.test import TestCase, override_settings
+from api.metrics import HTTP_REQUEST_DB_QUERIES
+from api.models import Product
+
+
+def recorded_queries(view):
+    """
+    (requests, queries) observed so far for the view
+    """
+    series = HTTP_REQUEST_DB_QUERIES._values.get((view,))
+    if series is None:
+        return 0, 0
+    return sum(series[:-1]), series[-1]
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Lamp', description='A desk lamp', price=10)
+
+    def test_sync_view_queries_are_counted(self):
+        requests, queries = recorded_queries('product-list')
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+        after_requests, after_queries = recorded_queries('product-list')
+        self.assertEqual(after_requests, requests + 1)
+        self.assertGreater(after_queries, queries)
+
+    @override_settings(BLOCKCHAIN_JOB_QUEUE_ENABLED=True)
+    async def test_async_view_queries_are_counted(self):
+        # The async views run their ORM calls through sync_to_async, on
+        # another thread than the middleware
+        requests, queries = recorded_queries('async-order-create')
+        response = await self.async_client.post(
+            '/api/async/orders/', {'product_id': self.product.id}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        after_requests, after_queries = recorded_queries('async-order-create')
+        self.assertEqual(after_requests, requests + 1)
+        self.assertGreaterEqual(after_queries - queries, 2)
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+from django.test import SimpleTestCase, override_settings
+from api.blockchain import ClientState, NonceManager
+import asyncio
+import threading
+
+ADDRESS = '0x000000000000000000000000000000000000dEaD'
+OWNER_KEY = '0x' + '11' * 32
+
+
+class FakeEth:
+    def __init__(self, count):
+        self.count = count
+        self.calls = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        self.calls += 1
+        return self.count
+
+
+class FakeAsyncEth(FakeEth):
+    async def get_transaction_count(self, address, block_identifier):
+        self.calls += 1
+        # Give the other first allocations time to read the node too
+        await asyncio.sleep(0.01)
+        return self.count
+
+
+class NonceManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.eth = FakeEth(5)
+        self.w3 = SimpleNamespace(eth=self.eth)
+        self.nonces = NonceManager(ADDRESS)
+
+    def test_allocates_consecutive_nonces_after_one_sync(self):
+        self.assertEqual(self.nonces.allocate(self.w3), 5)
+        self.assertEqual(self.nonces.allocate(self.w3, 3), [6, 7, 8])
+        self.assertEqual(self.eth.calls, 1)
+
+    def test_concurrent_allocations_are_unique(self):
+        allocated = []
+        lock = threading.Lock()
+
+        def allocate():
+            for _ in range(50):
+                nonce = self.nonces.allocate(self.w3)
+                with lock:
+                    allocated.append(nonce)
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(allocated), list(range(5, 405)))
+        self.assertEqual(self.eth.calls, 1)
+
+    def test_releasing_the_latest_nonce_hands_it_out_again(self):
+        self.assertEqual(self.nonces.allocate(self.w3, 2), [5, 6])
+        self.nonces.release(6)
+        self.assertEqual(self.nonces.allocate(self.w3), 6)
+        self.assertEqual(self.nonces.allocate(self.w3), 7)
+
+    def test_released_gap_is_filled_first(self):
+        self.nonces.allocate(self.w3, 3)
+        self.nonces.release(5)
+        self.assertEqual(self.nonces.allocate(self.w3, 2), [5, 8])
+
+    def test_released_nonces_at_the_top_fold_back(self):
+        self.nonces.allocate(self.w3, 3)
+        self.nonces.release(6)
+        self.nonces.release(7)
+        self.assertEqual(self.nonces.allocate(self.w3, 3), [6, 7, 8])
+
+    def test_release_before_first_sync_is_ignored(self):
+        self.nonces.release(3)
+        self.assertEqual(self.nonces.allocate(self.w3), 5)
+
+    def test_resync_discards_local_state(self):
+        self.nonces.allocate(self.w3, 3)
+        self.nonces.release(5)
+        self.eth.count = 20
+        self.nonces.resync(self.w3)
+        self.assertEqual(self.nonces.allocate(self.w3), 20)
+        self.assertEqual(self.eth.calls, 2)
+
+
+class AsyncNonceManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.eth = FakeAsyncEth(5)
+        self.w3 = SimpleNamespace(eth=self.eth)
+        self.nonces = NonceManager(ADDRESS)
+
+    def test_concurrent_first_allocations_get_distinct_nonces(self):
+        async def allocate_all():
+            return await asyncio.gather(*[self.nonces.async_allocate(self.w3) for _ in range(4)])
+
+        self.assertEqual(sorted(asyncio.run(allocate_all())), [5, 6, 7, 8])
+
+    def test_sequence_continues_across_event_loops(self):
+        self.assertEqual(asyncio.run(self.nonces.async_allocate(self.w3, 2)), [5, 6])
+        self.assertEqual(asyncio.run(self.nonces.async_allocate(self.w3)), 7)
+        self.assertEqual(self.eth.calls, 1)
+
+    def test_resync_reloads_from_the_node(self):
+        asyncio.run(self.nonces.async_allocate(self.w3, 3))
+        self.eth.count = 12
+        asyncio.run(self.nonces.async_resync(self.w3))
+        self.assertEqual(asyncio.run(self.nonces.async_allocate(self.w3)), 12)
+
+    @override_settings(OWNER_PRIVATE_KEY=OWNER_KEY, BUYER_PRIVATE_KEYS=[OWNER_KEY])
+    def test_sync_and_async_clients_share_one_sequence(self):
+        sync_w3 = SimpleNamespace(eth=FakeEth(5))
+        nonces = ClientState().nonce_manager(ADDRESS)
+        self.assertEqual(nonces.allocate(sync_w3), 5)
+        self.assertEqual(asyncio.run(nonces.async_allocate(self.w3)), 6)
+        self.assertEqual(nonces.allocate(sync_w3), 7)
+        self.assertEqual(self.eth.calls, 0)
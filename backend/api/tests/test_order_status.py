@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+from api.blockchain import failure_is_ambiguous, order_status_from_chain
+
+PENDING, COMPLETED, FAILED, REFUND_PENDING = 0, 1, 3, 4
+
+
+class OrderStatusFromChainTests(SimpleTestCase):
+    def test_plain_statuses(self):
+        self.assertEqual(order_status_from_chain(PENDING, 'Pending'), 'Pending')
+        self.assertEqual(order_status_from_chain(COMPLETED, 'Pending'), 'Paid')
+        self.assertEqual(order_status_from_chain(REFUND_PENDING, 'Paid'), 'RefundPending')
+        self.assertEqual(order_status_from_chain(99, 'Paid'), 'Unknown')
+
+    def test_failed_refund_keeps_refund_failed(self):
+        for current in ('Paid', 'RefundPending', 'RefundFailed'):
+            self.assertEqual(order_status_from_chain(FAILED, current), 'RefundFailed', current)
+            self.assertFalse(failure_is_ambiguous(FAILED, current))
+
+    def test_cancelled_order(self):
+        self.assertEqual(order_status_from_chain(FAILED, 'Cancelled'), 'Cancelled')
+        self.assertFalse(failure_is_ambiguous(FAILED, 'Cancelled'))
+
+    def test_pending_order_needs_the_refund_events(self):
+        self.assertTrue(failure_is_ambiguous(FAILED, 'Pending'))
+        self.assertEqual(order_status_from_chain(FAILED, 'Pending'), 'Cancelled')
+        self.assertEqual(order_status_from_chain(FAILED, 'Pending', refund_failed=True), 'RefundFailed')
+        self.assertFalse(failure_is_ambiguous(COMPLETED, 'Pending'))
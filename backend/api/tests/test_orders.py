@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from api.models import Order, Product
+
+BUYER = '0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF'
+OTHER_BUYER = '0x6813Eb9362372EEF6200f3b1dbC3f819671cBA69'
+TOKEN = '0x0000000000000000000000000000000000000000'
+
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Lamp', description='A desk lamp', price=10)
+
+    def create_order(self, order_id_chain, created_at, status='Pending', buyer_address=BUYER):
+        order = Order.objects.create(
+            product=self.product,
+            order_id_chain=order_id_chain,
+            buyer_address=buyer_address,
+            amount=10,
+            token_address=TOKEN,
+            status=status
+        )
+        # created_at is auto_now_add, so set it afterwards
+        Order.objects.filter(id=order.id).update(created_at=created_at)
+        return order
+
+
+class OrderListPaginationTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # Several orders share a timestamp, so pages have to break ties by id
+        self.orders = [
+            self.create_order(index, now - timedelta(minutes=index // 3), status='Paid' if index % 2 else 'Pending')
+            for index in range(8)
+        ]
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 3)
+            ids.extend(order['id'] for order in data['results'])
+            url = data['next']
+        return ids
+
+    def test_pages_cover_every_order_newest_first(self):
+        expected = [
+            order.id for order in Order.objects.order_by('-created_at', '-id')
+        ]
+        self.assertEqual(self.walk('/api/orders/list/?page_size=3'), expected)
+
+    def test_filtered_pages(self):
+        expected = [
+            order.id for order in Order.objects.filter(status='Paid').order_by('-created_at', '-id')
+        ]
+        self.assertEqual(self.walk('/api/orders/list/?page_size=3&status=Paid'), expected)
+
+    def test_buyer_filter_accepts_lowercase_addresses(self):
+        self.create_order(100, timezone.now(), buyer_address=OTHER_BUYER)
+        response = self.client.get(f'/api/orders/list/?buyer_address={OTHER_BUYER.lower()}')
+        self.assertEqual([order['order_id_chain'] for order in response.json()['results']], [100])
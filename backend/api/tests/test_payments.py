@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from api.blockchain import payment_stages
+
+OWNER = SimpleNamespace(address='0x00000000000000000000000000000000000000aa')
+BUYER = SimpleNamespace(address='0x00000000000000000000000000000000000000bb')
+
+
+class PaymentStagesTests(SimpleTestCase):
+    def test_mint_is_confirmed_before_the_buyer_transactions(self):
+        mint = ('Token minting', 'transfer', OWNER)
+        approve = ('Token approval', 'approve', BUYER)
+        pay = ('Payment transaction', 'processTokenPayment', BUYER)
+        self.assertEqual(payment_stages([mint, approve, pay], BUYER), [[mint], [approve, pay]])
+
+    def test_buyer_transactions_go_out_together(self):
+        approve = ('Token approval', 'approve', BUYER)
+        pay = ('Payment transaction', 'processTokenPayment', BUYER)
+        self.assertEqual(payment_stages([approve, pay], BUYER), [[approve, pay]])
+
+    def test_owner_paying_for_itself_is_one_stage(self):
+        mint = ('Token minting', 'transfer', OWNER)
+        pay = ('Payment transaction', 'processTokenPayment', OWNER)
+        self.assertEqual(payment_stages([mint, pay], OWNER), [[mint, pay]])
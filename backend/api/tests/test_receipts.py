@@ -0,0 +1,142 @@
+from django.test import SimpleTestCase
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+from api.receipts import AsyncReceiptWatcher, ReceiptWatcher
+import asyncio
+
+TX_A = '0x' + 'aa' * 32
+TX_B = '0x' + 'bb' * 32
+
+
+def raw_receipt(tx_hash, status=1):
+    return {
+        'transactionHash': tx_hash,
+        'blockNumber': '0x1',
+        'gasUsed': '0x5208',
+        'status': hex(status),
+        'logs': [],
+    }
+
+
+class FakeProvider:
+    """
+    Answers eth_getTransactionReceipt batches from a dict of mined receipts;
+    the first `failures` batches raise instead
+    """
+
+    def __init__(self):
+        self.receipts = {}
+        self.failures = 0
+        self.batches = []
+
+    def batch_request_func(self, w3, middleware_onion):
+        return self.make_batch_request
+
+    def make_batch_request(self, requests):
+        self.batches.append([params[0] for _, params in requests])
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("node unavailable")
+        return [
+            {'jsonrpc': '2.0', 'id': index, 'result': self.receipts.get(params[0])}
+            for index, (_, params) in enumerate(requests)
+        ]
+
+
+class FakeAsyncProvider(FakeProvider):
+    async def batch_request_func(self, w3, middleware_onion):
+        async def make_batch_request(requests):
+            return self.make_batch_request(requests)
+        return make_batch_request
+
+
+class FakeEth:
+    def __init__(self):
+        self.block_number = 1
+
+
+class FakeAsyncEth:
+    def __init__(self):
+        self.number = 1
+
+    @property
+    def block_number(self):
+        async def read():
+            return self.number
+        return read()
+
+
+class FakeW3:
+    middleware_onion = None
+
+    def __init__(self, provider, eth):
+        self.provider = provider
+        self.eth = eth
+
+    @staticmethod
+    def to_hex(value):
+        return Web3.to_hex(hexstr=value) if isinstance(value, str) else Web3.to_hex(value)
+
+
+class ReceiptWatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = FakeProvider()
+        self.watcher = ReceiptWatcher(FakeW3(self.provider, FakeEth()), poll_interval=0.01)
+
+    def test_resolves_mined_receipts_with_one_batch(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A), TX_B: raw_receipt(TX_B, status=0)}
+        receipts = self.watcher.wait_all([TX_A, TX_B], timeout=5)
+        self.assertEqual([r.status for r in receipts], [1, 0])
+        self.assertEqual(receipts[0].gasUsed, 21000)
+        self.assertEqual(sorted(self.provider.batches[0]), [TX_A, TX_B])
+
+    def test_failed_poll_is_retried_without_a_new_block(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A)}
+        self.provider.failures = 1
+        self.assertEqual(self.watcher.wait(TX_A, timeout=5).status, 1)
+        self.assertEqual(self.provider.batches, [[TX_A], [TX_A]])
+
+    def test_error_response_is_retried(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A)}
+        make_batch_request = self.provider.make_batch_request
+        responses = [{'error': {'code': -32000, 'message': 'busy'}}]
+
+        def flaky(requests):
+            return responses.pop() if responses else make_batch_request(requests)
+        self.provider.make_batch_request = flaky
+
+        self.assertEqual(self.watcher.wait(TX_A, timeout=5).status, 1)
+
+    def test_timeout_raises_and_stops_watching(self):
+        with self.assertRaises(TimeExhausted):
+            self.watcher.wait(TX_A, timeout=0.1)
+        self.assertEqual(self.watcher._pending, {})
+
+    def test_wait_all_timeout_keeps_nothing_pending(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A)}
+        with self.assertRaises(TimeExhausted):
+            self.watcher.wait_all([TX_A, TX_B], timeout=0.1)
+        self.assertEqual(self.watcher._pending, {})
+
+
+class AsyncReceiptWatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = FakeAsyncProvider()
+        self.watcher = AsyncReceiptWatcher(FakeW3(self.provider, FakeAsyncEth()), poll_interval=0.01)
+
+    def test_resolves_mined_receipts(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A), TX_B: raw_receipt(TX_B)}
+        receipts = asyncio.run(self.watcher.wait_all([TX_A, TX_B], timeout=5))
+        self.assertEqual([r.status for r in receipts], [1, 1])
+        self.assertEqual(len(self.provider.batches), 1)
+
+    def test_failed_poll_is_retried_without_a_new_block(self):
+        self.provider.receipts = {TX_A: raw_receipt(TX_A)}
+        self.provider.failures = 1
+        self.assertEqual(asyncio.run(self.watcher.wait(TX_A, timeout=5)).status, 1)
+        self.assertEqual(self.provider.batches, [[TX_A], [TX_A]])
+
+    def test_timeout_raises_and_stops_watching(self):
+        with self.assertRaises(TimeExhausted):
+            asyncio.run(self.watcher.wait(TX_A, timeout=0.1))
+        self.assertEqual(self.watcher._pending, {})
@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase, override_settings
+from api.blockchain import SmartContractRegistry
+import json
+import os
+import shutil
+import tempfile
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class FakeSmartContract:
+    def __init__(self):
+        self.w3 = FakeWeb3()
+        self.sessions = []
+        self.contract_infos = []
+
+    def reconnect(self, session=None):
+        self.sessions.append(session)
+
+    def load_contracts(self, contract_info=None):
+        self.contract_infos.append(contract_info)
+
+
+class SmartContractRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.contract_info_path = os.path.join(directory, 'contract-info.json')
+        self.write_contract_info('0x1')
+        self.enterContext(override_settings(
+            CONTRACT_INFO_PATH=self.contract_info_path,
+            WEB3_HEALTH_CHECK_FAILURES=3
+        ))
+
+        self.instance = FakeSmartContract()
+        self.registry = SmartContractRegistry()
+        self.registry._instance = self.instance
+        self.registry._contract_info_mtime = os.path.getmtime(self.contract_info_path)
+
+    def write_contract_info(self, address, mtime=None):
+        with open(self.contract_info_path, 'w') as f:
+            json.dump({'EcomercePayment': {'address': address}}, f)
+        if mtime is not None:
+            os.utime(self.contract_info_path, (mtime, mtime))
+
+    def test_reconnects_only_after_consecutive_failures(self):
+        self.instance.w3.connected = False
+        self.registry._check()
+        self.registry._check()
+        self.assertEqual(self.instance.sessions, [])
+
+        self.registry._check()
+        self.assertEqual(len(self.instance.sessions), 1)
+        self.assertIs(self.registry.get(), self.instance)
+
+    def test_successful_check_resets_the_failure_count(self):
+        self.instance.w3.connected = False
+        self.registry._check()
+        self.registry._check()
+        self.instance.w3.connected = True
+        self.registry._check()
+        self.instance.w3.connected = False
+        self.registry._check()
+        self.registry._check()
+        self.assertEqual(self.instance.sessions, [])
+
+    def test_changed_contract_info_is_loaded_into_the_same_client(self):
+        self.registry._check()
+        self.assertEqual(self.instance.contract_infos, [])
+
+        self.write_contract_info('0x2', mtime=os.path.getmtime(self.contract_info_path) + 10)
+        self.registry._check()
+        self.assertEqual(self.instance.contract_infos, [{'EcomercePayment': {'address': '0x2'}}])
+        self.assertIs(self.registry.get(), self.instance)
@@ -0,0 +1,50 @@
+from django.test import TestCase
+from api.models import Product
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        Product.objects.create(name='Desk lamp', description='Warm light for reading', price=30)
+        Product.objects.create(name='Reading chair', description='Comfortable chair with a lamp holder', price=120)
+        Product.objects.create(name='Bookshelf', description='Oak shelf', price=80)
+
+    def search(self, query):
+        return self.client.get(f'/api/products/search/{query}')
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.names(self.search('?q=lamp')), ['Desk lamp', 'Reading chair'])
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.names(self.search('?q=book')), ['Bookshelf'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.names(self.search('?q=lamp+warm')), ['Desk lamp'])
+
+    def test_operators_are_plain_words(self):
+        self.assertEqual(self.names(self.search('?q=lamp+OR+oak')), [])
+        self.assertEqual(self.names(self.search('?q="lamp')), ['Desk lamp', 'Reading chair'])
+
+    def test_price_range_without_text_orders_by_price(self):
+        self.assertEqual(self.names(self.search('?min_price=50')), ['Bookshelf', 'Reading chair'])
+        self.assertEqual(self.names(self.search('?q=lamp&max_price=100')), ['Desk lamp'])
+
+    def test_updated_products_are_reindexed(self):
+        product = Product.objects.get(name='Bookshelf')
+        product.name = 'Lamp table'
+        product.save()
+        self.assertIn('Lamp table', self.names(self.search('?q=lamp')))
+        self.assertEqual(self.names(self.search('?q=bookshelf')), [])
+
+    def test_pagination(self):
+        data = self.search('?q=lamp&page_size=1').json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(len(data['results']), 1)
+        self.assertIsNotNone(data['next'])
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('?min_price=cheap', '?max_price=-1', '?page=0', '?page_size=x'):
+            self.assertEqual(self.search(query).status_code, 400, query)
@@ -0,0 +1,201 @@
+from contextlib import ExitStack
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Longest SQL statement kept on a db span in the trace file
+MAX_SQL_LENGTH = 200
+
+_current_span = ContextVar('trace_span', default=None)
+_trace_file_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'start', 'end', 'children')
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def walk(self, skip_nested=False, _outer=frozenset()):
+        """
+        Yield this span and its descendants; with skip_nested, spans inside a
+        span of the same name are left out so their time is not counted twice
+        """
+        if skip_nested and self.name in _outer:
+            return
+        yield self
+        outer = _outer | {self.name}
+        for child in list(self.children):
+            yield from child.walk(skip_nested, outer)
+
+    def to_dict(self, origin):
+        data = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+        }
+        if self.attrs:
+            data['attrs'] = self.attrs
+        if self.children:
+            data['children'] = [child.to_dict(origin) for child in list(self.children)]
+        return data
+
+
+class span:
+    """
+    Record a child span of the current span for the duration of the block.
+    Does nothing when the current request is not traced.
+    """
+    __slots__ = ('name', 'attrs', '_span', '_token')
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None:
+            self._span = None
+            return None
+        self._span = Span(self.name, self.attrs)
+        parent.children.append(self._span)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.end = time.perf_counter()
+            if exc_type is not None:
+                self._span.attrs['error'] = exc_type.__name__
+            _current_span.reset(self._token)
+        return False
+
+
+def _trace_db_query(execute, sql, params, many, context):
+    with span('db', sql=sql[:MAX_SQL_LENGTH], many=many):
+        return execute(sql, params, many, context)
+
+
+def server_timing(root):
+    """
+    Server-Timing header value: total time spent per span name, with the
+    number of spans when a name occurs more than once
+    """
+    totals = {}
+    for item in root.walk(skip_nested=True):
+        if item is root:
+            continue
+        duration, count = totals.get(item.name, (0, 0))
+        totals[item.name] = (duration + item.duration, count + 1)
+
+    entries = [f'total;dur={root.duration * 1000:.1f}']
+    for name, (duration, count) in totals.items():
+        entry = f'{name};dur={duration * 1000:.1f}'
+        if count > 1:
+            entry += f';desc="{count}x"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+def write_trace(record):
+    """
+    Append one trace record to REQUEST_TRACE_FILE as a JSON line
+    """
+    line = json.dumps(record, default=str) + '\n'
+    try:
+        with _trace_file_lock, open(settings.REQUEST_TRACE_FILE, 'a', encoding='utf-8') as trace_file:
+            trace_file.write(line)
+    except OSError as e:
+        logger.warning(f"Could not write request trace to {settings.REQUEST_TRACE_FILE}: {e}")
+
+
+class TracingMiddleware:
+    """
+    Opt-in per-request tracing. Requests are traced when REQUEST_TRACING is
+    on or when they send the REQUEST_TRACE_HEADER header; traced responses
+    carry a Server-Timing header and a sample of them is written with the
+    full span tree to REQUEST_TRACE_FILE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def is_traced(request):
+        if settings.REQUEST_TRACING:
+            return True
+        header = settings.REQUEST_TRACE_HEADER
+        return bool(header) and request.headers.get(header, '').lower() in ('1', 'true', 'yes')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_traced(request):
+            return self.get_response(request)
+        root, started_at = Span('request'), timezone.now()
+        token = _current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_trace_db_query))
+                response = self.get_response(request)
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+        return self.finish(request, response, root, started_at)
+
+    async def __acall__(self, request):
+        if not self.is_traced(request):
+            return await self.get_response(request)
+        root, started_at = Span('request'), timezone.now()
+        token = _current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_trace_db_query))
+                response = await self.get_response(request)
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+        return self.finish(request, response, root, started_at)
+
+    @staticmethod
+    def finish(request, response, root, started_at):
+        response['Server-Timing'] = server_timing(root)
+        if settings.REQUEST_TRACE_FILE and random.random() < settings.REQUEST_TRACE_SAMPLE_RATE:
+            match = getattr(request, 'resolver_match', None)
+            write_trace({
+                'trace_id': uuid.uuid4().hex,
+                'started_at': started_at.isoformat(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'duration_ms': round(root.duration * 1000, 3),
+                'span': root.to_dict(root.start),
+            })
+        return response
@@ -1,22 +1,60 @@
 from django.urls import path
 from .views import (
     ProductList, 
+    ProductSearchView,
     OrderCreate, 
+    OrderBatchCreate,
     ProcessPaymentView, 
     OrderStatusView, 
     OrderListView,
+    OrderExportView,
+    RefreshOrdersView,
     CancelOrderView,
+    BulkCancelOrdersView,
     RefundOrderView,
-    BlockchainInfoView
+    BulkRefundOrdersView,
+    BlockchainInfoView,
+    MetricsView,
+    JobDetailView
+)
+from .async_views import (
+    AsyncOrderCreate,
+    AsyncOrderBatchCreate,
+    AsyncProcessPaymentView,
+    AsyncOrderStatusView,
+    AsyncCancelOrderView,
+    AsyncBulkCancelOrdersView,
+    AsyncRefundOrderView,
+    AsyncBulkRefundOrdersView,
+    AsyncBlockchainInfoView
 )
 
 urlpatterns = [
     path('products/', ProductList.as_view(), name='product-list'),
+    path('products/search/', ProductSearchView.as_view(), name='product-search'),
     path('orders/', OrderCreate.as_view(), name='order-create'),
+    path('orders/batch/', OrderBatchCreate.as_view(), name='order-batch-create'),
     path('orders/list/', OrderListView.as_view(), name='order-list'),
+    path('orders/export/', OrderExportView.as_view(), name='order-export'),
+    path('orders/refresh/', RefreshOrdersView.as_view(), name='order-refresh'),
+    path('orders/cancel/', BulkCancelOrdersView.as_view(), name='order-bulk-cancel'),
+    path('orders/refund/', BulkRefundOrdersView.as_view(), name='order-bulk-refund'),
     path('orders/<int:order_id>/payment/', ProcessPaymentView.as_view(), name='process-payment'),
     path('orders/<int:order_id>/status/', OrderStatusView.as_view(), name='order-status'),
     path('orders/<int:order_id>/cancel/', CancelOrderView.as_view(), name='cancel-order'),
     path('orders/<int:order_id>/refund/', RefundOrderView.as_view(), name='refund-order'),
     path('blockchain/info/', BlockchainInfoView.as_view(), name='blockchain-info'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('jobs/<int:job_id>/', JobDetailView.as_view(), name='job-detail'),
+
+    # asyncio views, served concurrently when running under ASGI
+    path('async/orders/', AsyncOrderCreate.as_view(), name='async-order-create'),
+    path('async/orders/batch/', AsyncOrderBatchCreate.as_view(), name='async-order-batch-create'),
+    path('async/orders/cancel/', AsyncBulkCancelOrdersView.as_view(), name='async-order-bulk-cancel'),
+    path('async/orders/refund/', AsyncBulkRefundOrdersView.as_view(), name='async-order-bulk-refund'),
+    path('async/orders/<int:order_id>/payment/', AsyncProcessPaymentView.as_view(), name='async-process-payment'),
+    path('async/orders/<int:order_id>/status/', AsyncOrderStatusView.as_view(), name='async-order-status'),
+    path('async/orders/<int:order_id>/cancel/', AsyncCancelOrderView.as_view(), name='async-cancel-order'),
+    path('async/orders/<int:order_id>/refund/', AsyncRefundOrderView.as_view(), name='async-refund-order'),
+    path('async/blockchain/info/', AsyncBlockchainInfoView.as_view(), name='async-blockchain-info'),
 ]
@@ -1,20 +1,142 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from .models import Product, Order
-from .serializers import ProductSerializer, OrderSerializer
-from .blockchain import SmartContract
-from web3 import Web3
+from .models import Product, Order, BlockchainJob
+from .serializers import ProductSerializer, OrderSerializer, BlockchainJobSerializer
+from .pagination import OrderCursorPagination, ProductPagination
+from .blockchain import get_smart_contract, failure_is_ambiguous, order_status_from_chain
+from .chainstate import get_chain_state
+from .indexer import first_unindexed_block
+from .search import search_products
+from . import export, jobs, metrics, services
+from . import cache as api_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from web3 import Web3
+from decimal import Decimal, InvalidOperation
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def job_accepted_response(request, job):
+    """
+    202 response pointing the client at a queued blockchain job
+    """
+    return Response({
+        'message': 'Blockchain job queued',
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'order_id': job.order_id,
+        'status_url': request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+    }, status=status.HTTP_202_ACCEPTED)
+
 class ProductList(generics.ListAPIView):
-    queryset = Product.objects.all()
+    """
+    Product catalog. Pages are cached per catalog version and served with a
+    strong ETag and Last-Modified, so conditional requests get a 304.
+    Supports ?fields=id,name,price and ?page_size=/?page= pagination.
+    """
+    queryset = Product.objects.all().order_by('id')
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.request.query_params.get('fields')
+        if fields:
+            kwargs['fields'] = [field.strip() for field in fields.split(',') if field.strip()]
+        return super().get_serializer(*args, **kwargs)
+
+    @method_decorator(condition(etag_func=api_cache.catalog_etag, last_modified_func=api_cache.catalog_last_modified))
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Let clients keep the catalog but revalidate it on every use
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        key = api_cache.catalog_page_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, settings.CATALOG_CACHE_TTL)
+        return Response(data)
+
+class ProductSearchView(APIView):
+    """
+    Full text product search over name and description, ranked by relevance,
+    with optional price range. Supports ?q=, ?min_price=, ?max_price=,
+    ?page=, ?page_size= and ?fields=.
+    """
+    def get(self, request):
+        params = request.query_params
+        try:
+            min_price = self.parse_decimal(params.get('min_price'), 'min_price')
+            max_price = self.parse_decimal(params.get('max_price'), 'max_price')
+            page = self.parse_positive_int(params.get('page'), 'page', 1)
+            page_size = min(
+                self.parse_positive_int(params.get('page_size'), 'page_size', settings.PRODUCT_SEARCH_PAGE_SIZE),
+                settings.PRODUCT_LIST_MAX_PAGE_SIZE
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            count, products = search_products(
+                params.get('q', '').strip(),
+                min_price=min_price,
+                max_price=max_price,
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
+        except Exception as e:
+            logger.error(f"Error searching products: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = params.get('fields')
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        url = request.build_absolute_uri()
+        return Response({
+            'count': count,
+            'next': replace_query_param(url, 'page', page + 1) if page * page_size < count else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': ProductSerializer(products, many=True, fields=fields or None).data
+        })
+
+    @staticmethod
+    def parse_decimal(value, name):
+        if value in (None, ''):
+            return None
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            raise ValueError(f"{name} must be a number")
+        if not value.is_finite() or value < 0:
+            raise ValueError(f"{name} must be a non-negative number")
+        return value
+
+    @staticmethod
+    def parse_positive_int(value, name, default):
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+        if value < 1:
+            raise ValueError(f"{name} must be at least 1")
+        return value
 
 class OrderCreate(generics.CreateAPIView):
     queryset = Order.objects.all()
@@ -25,29 +147,26 @@ class OrderCreate(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
 
         product = serializer.validated_data['product']
-        amount = product.price
-
-        try:
-            sc = SmartContract()
-            amount_wei = Web3.to_wei(amount, 'ether')
-            token_address = sc.mock_erc20_contract.address
+        payment_method = serializer.validated_data.get('payment_method', Order.PAYMENT_METHOD_TOKEN)
 
-            order_id_chain, buyer_address = sc.create_order(amount_wei, token_address)
-
-            order = serializer.save(
-                order_id_chain=order_id_chain,
-                buyer_address=buyer_address,
-                amount=amount,
-                token_address=token_address
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = jobs.enqueue(
+                BlockchainJob.KIND_CREATE_ORDER,
+                {'product_id': product.id, 'payment_method': payment_method}
             )
+            return job_accepted_response(request, job)
+
+        try:
+            order = services.submit_order(product, payment_method)
 
             response_data = {
                 'id': order.id,
-                'order_id_chain': order_id_chain,
-                'buyer_address': buyer_address,
-                'amount': float(amount),
-                'token_address': token_address,
+                'order_id_chain': order.order_id_chain,
+                'buyer_address': order.buyer_address,
+                'amount': float(order.amount),
+                'token_address': order.token_address,
                 'status': order.status,
+                'payment_method': order.payment_method,
                 'product': ProductSerializer(product).data,
                 'created_at': order.created_at
             }
@@ -59,6 +178,59 @@ class OrderCreate(generics.CreateAPIView):
             logger.error(f"Error creating order: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class OrderBatchCreate(APIView):
+    """
+    Create several orders with one pipelined batch of createOrder transactions.
+    Expects {"orders": [{"product_id": 1, "payment_method": "token"}, ...]}.
+    """
+    def post(self, request):
+        items = request.data.get('orders')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "orders must be a non-empty list"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.ORDER_BATCH_MAX_SIZE:
+            return Response(
+                {"error": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders can be created per batch"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = OrderSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = [
+            (data['product'], data.get('payment_method', Order.PAYMENT_METHOD_TOKEN))
+            for data in serializer.validated_data
+        ]
+
+        if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+            job = jobs.enqueue(
+                BlockchainJob.KIND_CREATE_ORDERS,
+                {'orders': [
+                    {'product_id': product.id, 'payment_method': payment_method}
+                    for product, payment_method in items
+                ]}
+            )
+            return job_accepted_response(request, job)
+
+        try:
+            orders, failed = services.submit_orders(items)
+            if not orders:
+                return Response(
+                    {"error": "None of the orders in the batch were created", "failed": failed},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            return Response({
+                'message': f'{len(orders)} orders created successfully',
+                'orders': OrderSerializer(orders, many=True).data,
+                'failed': failed
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            logger.error(f"Error creating orders: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 class ProcessPaymentView(APIView):
     """
     Process payment for a specific order using Ganache blockchain
@@ -74,20 +246,12 @@ class ProcessPaymentView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Initialize smart contract connection
-            sc = SmartContract()
-            
-            # Convert amount to Wei
-            amount_wei = Web3.to_wei(order.amount, 'ether')
-            
-            logger.info(f"Processing payment for order {order.id} (blockchain ID: {order.order_id_chain})")
-            
-            # Process payment on blockchain
-            tx_hash = sc.process_payment(order.order_id_chain, amount_wei)
-            
-            # Update order status
-            order.status = 'Paid'
-            order.save()
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                job = jobs.enqueue(BlockchainJob.KIND_PROCESS_PAYMENT, order=order)
+                return job_accepted_response(request, job)
+
+            # Process payment on blockchain using the order's payment rail
+            tx_hash = services.pay_order(order)
             
             logger.info(f"Payment processed successfully for order {order.id}")
             
@@ -118,40 +282,12 @@ class OrderStatusView(APIView):
     def get(self, request, order_id):
         try:
             # Get the order from database
-            order = get_object_or_404(Order, id=order_id)
-            
-            # Initialize smart contract connection
-            sc = SmartContract()
+            order = get_object_or_404(Order.objects.select_related('product'), id=order_id)
             
-            # Get order status from blockchain
-            blockchain_order = sc.get_order_status(order.order_id_chain)
+            # Serve from the status cache, loading from the chain on a miss
+            data = api_cache.get_order_status(order.order_id_chain, lambda: self.load_status(order))
             
-            # Map blockchain status to readable format
-            status_map = {
-                0: 'Pending',
-                1: 'Paid',
-                2: 'Refunded',
-                3: 'Cancelled'
-            }
-            
-            blockchain_status = status_map.get(blockchain_order['status'], 'Unknown')
-            
-            # Update local database if status changed
-            if order.status != blockchain_status:
-                order.status = blockchain_status
-                order.save()
-            
-            return Response({
-                'order_id': order.id,
-                'order_id_chain': order.order_id_chain,
-                'status': order.status,
-                'blockchain_status': blockchain_status,
-                'amount': float(order.amount),
-                'buyer_address': order.buyer_address,
-                'token_address': order.token_address,
-                'product': ProductSerializer(order.product).data,
-                'created_at': order.created_at
-            }, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
             
         except Order.DoesNotExist:
             return Response(
@@ -165,12 +301,128 @@ class OrderStatusView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def load_status(self, order):
+        if settings.ORDER_STATUS_FROM_INDEX:
+            # The event indexer keeps the database in sync with the chain
+            blockchain_status = order.status
+        else:
+            # Get the shared smart contract connection
+            sc = get_smart_contract()
+            
+            # Get order status from blockchain
+            blockchain_order = sc.get_order_status(order.order_id_chain)
+            
+            # Map blockchain status to readable format
+            refund_failed = False
+            if failure_is_ambiguous(blockchain_order['status'], order.status):
+                refund_failed = sc.refund_failed(
+                    order.order_id_chain,
+                    blockchain_order['buyer'],
+                    first_unindexed_block(sc.ecommerce_contract.address)
+                )
+            blockchain_status = order_status_from_chain(blockchain_order['status'], order.status, refund_failed)
+            
+            # Update local database if status changed
+            if order.status != blockchain_status:
+                order.status = blockchain_status
+                order.save()
+        
+        return {
+            'order_id': order.id,
+            'order_id_chain': order.order_id_chain,
+            'status': order.status,
+            'blockchain_status': blockchain_status,
+            'amount': float(order.amount),
+            'buyer_address': order.buyer_address,
+            'token_address': order.token_address,
+            'product': ProductSerializer(order.product).data,
+            'created_at': order.created_at
+        }
+
 class OrderListView(generics.ListAPIView):
     """
-    List all orders
+    List orders newest first, one cursor page at a time.
+    Optional filters: ?status=Paid and ?buyer_address=0x...
     """
-    queryset = Order.objects.all().order_by('-created_at')
     serializer_class = OrderSerializer
+    pagination_class = OrderCursorPagination
+
+    def get_queryset(self):
+        queryset = Order.objects.select_related('product')
+
+        order_status = self.request.query_params.get('status')
+        if order_status:
+            queryset = queryset.filter(status=order_status)
+
+        buyer_address = self.request.query_params.get('buyer_address')
+        if buyer_address:
+            # Addresses are stored checksummed, so compare exactly and keep the index usable
+            if Web3.is_address(buyer_address):
+                buyer_address = Web3.to_checksum_address(buyer_address)
+            queryset = queryset.filter(buyer_address=buyer_address)
+
+        return queryset
+
+class OrderExportView(APIView):
+    """
+    Stream every matching order as CSV (default) or NDJSON without loading
+    the result set into memory.
+    Optional filters: ?status=Paid, ?created_after= and ?created_before=
+    (ISO dates or datetimes); ?format=csv|ndjson picks the output.
+    """
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= names the export format, not a DRF renderer; errors stay JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        params = request.query_params
+        export_format = params.get('format', 'csv')
+        try:
+            queryset = export.export_queryset(
+                order_status=params.get('status'),
+                created_after=export.parse_created_bound(params.get('created_after'), 'created_after'),
+                created_before=export.parse_created_bound(params.get('created_before'), 'created_before')
+            )
+            lines = export.export_lines(export_format, queryset, settings.ORDER_EXPORT_CHUNK_SIZE)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(lines, content_type=export.CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+class RefreshOrdersView(APIView):
+    """
+    Reconcile many orders with their on-chain status in one go.
+    Refreshes the given order ids, or every order that is still open.
+    """
+    def post(self, request):
+        try:
+            order_ids = request.data.get('order_ids')
+            if order_ids is not None:
+                if not isinstance(order_ids, list):
+                    return Response(
+                        {"error": "order_ids must be a list of order ids"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                orders = Order.objects.filter(id__in=order_ids)
+            else:
+                orders = Order.objects.filter(status__in=services.OPEN_STATUSES)
+
+            checked, updated = services.refresh_order_statuses(orders)
+
+            return Response({
+                'message': 'Order statuses refreshed',
+                'checked': checked,
+                'updated': updated
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error refreshing order statuses: {str(e)}")
+            return Response(
+                {"error": f"Failed to refresh order statuses: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
 class CancelOrderView(APIView):
     """
@@ -187,17 +439,12 @@ class CancelOrderView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Initialize smart contract connection
-            sc = SmartContract()
-            
-            logger.info(f"Cancelling order {order.id} (blockchain ID: {order.order_id_chain})")
-            
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                job = jobs.enqueue(BlockchainJob.KIND_CANCEL_ORDER, order=order)
+                return job_accepted_response(request, job)
+
             # Cancel order on blockchain
-            tx_hash = sc.cancel_order(order.order_id_chain)
-            
-            # Update order status
-            order.status = 'Cancelled'
-            order.save()
+            tx_hash = services.cancel_order(order)
             
             logger.info(f"Order {order.id} cancelled successfully")
             
@@ -221,9 +468,57 @@ class CancelOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class BulkCancelOrdersView(APIView):
+    """
+    Cancel many pending orders with batched cancelOrders transactions.
+    Expects {"order_ids": [1, 2, ...]}.
+    """
+    def post(self, request):
+        order_ids = request.data.get('order_ids')
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response(
+                {"error": "order_ids must be a non-empty list of order ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(order_ids) > settings.ORDER_BATCH_MAX_SIZE:
+            return Response(
+                {"error": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders can be cancelled per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            orders = list(Order.objects.filter(id__in=order_ids))
+            pending = [order for order in orders if order.status == 'Pending']
+            not_pending = [order.id for order in orders if order.status != 'Pending']
+            found = {order.id for order in orders}
+            not_found = [order_id for order_id in order_ids if order_id not in found]
+
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                job = jobs.enqueue(
+                    BlockchainJob.KIND_CANCEL_ORDERS,
+                    {'order_ids': [order.id for order in pending]}
+                )
+                return job_accepted_response(request, job)
+
+            result = services.cancel_orders(pending)
+            result['skipped'] += not_pending
+            result['not_found'] = not_found
+
+            return Response({
+                'message': f"{len(result['cancelled'])} orders cancelled successfully",
+                **result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error cancelling orders: {str(e)}")
+            return Response(
+                {"error": f"Order cancellation failed: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
 class RefundOrderView(APIView):
     """
-    Initiate refund for a specific order
+    Refund a specific order (initiateRefund and processRefund)
     """
     def post(self, request, order_id):
         try:
@@ -236,22 +531,17 @@ class RefundOrderView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Initialize smart contract connection
-            sc = SmartContract()
-            
-            logger.info(f"Initiating refund for order {order.id} (blockchain ID: {order.order_id_chain})")
-            
-            # Initiate refund on blockchain
-            tx_hash = sc.initiate_refund(order.order_id_chain)
-            
-            # Update order status
-            order.status = 'Refunded'
-            order.save()
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                job = jobs.enqueue(BlockchainJob.KIND_REFUND_ORDER, order=order)
+                return job_accepted_response(request, job)
+
+            # Refund on blockchain
+            tx_hash = services.refund_order(order)
             
-            logger.info(f"Refund initiated for order {order.id}")
+            logger.info(f"Refund processed for order {order.id}")
             
             return Response({
-                'message': 'Refund initiated successfully',
+                'message': 'Refund processed successfully',
                 'transaction_hash': tx_hash.hex(),
                 'order_id': order.id,
                 'order_id_chain': order.order_id_chain,
@@ -270,19 +560,74 @@ class RefundOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class BulkRefundOrdersView(APIView):
+    """
+    Refund many paid orders with one pipelined batch of owner-signed
+    transactions. Expects {"order_ids": [1, 2, ...]}.
+    """
+    def post(self, request):
+        order_ids = request.data.get('order_ids')
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response(
+                {"error": "order_ids must be a non-empty list of order ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(order_ids) > settings.ORDER_BATCH_MAX_SIZE:
+            return Response(
+                {"error": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders can be refunded per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            orders = list(Order.objects.filter(id__in=order_ids))
+            paid = [order for order in orders if order.status == 'Paid']
+            skipped = [order.id for order in orders if order.status != 'Paid']
+            found = {order.id for order in orders}
+            not_found = [order_id for order_id in order_ids if order_id not in found]
+
+            if settings.BLOCKCHAIN_JOB_QUEUE_ENABLED:
+                queued = [jobs.enqueue(BlockchainJob.KIND_REFUND_ORDER, order=order) for order in paid]
+                return Response({
+                    'message': f'{len(queued)} refund jobs queued',
+                    'jobs': [
+                        {
+                            'job_id': job.id,
+                            'order_id': job.order_id,
+                            'status': job.status,
+                            'status_url': request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+                        }
+                        for job in queued
+                    ],
+                    'skipped': skipped,
+                    'not_found': not_found
+                }, status=status.HTTP_202_ACCEPTED)
+
+            outcomes = services.refund_orders(paid)
+            refunded = [order_id for order_id, outcome in outcomes.items() if outcome['status'] == 'Refunded']
+
+            return Response({
+                'message': f'{len(refunded)} orders refunded successfully',
+                'refunded': refunded,
+                'results': outcomes,
+                'skipped': skipped,
+                'not_found': not_found
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error refunding orders: {str(e)}")
+            return Response(
+                {"error": f"Refund failed: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
 class BlockchainInfoView(APIView):
     """
-    Get blockchain connection information for debugging
+    Get blockchain connection information for debugging, served from the
+    chain state snapshot refreshed in the background
     """
     def get(self, request):
         try:
-            sc = SmartContract()
-            info = sc.get_connection_info()
-            
-            # Add balance information
-            info['buyer_balance'] = float(sc.get_buyer_balance())
-            info['contract_balance'] = float(sc.get_contract_balance())
-            
+            info = get_chain_state()
             return Response(info, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -291,3 +636,23 @@ class BlockchainInfoView(APIView):
                 {"error": f"Failed to get blockchain info: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+class MetricsView(APIView):
+    """
+    Request, JSON-RPC and contract transaction metrics of this worker process
+    in the Prometheus text format
+    """
+    def perform_content_negotiation(self, request, force=False):
+        # Prometheus asks for text/plain or OpenMetrics, which DRF has no renderer for
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+class JobDetailView(generics.RetrieveAPIView):
+    """
+    Get the progress and outcome of a queued blockchain job
+    """
+    queryset = BlockchainJob.objects.all()
+    serializer_class = BlockchainJobSerializer
+    lookup_url_kwarg = 'job_id'
@@ -56,6 +56,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.metrics.MetricsMiddleware",
+    "api.tracing.TracingMiddleware",
+    "api.profiling.ProfilingMiddleware",
 ]
 
 # CORS Settings
@@ -155,6 +158,22 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Seconds a rendered catalog page is kept. Pages are keyed by a catalog
+# version that changes whenever a Product is saved or deleted.
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "300"))
+PRODUCT_LIST_MAX_PAGE_SIZE = int(os.getenv("PRODUCT_LIST_MAX_PAGE_SIZE", "100"))
+
+# Results per page returned by /api/products/search/ (up to PRODUCT_LIST_MAX_PAGE_SIZE with ?page_size=)
+PRODUCT_SEARCH_PAGE_SIZE = int(os.getenv("PRODUCT_SEARCH_PAGE_SIZE", "20"))
+
+# Orders per page returned by /api/orders/list/ (clients may ask for up to the max with ?page_size=)
+ORDER_LIST_PAGE_SIZE = int(os.getenv("ORDER_LIST_PAGE_SIZE", "50"))
+ORDER_LIST_MAX_PAGE_SIZE = int(os.getenv("ORDER_LIST_MAX_PAGE_SIZE", "200"))
+
+# Rows fetched from the database per round trip while streaming
+# /api/orders/export/ or `python manage.py export_orders`
+ORDER_EXPORT_CHUNK_SIZE = int(os.getenv("ORDER_EXPORT_CHUNK_SIZE", "2000"))
+
 # Smart Contract Settings
 CONTRACT_INFO_PATH = os.path.join(BASE_DIR, '..', 'scripts', 'contract-info.json')
 
@@ -178,3 +197,118 @@ GANACHE_URL = "http://127.0.0.1:7545" # Default for Ganache UI
 # Ensure this account has funds.
 OWNER_PRIVATE_KEY = os.getenv("OWNER_PRIVATE_KEY")
 BUYER_PRIVATE_KEY = os.getenv("BUYER_PRIVATE_KEY", "c24a76351030c3867359754ace1a688b31c036a806e34af73513773f334696c1")
+# Comma separated pool of buyer keys. New orders are created from the least
+# busy account so their transactions are not serialized behind one nonce
+# sequence; fund them with `python manage.py fund_buyers`.
+BUYER_PRIVATE_KEYS = [key.strip() for key in os.getenv("BUYER_PRIVATE_KEYS", "").split(",") if key.strip()] or [BUYER_PRIVATE_KEY]
+
+# Blockchain client pool
+# A single SmartContract is shared by every request in a worker process and
+# talks to the node over a keep-alive HTTP session pool.
+WEB3_HTTP_POOL_SIZE = int(os.getenv("WEB3_HTTP_POOL_SIZE", "20"))
+WEB3_HTTP_TIMEOUT = int(os.getenv("WEB3_HTTP_TIMEOUT", "30"))
+WEB3_HEALTH_CHECK_INTERVAL = int(os.getenv("WEB3_HEALTH_CHECK_INTERVAL", "15"))
+# Consecutive failed health checks before the client gets a new HTTP session
+WEB3_HEALTH_CHECK_FAILURES = int(os.getenv("WEB3_HEALTH_CHECK_FAILURES", "3"))
+
+# Seconds between background refreshes of the chain state snapshot (head
+# block and token balances) served by /api/blockchain/info/. 0 disables the
+# background thread and reads the chain on every request.
+CHAIN_STATE_REFRESH_INTERVAL = float(os.getenv("CHAIN_STATE_REFRESH_INTERVAL", "5"))
+
+# Request tracing. A traced request gets a Server-Timing header with the time
+# spent allocating nonces, building, signing and sending transactions, waiting
+# for receipts and running database queries. REQUEST_TRACING traces every
+# request; otherwise only requests that send REQUEST_TRACE_HEADER: 1 are traced.
+REQUEST_TRACING = os.getenv("REQUEST_TRACING", "False").lower() in ("1", "true", "yes")
+REQUEST_TRACE_HEADER = os.getenv("REQUEST_TRACE_HEADER", "X-Request-Trace")
+# When set, this share of traced requests is appended with the full span tree
+# to REQUEST_TRACE_FILE, one JSON object per line
+REQUEST_TRACE_FILE = os.getenv("REQUEST_TRACE_FILE", "")
+REQUEST_TRACE_SAMPLE_RATE = float(os.getenv("REQUEST_TRACE_SAMPLE_RATE", "1.0"))
+
+# On-demand profiling, only available with DEBUG on. With PROFILING_ENABLED a
+# request sent with ?profile=1 or the X-Profile: 1 header runs under cProfile
+# and its stats are saved to PROFILES_DIR; `python manage.py summarize_profiles`
+# lists them and shows the top cumulative hotspots.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() in ("1", "true", "yes")
+PROFILES_DIR = os.getenv("PROFILES_DIR", os.path.join(BASE_DIR, 'profiles'))
+
+# Submit the approve and payment transactions of a token payment back to back
+# and wait for their receipts together instead of one after another. A mint
+# from the owner account is confirmed first, since only one sender's
+# transactions are kept in order by the node.
+PIPELINED_TOKEN_PAYMENTS = os.getenv("PIPELINED_TOKEN_PAYMENTS", "True").lower() in ("1", "true", "yes")
+
+# Allowance granted to the e-commerce contract when a buyer's allowance runs
+# out. Set to "max" (or any wei amount) to approve once and reuse the allowance
+# across orders; 0 approves exactly the order amount each time.
+_standing_allowance = os.getenv("STANDING_TOKEN_ALLOWANCE", "0")
+STANDING_TOKEN_ALLOWANCE = 2 ** 256 - 1 if _standing_allowance.lower() == "max" else int(_standing_allowance)
+
+# Blockchain job queue
+# When enabled, order creation, payment, cancellation and refund endpoints
+# queue a BlockchainJob and answer 202 Accepted immediately; run
+# `python manage.py run_blockchain_worker` to execute the queued jobs.
+BLOCKCHAIN_JOB_QUEUE_ENABLED = os.getenv("BLOCKCHAIN_JOB_QUEUE_ENABLED", "False").lower() in ("1", "true", "yes")
+
+# Transaction receipts
+# With the watcher enabled, one thread per process follows new blocks and
+# resolves the receipts of every waiting transaction in a single batch, instead
+# of each request polling the node for its own transaction.
+RECEIPT_WATCHER_ENABLED = os.getenv("RECEIPT_WATCHER_ENABLED", "True").lower() in ("1", "true", "yes")
+RECEIPT_POLL_INTERVAL = float(os.getenv("RECEIPT_POLL_INTERVAL", "0.5"))
+RECEIPT_TIMEOUT = int(os.getenv("RECEIPT_TIMEOUT", "120"))
+
+# On-chain event indexer (`python manage.py index_events --follow`)
+INDEXER_CHUNK_SIZE = int(os.getenv("INDEXER_CHUNK_SIZE", "2000"))
+INDEXER_CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "0"))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", "2"))
+# Serve OrderStatusView from the database, which the indexer keeps in sync,
+# instead of calling getOrder on the node for every request
+ORDER_STATUS_FROM_INDEX = os.getenv("ORDER_STATUS_FROM_INDEX", "False").lower() in ("1", "true", "yes")
+
+# Largest number of orders accepted by the bulk create and cancel endpoints
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", "100"))
+
+# Order ids per cancelOrders transaction (the contract accepts at most 10)
+CANCEL_BATCH_SIZE = int(os.getenv("CANCEL_BATCH_SIZE", "10"))
+# Pending orders older than this many hours are cancelled by
+# `python manage.py cancel_stale_orders`
+STALE_ORDER_MAX_AGE_HOURS = float(os.getenv("STALE_ORDER_MAX_AGE_HOURS", "24"))
+
+# Orders refunded per pipelined batch of owner-signed initiateRefund and
+# processRefund transactions; queued refund jobs are picked up together
+REFUND_BATCH_SIZE = int(os.getenv("REFUND_BATCH_SIZE", "50"))
+
+# Number of getOrder calls packed into one JSON-RPC batch request
+GET_ORDER_BATCH_SIZE = int(os.getenv("GET_ORDER_BATCH_SIZE", "200"))
+
+# Cache
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "blockchain-ecom"),
+    }
+}
+
+# Seconds an order status read from the chain is served from the cache.
+# Entries are dropped as soon as the API changes the order.
+ORDER_STATUS_CACHE_TTL = int(os.getenv("ORDER_STATUS_CACHE_TTL", "10"))
+
+# Transaction gas
+# Gas limits are estimated once per contract function and then follow the
+# gasUsed of its receipts, times the margin plus the headroom. A reverted
+# receipt makes the next call estimate again, and processRefund is estimated
+# every time. The fallback is used when a call cannot be estimated, e.g. a
+# pipelined step whose predecessor is not mined yet.
+GAS_LIMIT_MARGIN = float(os.getenv("GAS_LIMIT_MARGIN", "1.2"))
+GAS_LIMIT_HEADROOM = int(os.getenv("GAS_LIMIT_HEADROOM", "25000"))
+GAS_LIMIT_FALLBACK = int(os.getenv("GAS_LIMIT_FALLBACK", "2000000"))
+# Fee fields are cached and refreshed in the background every interval seconds.
+# "auto" sends EIP-1559 fees when the node reports a base fee, "legacy" always
+# sends gasPrice and "eip1559" always sends maxFeePerGas/maxPriorityFeePerGas.
+GAS_PRICE_REFRESH_INTERVAL = float(os.getenv("GAS_PRICE_REFRESH_INTERVAL", "15"))
+GAS_FEE_MODE = os.getenv("GAS_FEE_MODE", "auto").lower()
+# Lowest maxPriorityFeePerGas sent with EIP-1559 fees, in wei (1 gwei)
+GAS_MIN_PRIORITY_FEE = int(os.getenv("GAS_MIN_PRIORITY_FEE", "1000000000"))
@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from web3 import Web3
+from api.models import Order, Product
+import json
+import math
+import os
+import threading
+import time
+
+# Benchmarked operations in the order they run; each phase works on the
+# orders left behind by the earlier ones
+OPERATIONS = ['create', 'pay', 'status', 'refund', 'cancel']
+
+# Result fields compared against the baseline and whether higher is better
+COMPARED_FIELDS = {
+    'throughput': True,
+    'p95_ms': False,
+    'rpc_calls_per_op': False,
+}
+
+# Tokens minted to the owner when MockERC20 is deployed
+INITIAL_TOKEN_SUPPLY = Web3.to_wei(1000000, 'ether')
+
+
+def load_contracts(contract_info_path, artifacts_dir=None):
+    """
+    ABI and bytecode of EcomercePayment and MockERC20, from contract-info.json
+    or, when it has no bytecode, from the Hardhat artifacts
+    """
+    with open(contract_info_path) as f:
+        contract_info = json.load(f)
+
+    contracts = {}
+    for name, source in (('EcomercePayment', 'Ecomerce.sol'), ('MockERC20', 'MockERC20.sol')):
+        info = contract_info.get(name, {})
+        bytecode = info.get('bytecode')
+        if not bytecode and artifacts_dir:
+            artifact_path = os.path.join(artifacts_dir, 'contracts', source, f'{name}.json')
+            if os.path.exists(artifact_path):
+                with open(artifact_path) as f:
+                    bytecode = json.load(f).get('bytecode')
+        if not info.get('abi') or not bytecode or bytecode == '0x':
+            raise Exception(
+                f"No ABI and bytecode for {name}; run `npx hardhat run scripts/exportBytecode.js` "
+                f"so {contract_info_path} includes the bytecode"
+            )
+        contracts[name] = {'abi': info['abi'], 'bytecode': bytecode}
+    return contracts
+
+
+def deploy_contracts(chain, contracts):
+    """
+    Deploy MockERC20 and EcomercePayment from the first test account and
+    register the token, as scripts/deploy.js does. Returns their addresses.
+    """
+    erc20 = contracts['MockERC20']
+    ecommerce = contracts['EcomercePayment']
+    erc20_address = chain.deploy(erc20['abi'], erc20['bytecode'], INITIAL_TOKEN_SUPPLY)
+    ecommerce_address = chain.deploy(ecommerce['abi'], ecommerce['bytecode'])
+
+    contract = chain.w3.eth.contract(address=ecommerce_address, abi=ecommerce['abi'])
+    tx_hash = contract.functions.addSupportedToken(erc20_address).transact({'from': chain.w3.eth.accounts[0]})
+    chain.w3.eth.wait_for_transaction_receipt(tx_hash)
+    return ecommerce_address, erc20_address
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summarize(latencies, errors, elapsed, rpc_calls, round_trips):
+    latencies = sorted(latencies)
+    completed = len(latencies)
+    operations = completed + len(errors)
+    return {
+        'operations': operations,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'throughput': round(completed / elapsed, 2) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'rpc_calls_per_op': round(sum(rpc_calls.values()) / operations, 2) if operations else None,
+        'round_trips_per_op': round(round_trips / operations, 2) if operations else None,
+        'rpc_methods': dict(rpc_calls.most_common()),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class BenchmarkRunner:
+    """
+    Drive the API through the Django test client against an InProcessChain.
+
+    Every phase sends its requests from `concurrency` threads, each with its
+    own test client and database connection, and records the latency of each
+    call, the phase throughput and the JSON-RPC calls the node served.
+    """
+
+    def __init__(self, chain, iterations=20, concurrency=1, payment_method=Order.PAYMENT_METHOD_TOKEN):
+        self.chain = chain
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.payment_method = payment_method
+
+    def run(self, log=None):
+        product = Product.objects.create(
+            name='Benchmark product',
+            description='Created by run_benchmarks',
+            price='0.05'
+        )
+        cache.clear()
+
+        results = {}
+        created = self._phase(results, 'create', range(self.iterations * 2), lambda client, _: client.post(
+            reverse('order-create'),
+            {'product_id': product.id, 'payment_method': self.payment_method},
+            content_type='application/json'
+        ), log)
+        order_ids = [response.json()['id'] for response in created if response is not None]
+        to_pay, to_cancel = order_ids[:self.iterations], order_ids[self.iterations:]
+
+        paid = self._phase(results, 'pay', to_pay, lambda client, order_id: client.post(
+            reverse('process-payment', args=[order_id])
+        ), log)
+        paid_ids = [order_id for order_id, response in zip(to_pay, paid) if response is not None]
+
+        # Status reads start cold so each order is read from the chain once
+        cache.clear()
+        self._phase(results, 'status', paid_ids, lambda client, order_id: client.get(
+            reverse('order-status', args=[order_id])
+        ), log)
+        self._phase(results, 'refund', paid_ids, lambda client, order_id: client.post(
+            reverse('refund-order', args=[order_id])
+        ), log)
+        self._phase(results, 'cancel', to_cancel, lambda client, order_id: client.post(
+            reverse('cancel-order', args=[order_id])
+        ), log)
+        return results
+
+    def _phase(self, results, name, items, call, log):
+        """
+        Run call(client, item) for every item and store the phase summary in
+        results[name]. Returns the successful responses in item order, None
+        for the failed ones.
+        """
+        items = list(items)
+        calls_before, round_trips_before = self.chain.counts()
+
+        local = threading.local()
+
+        def timed(item):
+            # Test clients keep cookies, so each thread gets its own
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            started = time.perf_counter()
+            try:
+                response = call(client, item)
+            except Exception as e:
+                return None, time.perf_counter() - started, str(e)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                try:
+                    error = response.json().get('error', response.status_code)
+                except ValueError:
+                    error = response.status_code
+                return None, elapsed, str(error)
+            return response, elapsed, None
+
+        started = time.perf_counter()
+        if self.concurrency == 1:
+            outcomes = [timed(item) for item in items]
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                outcomes = list(pool.map(timed, items))
+        elapsed = time.perf_counter() - started
+
+        calls_after, round_trips_after = self.chain.counts()
+        results[name] = _summarize(
+            [latency for response, latency, _ in outcomes if response is not None],
+            [error for response, _, error in outcomes if response is None],
+            elapsed,
+            calls_after - calls_before,
+            round_trips_after - round_trips_before
+        )
+        if log:
+            log(name, results[name])
+        return [response for response, _, _ in outcomes]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Regressions of results against a stored baseline, as messages. A field
+    regresses when it is worse than the baseline by more than tolerance
+    (a fraction, e.g. 0.2 for 20%).
+    """
+    regressions = []
+    for operation, current in results.items():
+        previous = baseline.get(operation)
+        if not previous:
+            continue
+        for field, higher_is_better in COMPARED_FIELDS.items():
+            old, new = previous.get(field), current.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f'{operation} {field}: {old} -> {new} ({change:+.0%})')
+    return regressions
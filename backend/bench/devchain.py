@@ -0,0 +1,174 @@
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError
+import json
+import logging
+import rlp
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _to_json(value):
+    """
+    Encode a web3 result the way a node would put it on the wire
+    """
+    if isinstance(value, (AttributeDict, dict)):
+        return {key: _to_json(item) for key, item in dict(value).items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, (bytes, HexBytes)):
+        return '0x' + bytes(value).hex()
+    if isinstance(value, bool) or value is None or isinstance(value, (str, float)):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    return str(value)
+
+
+def _raw_transaction_nonce(raw_transaction):
+    payload = bytes(HexBytes(raw_transaction))
+    if payload[0] >= 0xc0:
+        # Legacy transaction: rlp([nonce, gasPrice, gas, to, value, data, v, r, s])
+        return int.from_bytes(rlp.decode(payload)[0], 'big')
+    # Typed transaction: type byte + rlp([chainId, nonce, ...])
+    return int.from_bytes(rlp.decode(payload[1:])[1], 'big')
+
+
+class InProcessChain:
+    """
+    An eth-tester (py-evm) chain served over JSON-RPC on a local port.
+
+    SmartContract talks to it exactly as it talks to Ganache, over HTTP with
+    batching and the usual middleware, so benchmarks exercise the real client
+    code without an external node. Every transaction is mined into its own
+    block as soon as it arrives. Transactions sent ahead of their nonce are
+    held back until the gap is filled, as a node's transaction pool would.
+    """
+
+    def __init__(self):
+        try:
+            from web3 import EthereumTesterProvider
+            self.provider = EthereumTesterProvider()
+        except ImportError as e:
+            raise Exception(f'The in-process chain needs eth-tester, install it with pip install "web3[tester]": {e}')
+        self.w3 = Web3(self.provider)
+        self.tester = self.provider.ethereum_tester
+        self._lock = threading.RLock()
+        self._queued = {}
+        self._counts_lock = threading.Lock()
+        self.calls = Counter()
+        self.round_trips = 0
+        self._server = None
+
+    @property
+    def private_keys(self):
+        """
+        Keys of the funded test accounts
+        """
+        return [key.to_hex() for key in self.tester.backend.account_keys]
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port=0):
+        chain = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                payload = json.dumps(chain.dispatch(body)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='in-process-chain', daemon=True).start()
+        logger.info(f"In-process chain listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def counts(self):
+        """
+        (JSON-RPC calls by method, HTTP round trips) served so far
+        """
+        with self._counts_lock:
+            return Counter(self.calls), self.round_trips
+
+    def deploy(self, abi, bytecode, *args):
+        """
+        Deploy a contract from the first test account and return its address
+        """
+        contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+        tx_hash = contract.constructor(*args).transact({'from': self.w3.eth.accounts[0]})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt.status != 1:
+            raise Exception("Contract deployment failed")
+        return receipt.contractAddress
+
+    def dispatch(self, body):
+        requests = body if isinstance(body, list) else [body]
+        with self._counts_lock:
+            self.round_trips += 1
+            self.calls.update(request.get('method') for request in requests)
+        responses = [
+            dict(self.handle(request['method'], request.get('params', [])), id=request.get('id'), jsonrpc='2.0')
+            for request in requests
+        ]
+        return responses if isinstance(body, list) else responses[0]
+
+    def handle(self, method, params):
+        with self._lock:
+            try:
+                if method == 'eth_sendRawTransaction':
+                    return self._send_raw_transaction(params[0])
+                return {'result': _to_json(self.w3.manager.request_blocking(method, params))}
+            except ContractLogicError as e:
+                return {'error': {'code': 3, 'message': e.message or str(e), 'data': e.data}}
+            except Exception as e:
+                message = str(e)
+                if method == 'eth_getTransactionReceipt' and 'not found' in message.lower():
+                    return {'result': None}
+                return {'error': {'code': -32000, 'message': message}}
+
+    def _send_raw_transaction(self, raw_transaction):
+        sender = Account.recover_transaction(raw_transaction)
+        nonce = _raw_transaction_nonce(raw_transaction)
+        expected = self.tester.get_nonce(sender)
+        if nonce < expected:
+            return {'error': {'code': -32000, 'message': f'nonce too low: expected {expected}, got {nonce}'}}
+        if nonce > expected:
+            self._queued[(sender, nonce)] = raw_transaction
+            return {'result': Web3.to_hex(Web3.keccak(hexstr=raw_transaction))}
+
+        tx_hash = self.w3.manager.request_blocking('eth_sendRawTransaction', [raw_transaction])
+        while True:
+            queued = self._queued.pop((sender, self.tester.get_nonce(sender)), None)
+            if queued is None:
+                break
+            try:
+                self.w3.manager.request_blocking('eth_sendRawTransaction', [queued])
+            except Exception as e:
+                logger.warning(f"Queued transaction from {sender} failed: {e}")
+        return {'result': _to_json(tx_hash)}
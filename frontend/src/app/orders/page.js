@@ -6,7 +6,9 @@ import ApiService from '@/services/api';
 
 const OrdersPage = () => {
   const [orders, setOrders] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
@@ -14,7 +16,8 @@ const OrdersPage = () => {
       try {
         setLoading(true);
         const data = await ApiService.getOrders();
-        setOrders(data);
+        setOrders(data.results);
+        setNextPage(data.next);
       } catch (err) {
         setError('Failed to fetch orders. Please make sure the backend is running.');
         console.error('Error fetching orders:', err);
@@ -26,6 +29,20 @@ const OrdersPage = () => {
     fetchOrders();
   }, []);
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await ApiService.getOrders(nextPage);
+      setOrders((current) => [...current, ...data.results]);
+      setNextPage(data.next);
+    } catch (err) {
+      setError('Failed to fetch more orders. Please make sure the backend is running.');
+      console.error('Error fetching orders:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusColor = (status) => {
     switch (status.toLowerCase()) {
       case 'paid':
@@ -113,6 +130,18 @@ const OrdersPage = () => {
               </div>
             </div>
           ))}
+
+          {nextPage && (
+            <div className="flex justify-center">
+              <button
+                onClick={loadMoreOrders}
+                disabled={loadingMore}
+                className="bg-blue-500 hover:bg-blue-700 text-white font-bold py-2 px-4 rounded disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more orders'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
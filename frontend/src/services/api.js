@@ -72,13 +72,17 @@ class ApiService {
     }
   }
 
-  async getOrders() {
+  // The list is cursor paginated, newest orders first. Returns one page of
+  // orders and the URL of the next page (null on the last page); pass that
+  // URL back in to load the following page.
+  async getOrders(pageUrl = null) {
     try {
-      const response = await fetch(`${this.baseUrl}/orders/list/`);
+      const response = await fetch(pageUrl || `${this.baseUrl}/orders/list/`);
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
-      return await response.json();
+      const data = await response.json();
+      return { results: data.results, next: data.next };
     } catch (error) {
       console.error('Error fetching orders:', error);
       throw error;
@@ -27,11 +27,14 @@ async function main() {
     const contractInfo = {
         EcomercePayment: {
             address: ecomercePayment.target,
-            abi: JSON.parse(ecomercePayment.interface.formatJson())
+            abi: JSON.parse(ecomercePayment.interface.formatJson()),
+            // Used by the backend benchmarks to redeploy on an in-process chain
+            bytecode: EcomercePayment.bytecode
         },
         MockERC20: {
             address: mockERC20.target,
-            abi: JSON.parse(mockERC20.interface.formatJson())
+            abi: JSON.parse(mockERC20.interface.formatJson()),
+            bytecode: MockERC20.bytecode
         }
     };
 
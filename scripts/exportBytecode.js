@@ -0,0 +1,35 @@
+const { artifacts } = require("hardhat");
+const fs = require("fs");
+const path = require("path");
+
+/**
+ * Adds the compiled ABI and bytecode of EcomercePayment and MockERC20 to
+ * contract-info.json without redeploying, keeping the saved addresses.
+ * The backend benchmarks deploy this bytecode on an in-process chain.
+ * `npx hardhat run` compiles the contracts first.
+ */
+async function main() {
+    const contractInfoPath = path.join(__dirname, "contract-info.json");
+    const contractInfo = fs.existsSync(contractInfoPath)
+        ? JSON.parse(fs.readFileSync(contractInfoPath, "utf8"))
+        : {};
+
+    for (const name of ["EcomercePayment", "MockERC20"]) {
+        const artifact = await artifacts.readArtifact(name);
+        contractInfo[name] = {
+            ...contractInfo[name],
+            abi: artifact.abi,
+            bytecode: artifact.bytecode
+        };
+    }
+
+    fs.writeFileSync(contractInfoPath, JSON.stringify(contractInfo, null, 2));
+    console.log(`Contract bytecode saved to ${contractInfoPath}`);
+}
+
+main()
+    .then(() => process.exit(0))
+    .catch((error) => {
+        console.error(error);
+        process.exit(1);
+    });